@@ -2,6 +2,7 @@
 Script to add sample products to the billing system
 Run this after starting the server
 """
+import json
 import requests
 
 API_BASE = "http://127.0.0.1:8000/api/v1"
@@ -18,16 +19,22 @@ products = [
 print("Adding sample products...")
 print("-" * 50)
 
-for product in products:
-    try:
-        response = requests.post(f"{API_BASE}/products", json=product)
-        if response.status_code == 201:
-            data = response.json()
-            print(f"✓ Created: {data['name']} (ID: {data['id']})")
-        else:
-            print(f"✗ Failed: {product['name']} - {response.json()}")
-    except Exception as e:
-        print(f"✗ Error: {product['name']} - {str(e)}")
+# One streaming NDJSON upload instead of one request per product
+try:
+    response = requests.post(
+        f"{API_BASE}/products/bulk",
+        data="\n".join(json.dumps(product) for product in products),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    if response.status_code == 200:
+        report = response.json()
+        print(f"✓ Upserted: {report['upserted']} product(s)")
+        for error in report['errors']:
+            print(f"✗ Failed: row {error['row']} - {'; '.join(error['errors'])}")
+    else:
+        print(f"✗ Failed: {response.json()}")
+except Exception as e:
+    print(f"✗ Error: {str(e)}")
 
 print("-" * 50)
 print("Done! Products added successfully.")
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -9,11 +10,94 @@ class Settings(BaseSettings):
     
     DATABASE_URL: str
     
+    # Opt-in async request path (aiosqlite / asyncpg)
+    ASYNC_DATABASE_ENABLED: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+    
+    # Optional read replica for list/detail/report endpoints (unset: all reads go to DATABASE_URL)
+    READ_DATABASE_URL: Optional[str] = None
+    ASYNC_READ_DATABASE_URL: Optional[str] = None  # derived from READ_DATABASE_URL when unset
+    
+    # Connection pool (per engine; in-memory SQLite always uses a single connection)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 3600  # seconds; server databases only
+    DB_POOL_PRE_PING: bool = True  # server databases only
+    
+    # SQLite profile: pragmas run on every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # how long a writer waits for the lock
+    SQLITE_MMAP_SIZE: int = 268435456  # bytes memory-mapped per connection (256 MiB)
+    SQLITE_CACHE_SIZE: int = -65536  # page cache; negative is KiB (64 MiB)
+    
+    # PostgreSQL profile (0 leaves the server default)
+    POSTGRES_STATEMENT_TIMEOUT_MS: int = 60000
+    POSTGRES_LOCK_TIMEOUT_MS: int = 0
+    POSTGRES_PREPARED_STATEMENTS: bool = True  # asyncpg / psycopg 3; off behind PgBouncer transaction pooling
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 100  # prepared statements kept per asyncpg connection
+    
     # Email settings
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SENDER_EMAIL: str = ""
     SENDER_PASSWORD: str = ""
+    SMTP_USE_TLS: bool = True
+    SMTP_TIMEOUT: float = 30.0
+    
+    # Invoice email outbox worker
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 2.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_BACKOFF_SECONDS: float = 30.0
+    EMAIL_OUTBOX_LEASE_SECONDS: float = 300.0
+    
+    # Instrumentation (GET /metrics, Prometheus text format)
+    METRICS_ENABLED: bool = True
+    
+    # Invoice rendering
+    INVOICE_TEMPLATE_CACHE_DIR: Optional[str] = None  # on-disk compiled template cache shared by workers
+    RECEIPT_WIDTH: int = 42  # characters per thermal receipt line (80mm paper; 32 for 58mm)
+    
+    # Checkout concurrency control
+    # "pessimistic": SELECT ... FOR UPDATE in deterministic ID order
+    # "optimistic": version-column checks with bounded retry
+    CHECKOUT_CONCURRENCY_MODE: Literal["pessimistic", "optimistic"] = "pessimistic"
+    CHECKOUT_MAX_RETRIES: int = 3
+    CHECKOUT_RETRY_BACKOFF: float = 0.01
+    CHECKOUT_BATCH_MAX_SIZE: int = 500  # bills per POST /purchases/batch
+    CHANGE_TABLE_CACHE_SIZE: int = 32  # change-making tables kept per drawer state
+    
+    # Idempotency-Key replay store for POST /purchases
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_CACHE_SIZE: int = 10000  # in-memory front cache; 0 disables it
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: float = 3600.0
+    
+    # In-process product catalog cache (name, price, tax; never stock)
+    CATALOG_CACHE_SIZE: int = 10000
+    CATALOG_CACHE_TTL_SECONDS: float = 300.0
+    
+    # Customer profile cache (GET /customers/{email}); checkout invalidates locally
+    CUSTOMER_PROFILE_CACHE_SIZE: int = 10000  # 0 disables it
+    CUSTOMER_PROFILE_CACHE_TTL_SECONDS: float = 30.0
+    CUSTOMER_ID_CACHE_SIZE: int = 100000  # email -> customer ID at checkout; 0 disables it
+    
+    # Bulk product import
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    
+    # Pricing engine: carts at least this long are priced with NumPy (when installed)
+    PRICING_VECTOR_MIN_LINES: int = 64
+    
+    # Reports
+    REPORT_CHUNK_SIZE: int = 50000  # snapshot rows streamed per pricing pass
+    REPORT_DEFAULT_DAYS: int = 30  # window when a sales report gets no start
+    EXPORT_CHUNK_SIZE: int = 1000  # purchase lines fetched and encoded per streamed chunk
+    
+    # Sales rollups (hourly per product / per customer), folded in by purchase ID
+    ROLLUP_INTERVAL_SECONDS: float = 60.0
+    ROLLUP_BATCH_SIZE: int = 1000  # purchases folded per transaction
     
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
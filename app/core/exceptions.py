@@ -27,3 +27,18 @@ class InvalidPaymentException(BillingException):
 class InsufficientDenominationException(BillingException):
     """Raised when denomination stock is insufficient"""
     pass
+
+
+class ConcurrencyConflictException(BillingException):
+    """Raised when a concurrent checkout modified the same rows"""
+    pass
+
+
+class IdempotencyKeyReuseException(BillingException):
+    """Raised when an Idempotency-Key is replayed with a different request"""
+    pass
+
+
+class InvalidCursorException(BillingException):
+    """Raised when a pagination cursor cannot be decoded"""
+    pass
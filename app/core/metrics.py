@@ -0,0 +1,345 @@
+"""
+In-process metrics with Prometheus text exposition (GET /metrics).
+
+A deliberately small registry instead of a client library: gauges (set
+directly or computed at scrape time) and cumulative histograms, each
+guarded by its own lock so an observation costs one dict lookup and a
+few additions. Values are per process; with several
+workers Prometheus scrapes and sums each one.
+
+Request attribution: MetricsMiddleware puts a RequestStats in a context
+variable for the duration of each request, and the cursor-execute hooks
+installed by instrument_engine add every statement's count and time to
+it. Starlette copies the context into the threadpool, so sync endpoints
+and streamed bodies are attributed too.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+    
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+    
+    def reset(self):
+        raise NotImplementedError
+
+
+class Gauge(_Metric):
+    """
+    Current value. Either set/inc/dec directly, or pass collect: a callable
+    returning (labels, value) pairs, evaluated at every scrape.
+    """
+    kind = "gauge"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._collect = collect
+    
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+    
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+    
+    def samples(self) -> List[str]:
+        if self._collect is not None:
+            values = list(self._collect())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+    
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds (seconds, or counts)"""
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self._series: Dict[Labels, list] = {}
+    
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+    
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+    
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ("method", "route", "status")
+))
+REQUESTS_IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "Requests currently being served", ("method",)
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), COUNT_BUCKETS
+))
+REQUEST_DB_SECONDS = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ("method", "route")
+))
+QUERY_SECONDS = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time (all callers)", ("pool",)
+))
+POOL_WAIT_SECONDS = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("pool",)
+))
+CHECKOUT_STEP_SECONDS = registry.register(Histogram(
+    "checkout_step_duration_seconds", "Time per step of BillingService.create_purchase", ("step",)
+))
+
+# pool label -> pool; read at scrape time
+_pools: Dict[str, object] = {}
+
+
+def _pool_stat(method: str):
+    def collect():
+        for name, pool in list(_pools.items()):
+            read = getattr(pool, method, None)
+            if read is not None:
+                yield (name,), read()
+    return collect
+
+
+registry.register(Gauge("db_pool_size", "Configured pool size", ("pool",), collect=_pool_stat("size")))
+registry.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ("pool",), collect=_pool_stat("checkedout")
+))
+registry.register(Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size (negative: unopened pool slots)", ("pool",),
+    collect=_pool_stat("overflow")
+))
+
+
+class RequestStats:
+    """Per-request SQL totals, filled in by the cursor-execute hooks"""
+    __slots__ = ("queries", "db_seconds")
+    
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine: Engine, pool_name: str):
+    """Time every statement on this (sync, or AsyncEngine.sync_engine) engine and watch its pool"""
+    _pools[pool_name] = engine.pool
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        QUERY_SECONDS.observe(elapsed, pool_name)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+    
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class _TimedCheckout:
+    """Pool mixin: observe how long connect() waited for a connection"""
+    
+    metrics_name = "sync"
+    
+    def connect(self):
+        started = time.perf_counter()
+        connection = super().connect()
+        POOL_WAIT_SECONDS.observe(time.perf_counter() - started, self.metrics_name)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+class TimedReadQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = "read"
+
+
+class TimedAsyncReadQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async_read"
+
+
+class StepTimer:
+    """Lap timer: lap(step) records the time since the previous lap under that step"""
+    __slots__ = ("histogram", "last")
+    
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+    
+    def lap(self, step: str):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, step)
+        self.last = now
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop): latency, status
+    and per-request SQL totals labelled by route template, so /purchases/7
+    and /purchases/8 share one series. Unmatched paths are pooled under
+    "unmatched" to keep label cardinality bounded.
+    """
+    
+    def __init__(self, app, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        REQUESTS_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec(method)
+            current_request.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(elapsed, method, route, str(status_code))
+            REQUEST_QUERIES.observe(stats.queries, method, route)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, method, route)
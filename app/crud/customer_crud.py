@@ -0,0 +1,175 @@
+from sqlalchemy import bindparam, case, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional
+from decimal import Decimal
+from app.db.types import Money
+from app.models.customer import Customer
+from app.utils.customer_cache import customer_id_cache, customer_profile_cache
+from app.utils.money import as_money
+import logging
+
+logger = logging.getLogger(__name__)
+
+_customers = Customer.__table__.c
+_is_newer = or_(_customers.last_purchase_id.is_(None), _customers.last_purchase_id < bindparam('last_id'))
+
+# Executemany-friendly: one row per customer, every SET reads the pre-update values
+_record_purchases = (
+    update(Customer.__table__)
+    .where(_customers.id == bindparam('customer'))
+    .values(
+        bill_count=_customers.bill_count + bindparam('bills'),
+        lifetime_spend=_customers.lifetime_spend + bindparam('spend', type_=Money()),
+        last_purchase_at=case((_is_newer, bindparam('last_at')), else_=_customers.last_purchase_at),
+        last_purchase_id=case((_is_newer, bindparam('last_id')), else_=_customers.last_purchase_id)
+    )
+)
+
+
+def _profile(customer: Customer) -> Dict:
+    spend = customer.lifetime_spend
+    return {
+        'id': customer.id,
+        'email': customer.email,
+        'created_at': customer.created_at,
+        'bill_count': customer.bill_count,
+        'lifetime_spend': spend,
+        'average_bill': as_money(spend / customer.bill_count) if customer.bill_count else Decimal(0),
+        'last_purchase_id': customer.last_purchase_id,
+        'last_purchase_at': customer.last_purchase_at
+    }
+
+
+class CustomerRepository:
+    """Customer lookups and the running lifetime aggregates"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self._created: Dict[str, int] = {}
+    
+    def get_by_email(self, email: str) -> Optional[Customer]:
+        return self.db.scalar(select(Customer).where(Customer.email == email))
+    
+    def get_or_create_ids(self, emails: Iterable[str]) -> Dict[str, int]:
+        """
+        Customer ID for every email, creating the customers that do not exist.
+        
+        Repeat customers are served from the ID cache without a query; the
+        rest are looked up with one IN query and the genuinely new ones are
+        inserted with INSERT ... ON CONFLICT DO NOTHING RETURNING. A
+        concurrent checkout that created the same email first makes the
+        insert skip that row instead of failing the bill, and a second
+        lookup picks up its ID. New IDs reach the cache only in
+        after_commit, so a rolled-back customer is never cached.
+        """
+        ids: Dict[str, int] = {}
+        missing = []
+        for email in sorted(set(emails)):
+            customer_id = customer_id_cache.get(email)
+            if customer_id is None:
+                missing.append(email)
+            else:
+                ids[email] = customer_id
+        if not missing:
+            return ids
+        
+        found = self._lookup_ids(missing)
+        customer_id_cache.put_many(found)
+        ids.update(found)
+        missing = [email for email in missing if email not in found]
+        if missing:
+            created = self._insert_missing(missing)
+            self._created.update(created)
+            ids.update(created)
+            lost = [email for email in missing if email not in created]
+            if lost:
+                ids.update(self._lookup_ids(lost))
+            logger.info(f"{len(created)} new customer(s) created")
+        return ids
+    
+    def _lookup_ids(self, emails: List[str]) -> Dict[str, int]:
+        return dict(self.db.execute(select(Customer.email, Customer.id).where(Customer.email.in_(emails))).all())
+    
+    def _insert_missing(self, emails: List[str]) -> Dict[str, int]:
+        """Insert customers, skipping emails another transaction already created; returns the new IDs"""
+        bind = self.db.get_bind()
+        rows = [{'email': email} for email in emails]
+        if bind.dialect.name in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
+            stmt = dialect_insert(Customer).on_conflict_do_nothing(index_elements=[Customer.email])
+            if bind.dialect.insert_returning:
+                return dict(self.db.execute(stmt.values(rows).returning(Customer.email, Customer.id)).all())
+            self.db.execute(stmt, rows)
+            return self._lookup_ids(emails)
+        
+        created = {}
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    created[row['email']] = self.db.execute(insert(Customer).values(row)).inserted_primary_key[0]
+            except IntegrityError:
+                pass
+        return created
+    
+    def get_profile(self, email: str) -> Optional[Dict]:
+        """Lifetime profile: one indexed row read, fronted by the profile cache"""
+        profile = customer_profile_cache.get(email)
+        if profile is None:
+            customer = self.get_by_email(email)
+            if customer is None:
+                return None
+            profile = _profile(customer)
+            customer_profile_cache.put(email, profile)
+        return profile
+    
+    def record_purchases(self, purchases: List[Dict]):
+        """
+        Fold new bills into their customers' aggregates (the caller commits).
+        
+        purchases: one dict per bill with customer_id, purchase_id,
+        final_amount and created_at. Bills are summed per customer and sent
+        as a single executemany of an atomic increment, in customer ID
+        order so concurrent checkouts lock customer rows consistently.
+        """
+        rows: Dict[int, Dict] = {}
+        for purchase in purchases:
+            row = rows.setdefault(purchase['customer_id'], {
+                'customer': purchase['customer_id'], 'bills': 0, 'spend': Decimal(0), 'last_id': 0, 'last_at': None
+            })
+            row['bills'] += 1
+            row['spend'] += purchase['final_amount']
+            if purchase['purchase_id'] > row['last_id']:
+                row['last_id'] = purchase['purchase_id']
+                row['last_at'] = purchase['created_at']
+        if rows:
+            self.db.execute(_record_purchases, [rows[customer_id] for customer_id in sorted(rows)])
+    
+    def after_commit(self, emails: Iterable[str]):
+        """Once the checkout has committed: drop the billed customers' cached profiles and cache new IDs"""
+        customer_profile_cache.invalidate(emails)
+        customer_id_cache.put_many(self._created)
+        self._created = {}
+
+
+class AsyncCustomerRepository:
+    """Async customer lookups (AsyncSession)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_email(self, email: str) -> Optional[Customer]:
+        return await self.db.scalar(select(Customer).where(Customer.email == email))
+    
+    async def get_profile(self, email: str) -> Optional[Dict]:
+        """Lifetime profile: one indexed row read, fronted by the profile cache"""
+        profile = customer_profile_cache.get(email)
+        if profile is None:
+            customer = await self.get_by_email(email)
+            if customer is None:
+                return None
+            profile = _profile(customer)
+            customer_profile_cache.put(email, profile)
+        return profile
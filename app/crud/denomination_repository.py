@@ -1,13 +1,54 @@
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Dict, List, Optional, Tuple
 from app.models.denomination import Denomination
+from app.models.purchase_denomination import PurchaseDenomination
 from app.schemas.schemas import DenominationCreate, DenominationUpdate
-from app.core.exceptions import ResourceNotFoundException
+from app.core.exceptions import ConcurrencyConflictException, ResourceNotFoundException
+from app.utils.denomination_calculator import invalidate_change_tables
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DRAWER_ID = 1
+
+
+def _drawer_select(drawer_id: Optional[int]):
+    """Denominations of one drawer (or every drawer), largest note first"""
+    stmt = select(Denomination)
+    if drawer_id is not None:
+        stmt = stmt.where(Denomination.drawer_id == drawer_id)
+    return stmt.order_by(Denomination.drawer_id, Denomination.value.desc())
+
+
+def _locked_drawer_select(drawer_id: int):
+    """A drawer's rows locked in value order, the order checkout locks them in"""
+    return (
+        select(Denomination)
+        .where(Denomination.drawer_id == drawer_id)
+        .order_by(Denomination.value)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+def _watermark_select(drawer_id: int):
+    """Moves with every insert, update and delete in the drawer (all writes bump version)"""
+    return select(
+        func.count(), func.max(Denomination.updated_at), func.coalesce(func.sum(Denomination.version), 0)
+    ).where(Denomination.drawer_id == drawer_id)
+
+
+def _change_given_select(drawer_id: int):
+    return (
+        select(PurchaseDenomination.denomination_value, func.sum(PurchaseDenomination.count_given))
+        .where(PurchaseDenomination.drawer_id == drawer_id)
+        .group_by(PurchaseDenomination.denomination_value)
+    )
+
 
 class DenominationRepository:
     """Repository pattern for Denomination operations"""
@@ -21,40 +62,172 @@ class DenominationRepository:
             denomination = Denomination(**denom_data.model_dump())
             self.db.add(denomination)
             self.db.commit()
+            invalidate_change_tables()
             self.db.refresh(denomination)
-            logger.info(f"Denomination created: {denomination.value}")
+            logger.info(f"Denomination created: {denomination.value} (drawer {denomination.drawer_id})")
             return denomination
         except IntegrityError:
             self.db.rollback()
-            raise ValueError(f"Denomination with value {denom_data.value} already exists")
+            raise ValueError(
+                f"Denomination with value {denom_data.value} already exists in drawer {denom_data.drawer_id}"
+            )
     
-    def get_by_value(self, value: int) -> Optional[Denomination]:
+    def get_by_value(self, value: int, drawer_id: int = DEFAULT_DRAWER_ID) -> Optional[Denomination]:
         """Get denomination by value"""
-        return self.db.query(Denomination).filter(Denomination.value == value).first()
+        return self.db.query(Denomination).filter(
+            Denomination.drawer_id == drawer_id,
+            Denomination.value == value
+        ).first()
+    
+    def get_all(self, drawer_id: Optional[int] = DEFAULT_DRAWER_ID) -> List[Denomination]:
+        """Get all denominations of a drawer (None: every drawer)"""
+        return list(self.db.scalars(_drawer_select(drawer_id)).all())
+    
+    def lock_drawer(self, drawer_id: int) -> List[Denomination]:
+        """Lock a drawer's rows until commit, so a count is compared and applied against current stock"""
+        return list(self.db.scalars(_locked_drawer_select(drawer_id)).all())
+    
+    def get_watermark(self, drawer_id: int = DEFAULT_DRAWER_ID) -> Tuple:
+        return tuple(self.db.execute(_watermark_select(drawer_id)).one())
     
-    def get_all(self) -> List[Denomination]:
-        """Get all denominations"""
-        return self.db.query(Denomination).order_by(Denomination.value.desc()).all()
+    def get_drawer_ids(self) -> List[int]:
+        return list(self.db.scalars(select(Denomination.drawer_id).distinct().order_by(Denomination.drawer_id)).all())
     
-    def update(self, value: int, denom_data: DenominationUpdate) -> Denomination:
+    def get_change_given(self, drawer_id: int) -> Dict[int, int]:
+        """Notes handed out as change from a drawer, per value"""
+        return {value: int(count) for value, count in self.db.execute(_change_given_select(drawer_id)).all()}
+    
+    def update(self, value: int, denom_data: DenominationUpdate, drawer_id: int = DEFAULT_DRAWER_ID) -> Denomination:
         """Update denomination count"""
-        denomination = self.get_by_value(value)
+        denomination = self.get_by_value(value, drawer_id)
         if not denomination:
-            raise ResourceNotFoundException(f"Denomination with value {value} not found")
+            raise ResourceNotFoundException(f"Denomination with value {value} not found in drawer {drawer_id}")
         
         denomination.available_count = denom_data.available_count
         self.db.commit()
+        invalidate_change_tables()
         self.db.refresh(denomination)
-        logger.info(f"Denomination updated: {value} -> count: {denom_data.available_count}")
+        logger.info(f"Denomination updated: {value} (drawer {drawer_id}) -> count: {denom_data.available_count}")
         return denomination
     
-    def delete(self, value: int) -> bool:
+    def set_counts(self, drawer_id: int, counts: Dict[int, int]) -> List[Denomination]:
+        """Overwrite a drawer's counts (after a physical count), creating missing notes"""
+        denominations = {d.value: d for d in self.get_all(drawer_id)}
+        for value, count in counts.items():
+            if value in denominations:
+                denominations[value].available_count = count
+            else:
+                self.db.add(Denomination(drawer_id=drawer_id, value=value, available_count=count))
+        try:
+            self.db.commit()
+        except StaleDataError:
+            # A checkout changed the drawer after it was read (optimistic mode without row locks)
+            self.db.rollback()
+            raise ConcurrencyConflictException(f"Drawer {drawer_id} changed while it was being counted")
+        invalidate_change_tables()
+        logger.info(f"Drawer {drawer_id} counts set: {counts}")
+        return self.get_all(drawer_id)
+    
+    def delete(self, value: int, drawer_id: int = DEFAULT_DRAWER_ID) -> bool:
         """Delete denomination"""
-        denomination = self.get_by_value(value)
+        denomination = self.get_by_value(value, drawer_id)
         if not denomination:
-            raise ResourceNotFoundException(f"Denomination with value {value} not found")
+            raise ResourceNotFoundException(f"Denomination with value {value} not found in drawer {drawer_id}")
         
         self.db.delete(denomination)
         self.db.commit()
-        logger.info(f"Denomination deleted: {value}")
+        invalidate_change_tables()
+        logger.info(f"Denomination deleted: {value} (drawer {drawer_id})")
+        return True
+
+
+class AsyncDenominationRepository:
+    """Async repository for Denomination operations (AsyncSession)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create(self, denom_data: DenominationCreate) -> Denomination:
+        """Create a new denomination"""
+        try:
+            denomination = Denomination(**denom_data.model_dump())
+            self.db.add(denomination)
+            await self.db.commit()
+            invalidate_change_tables()
+            await self.db.refresh(denomination)
+            logger.info(f"Denomination created: {denomination.value} (drawer {denomination.drawer_id})")
+            return denomination
+        except IntegrityError:
+            await self.db.rollback()
+            raise ValueError(
+                f"Denomination with value {denom_data.value} already exists in drawer {denom_data.drawer_id}"
+            )
+    
+    async def get_by_value(self, value: int, drawer_id: int = DEFAULT_DRAWER_ID) -> Optional[Denomination]:
+        """Get denomination by value"""
+        return await self.db.scalar(
+            select(Denomination).where(Denomination.drawer_id == drawer_id, Denomination.value == value)
+        )
+    
+    async def get_all(self, drawer_id: Optional[int] = DEFAULT_DRAWER_ID) -> List[Denomination]:
+        """Get all denominations of a drawer (None: every drawer)"""
+        result = await self.db.scalars(_drawer_select(drawer_id))
+        return list(result.all())
+    
+    async def lock_drawer(self, drawer_id: int) -> List[Denomination]:
+        """Lock a drawer's rows until commit, so a count is compared and applied against current stock"""
+        return list((await self.db.scalars(_locked_drawer_select(drawer_id))).all())
+    
+    async def get_watermark(self, drawer_id: int = DEFAULT_DRAWER_ID) -> Tuple:
+        return tuple((await self.db.execute(_watermark_select(drawer_id))).one())
+    
+    async def get_drawer_ids(self) -> List[int]:
+        result = await self.db.scalars(select(Denomination.drawer_id).distinct().order_by(Denomination.drawer_id))
+        return list(result.all())
+    
+    async def get_change_given(self, drawer_id: int) -> Dict[int, int]:
+        """Notes handed out as change from a drawer, per value"""
+        result = await self.db.execute(_change_given_select(drawer_id))
+        return {value: int(count) for value, count in result.all()}
+    
+    async def update(self, value: int, denom_data: DenominationUpdate, drawer_id: int = DEFAULT_DRAWER_ID) -> Denomination:
+        """Update denomination count"""
+        denomination = await self.get_by_value(value, drawer_id)
+        if not denomination:
+            raise ResourceNotFoundException(f"Denomination with value {value} not found in drawer {drawer_id}")
+        
+        denomination.available_count = denom_data.available_count
+        await self.db.commit()
+        invalidate_change_tables()
+        await self.db.refresh(denomination)
+        logger.info(f"Denomination updated: {value} (drawer {drawer_id}) -> count: {denom_data.available_count}")
+        return denomination
+    
+    async def set_counts(self, drawer_id: int, counts: Dict[int, int]) -> List[Denomination]:
+        """Overwrite a drawer's counts (after a physical count), creating missing notes"""
+        denominations = {d.value: d for d in await self.get_all(drawer_id)}
+        for value, count in counts.items():
+            if value in denominations:
+                denominations[value].available_count = count
+            else:
+                self.db.add(Denomination(drawer_id=drawer_id, value=value, available_count=count))
+        try:
+            await self.db.commit()
+        except StaleDataError:
+            await self.db.rollback()
+            raise ConcurrencyConflictException(f"Drawer {drawer_id} changed while it was being counted")
+        invalidate_change_tables()
+        logger.info(f"Drawer {drawer_id} counts set: {counts}")
+        return await self.get_all(drawer_id)
+    
+    async def delete(self, value: int, drawer_id: int = DEFAULT_DRAWER_ID) -> bool:
+        """Delete denomination"""
+        denomination = await self.get_by_value(value, drawer_id)
+        if not denomination:
+            raise ResourceNotFoundException(f"Denomination with value {value} not found in drawer {drawer_id}")
+        
+        await self.db.delete(denomination)
+        await self.db.commit()
+        invalidate_change_tables()
+        logger.info(f"Denomination deleted: {value} (drawer {drawer_id})")
         return True
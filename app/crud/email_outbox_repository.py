@@ -0,0 +1,74 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from datetime import datetime, timedelta
+from app.models.email_outbox import EmailOutbox
+from app.core.config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class EmailOutboxRepository:
+    """Repository pattern for EmailOutbox operations"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def enqueue(self, purchase_id: int, to_email: str, payload: Dict) -> EmailOutbox:
+        """Queue an invoice email (caller owns the transaction)"""
+        message = EmailOutbox(purchase_id=purchase_id, to_email=to_email, payload=payload)
+        self.db.add(message)
+        return message
+    
+    def claim_batch(self, limit: int) -> List[EmailOutbox]:
+        """
+        Lease up to `limit` due messages and commit the lease.
+        
+        Claimed rows stay pending with next_attempt_at pushed past the lease,
+        so a worker that dies mid-batch only delays them. SKIP LOCKED lets
+        several workers claim disjoint batches on PostgreSQL. Use a session
+        with expire_on_commit=False (the worker's is), or every returned row
+        is reloaded on first access after the commit.
+        """
+        now = datetime.utcnow()
+        messages = (
+            self.db.query(EmailOutbox)
+            .filter(
+                EmailOutbox.status == EmailOutbox.STATUS_PENDING,
+                EmailOutbox.next_attempt_at <= now
+            )
+            .order_by(EmailOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        
+        lease_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        for message in messages:
+            message.attempts += 1
+            message.next_attempt_at = lease_until
+        self.db.commit()
+        return messages
+    
+    def mark_sent(self, message: EmailOutbox):
+        message.status = EmailOutbox.STATUS_SENT
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+    
+    def mark_failed(self, message: EmailOutbox, error: str):
+        """Schedule a retry with exponential backoff, or dead-letter the message"""
+        message.last_error = error[:2000]
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = EmailOutbox.STATUS_DEAD
+            logger.error(f"Invoice email {message.id} dead-lettered after {message.attempts} attempts: {error}")
+            return
+        
+        delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** (message.attempts - 1))
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    
+    def count_by_status(self) -> Dict[str, int]:
+        """Outbox depth per status"""
+        rows = self.db.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all()
+        return {status: count for status, count in rows}
@@ -0,0 +1,62 @@
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+from app.models.idempotency_key import IdempotencyKey
+from app.core.config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class IdempotencyRepository:
+    """Repository pattern for IdempotencyKey operations"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_active(self, key: str) -> Optional[IdempotencyKey]:
+        """Stored outcome for a key, ignoring expired rows the sweep has not removed yet"""
+        return self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.utcnow()
+        ).first()
+    
+    def claim(self, key: str, request_hash: str) -> IdempotencyKey:
+        """
+        Insert the key row (caller owns the transaction).
+        
+        A concurrent duplicate blocks on the unique index until this
+        transaction ends, then fails with IntegrityError. An expired row
+        with the same key is replaced.
+        """
+        self.db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        record = IdempotencyKey(
+            key=key,
+            request_hash=request_hash,
+            expires_at=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        )
+        self.db.add(record)
+        self.db.flush()
+        return record
+    
+    def complete(self, record: IdempotencyKey, purchase_id: int, response: Dict):
+        record.purchase_id = purchase_id
+        record.response = response
+    
+    def purge_expired(self) -> int:
+        """Delete expired keys and commit; returns the number removed"""
+        result = self.db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at <= datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} expired idempotency key(s)")
+        return result.rowcount
@@ -1,13 +1,54 @@
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from app.models.catalog_version import CatalogVersion
 from app.models.product import Product
 from app.schemas.schemas import ProductCreate, ProductUpdate
 from app.core.exceptions import ResourceNotFoundException
+from app.utils.catalog_cache import CatalogEntry, catalog_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+_CATALOG_COLUMNS = (Product.id, Product.name, Product.price, Product.tax_percent)
+
+CATALOG = "products"
+
+# One primary-key lookup. Every catalog write bumps the version in its own transaction,
+# checkout's stock decrement included, so it moves in commit order (a timestamp does not)
+_WATERMARK = select(CatalogVersion.version).where(CatalogVersion.name == CATALOG)
+
+
+def _name_taken(name: str):
+    """Whether a create failed on the unique name rather than another constraint"""
+    return select(select(Product.id).where(Product.name == name).exists())
+
+
+def bump_catalog_version(db: Session):
+    """Move the catalog version inside the caller's transaction (creates the row on first use)"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(CatalogVersion).values(name=CATALOG, version=1)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[CatalogVersion.name], set_={'version': CatalogVersion.version + 1}
+        ))
+        return
+    result = db.execute(
+        update(CatalogVersion).where(CatalogVersion.name == CATALOG).values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(CatalogVersion(name=CATALOG, version=1))
+        db.flush()
+
+
+def _catalog_entries(rows) -> List[CatalogEntry]:
+    return [CatalogEntry(id=r.id, name=r.name, price=r.price, tax_percent=r.tax_percent) for r in rows]
+
 
 class ProductRepository:
     """Repository pattern for Product operations"""
@@ -20,21 +61,39 @@ class ProductRepository:
         try:
             product = Product(**product_data.model_dump())
             self.db.add(product)
+            bump_catalog_version(self.db)
             self.db.commit()
             self.db.refresh(product)
             logger.info(f"Product created: {product.name}")
             return product
-        except IntegrityError:
+        except IntegrityError as e:
             self.db.rollback()
-            raise ValueError(f"Product with name '{product_data.name}' already exists")
+            if self.db.scalar(_name_taken(product_data.name)):
+                raise ValueError(f"Product with name '{product_data.name}' already exists")
+            raise ValueError(f"Product rejected by the database: {str(e.orig)}")
     
     def get_by_id(self, product_id: int) -> Optional[Product]:
         """Get product by ID"""
         return self.db.query(Product).filter(Product.id == product_id).first()
     
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[Product]:
-        """Get all products with pagination"""
-        return self.db.query(Product).offset(skip).limit(limit).all()
+    def get_catalog_entries(self, product_ids: List[int]) -> Dict[int, CatalogEntry]:
+        """Name/price/tax for many products, read through the catalog cache"""
+        found, missing = catalog_cache.get_many(product_ids)
+        if missing:
+            # Before the SELECT: a write committed meanwhile must not be cached over
+            generation = catalog_cache.generation
+            rows = self.db.query(*_CATALOG_COLUMNS).filter(Product.id.in_(missing)).all()
+            entries = _catalog_entries(rows)
+            catalog_cache.put_many(entries, generation)
+            found.update((entry.id, entry) for entry in entries)
+        return found
+    
+    def get_all(self, limit: int = 100, after_id: Optional[int] = None) -> List[Product]:
+        """Get products in ID order, starting after the keyset `after_id`"""
+        query = self.db.query(Product)
+        if after_id is not None:
+            query = query.filter(Product.id > after_id)
+        return query.order_by(Product.id).limit(limit).all()
     
     def update(self, product_id: int, product_data: ProductUpdate) -> Product:
         """Update product"""
@@ -46,7 +105,9 @@ class ProductRepository:
         for field, value in update_data.items():
             setattr(product, field, value)
         
+        bump_catalog_version(self.db)
         self.db.commit()
+        catalog_cache.invalidate(product_id)
         self.db.refresh(product)
         logger.info(f"Product updated: {product.name}")
         return product
@@ -58,10 +119,181 @@ class ProductRepository:
             raise ResourceNotFoundException(f"Product with ID {product_id} not found")
         
         self.db.delete(product)
+        bump_catalog_version(self.db)
         self.db.commit()
+        catalog_cache.invalidate(product_id)
         logger.info(f"Product deleted: {product.name}")
         return True
     
     def count(self) -> int:
         """Get total product count"""
         return self.db.query(Product).count()
+    
+    def get_watermark(self) -> int:
+        """Catalog version: changes with any product write, stock change or delete"""
+        return self.db.scalar(_WATERMARK) or 0
+    
+    def bulk_upsert(self, rows: List[Dict]) -> int:
+        """
+        Insert or update products keyed on the unique name in one statement.
+        
+        Uses the dialect's INSERT ... ON CONFLICT (name) DO UPDATE; other
+        backends fall back to a lookup plus per-row insert/update. Bumps the
+        catalog version. The caller commits and invalidates the catalog
+        cache. Returns the number of rows written.
+        """
+        if not rows:
+            return 0
+        # ON CONFLICT cannot touch the same row twice in one statement: last row wins
+        rows = list({row['name']: row for row in rows}.values())
+        now = datetime.utcnow()
+        
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(Product).values([{**row, 'created_at': now, 'updated_at': now, 'version': 1} for row in rows])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Product.name],
+                set_={
+                    'stock': stmt.excluded.stock,
+                    'price': stmt.excluded.price,
+                    'tax_percent': stmt.excluded.tax_percent,
+                    'updated_at': now,
+                    'version': Product.version + 1
+                }
+            )
+            self.db.execute(stmt)
+        else:
+            existing = {
+                name: product_id
+                for product_id, name in self.db.query(Product.id, Product.name)
+                .filter(Product.name.in_([row['name'] for row in rows]))
+            }
+            for row in rows:
+                if row['name'] in existing:
+                    self.db.execute(
+                        update(Product)
+                        .where(Product.id == existing[row['name']])
+                        .values(**row, updated_at=now, version=Product.version + 1)
+                        .execution_options(synchronize_session=False)
+                    )
+                else:
+                    self.db.add(Product(**row))
+            self.db.flush()
+        
+        bump_catalog_version(self.db)
+        return len(rows)
+    
+    def bulk_upsert_isolated(self, rows: List[Dict]) -> Tuple[int, Dict[int, str]]:
+        """
+        bulk_upsert inside a savepoint. If the database rejects it, retry row
+        by row, each in its own savepoint, so a bad row fails alone. Returns
+        (rows written, {position in rows: error}); the caller commits.
+        """
+        try:
+            with self.db.begin_nested():
+                return self.bulk_upsert(rows), {}
+        except SQLAlchemyError as e:
+            logger.warning(f"Product upsert rejected, isolating rows: {str(e).splitlines()[0]}")
+        
+        written = 0
+        rejected: Dict[int, str] = {}
+        for position, row in enumerate(rows):
+            try:
+                with self.db.begin_nested():
+                    written += self.bulk_upsert([row])
+            except SQLAlchemyError as e:
+                rejected[position] = str(e).splitlines()[0]
+        return written, rejected
+
+
+class AsyncProductRepository:
+    """Async repository for Product operations (AsyncSession)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create(self, product_data: ProductCreate) -> Product:
+        """Create a new product"""
+        try:
+            product = Product(**product_data.model_dump())
+            self.db.add(product)
+            await self.db.run_sync(bump_catalog_version)
+            await self.db.commit()
+            await self.db.refresh(product)
+            logger.info(f"Product created: {product.name}")
+            return product
+        except IntegrityError as e:
+            await self.db.rollback()
+            if await self.db.scalar(_name_taken(product_data.name)):
+                raise ValueError(f"Product with name '{product_data.name}' already exists")
+            raise ValueError(f"Product rejected by the database: {str(e.orig)}")
+    
+    async def get_by_id(self, product_id: int) -> Optional[Product]:
+        """Get product by ID"""
+        return await self.db.scalar(select(Product).where(Product.id == product_id))
+    
+    async def get_catalog_entries(self, product_ids: List[int]) -> Dict[int, CatalogEntry]:
+        """Name/price/tax for many products, read through the catalog cache"""
+        found, missing = catalog_cache.get_many(product_ids)
+        if missing:
+            generation = catalog_cache.generation
+            result = await self.db.execute(select(*_CATALOG_COLUMNS).where(Product.id.in_(missing)))
+            entries = _catalog_entries(result.all())
+            catalog_cache.put_many(entries, generation)
+            found.update((entry.id, entry) for entry in entries)
+        return found
+    
+    async def get_all(self, limit: int = 100, after_id: Optional[int] = None) -> List[Product]:
+        """Get products in ID order, starting after the keyset `after_id`"""
+        stmt = select(Product)
+        if after_id is not None:
+            stmt = stmt.where(Product.id > after_id)
+        result = await self.db.scalars(stmt.order_by(Product.id).limit(limit))
+        return list(result.all())
+    
+    async def get_watermark(self) -> int:
+        """Catalog version: changes with any product write, stock change or delete"""
+        return await self.db.scalar(_WATERMARK) or 0
+    
+    async def update(self, product_id: int, product_data: ProductUpdate) -> Product:
+        """Update product"""
+        product = await self.get_by_id(product_id)
+        if not product:
+            raise ResourceNotFoundException(f"Product with ID {product_id} not found")
+        
+        update_data = product_data.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(product, field, value)
+        
+        await self.db.run_sync(bump_catalog_version)
+        await self.db.commit()
+        catalog_cache.invalidate(product_id)
+        await self.db.refresh(product)
+        logger.info(f"Product updated: {product.name}")
+        return product
+    
+    async def delete(self, product_id: int) -> bool:
+        """Delete product"""
+        product = await self.get_by_id(product_id)
+        if not product:
+            raise ResourceNotFoundException(f"Product with ID {product_id} not found")
+        
+        await self.db.delete(product)
+        await self.db.run_sync(bump_catalog_version)
+        await self.db.commit()
+        catalog_cache.invalidate(product_id)
+        logger.info(f"Product deleted: {product.name}")
+        return True
+    
+    async def count(self) -> int:
+        """Get total product count"""
+        return await self.db.scalar(select(func.count()).select_from(Product))
+    
+    async def bulk_upsert(self, rows: List[Dict]) -> int:
+        """Insert or update products keyed on the unique name (caller commits)"""
+        return await self.db.run_sync(lambda session: ProductRepository(session).bulk_upsert(rows))
+    
+    async def bulk_upsert_isolated(self, rows: List[Dict]) -> Tuple[int, Dict[int, str]]:
+        """bulk_upsert with a row-by-row savepoint fallback (caller commits)"""
+        return await self.db.run_sync(lambda session: ProductRepository(session).bulk_upsert_isolated(rows))
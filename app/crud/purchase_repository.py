@@ -1,12 +1,141 @@
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Row
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from datetime import datetime
+from app.db.types import stored_minor
 from app.models.purchase import Purchase
+from app.models.purchase_item import PurchaseItem
+from app.models.customer import Customer
 from app.core.exceptions import ResourceNotFoundException
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Keyset pagination key: (created_at, id) descending, served by idx_purchase_created_at
+PurchaseKey = Tuple[datetime, int]
+
+
+def _keyset(stmt, customer_email: Optional[str], after: Optional[PurchaseKey], limit: int):
+    """Apply the customer filter, keyset predicate, ordering and limit"""
+    if customer_email:
+        stmt = stmt.join(Customer, Purchase.customer_id == Customer.id).where(Customer.email == customer_email)
+    if after:
+        created_at, purchase_id = after
+        stmt = stmt.where(
+            or_(
+                Purchase.created_at < created_at,
+                and_(Purchase.created_at == created_at, Purchase.id < purchase_id)
+            )
+        )
+    return stmt.order_by(Purchase.created_at.desc(), Purchase.id.desc()).limit(limit)
+
+
+def _list_select(customer_email: Optional[str], after: Optional[PurchaseKey], limit: int):
+    """Full purchase listing; collections load in one extra IN query each"""
+    stmt = select(Purchase).options(
+        joinedload(Purchase.customer),
+        selectinload(Purchase.purchase_items)
+    )
+    if customer_email:
+        # selectinload: joining two collections would multiply rows before LIMIT
+        stmt = stmt.options(selectinload(Purchase.purchase_denominations))
+    return _keyset(stmt, customer_email, after, limit)
+
+
+def _summary_select(customer_email: Optional[str], after: Optional[PurchaseKey], limit: int):
+    """
+    Column projection for purchase listings: one query, no ORM graph.
+    
+    Line items are reduced to a correlated count so the row count per page
+    never depends on cart size.
+    """
+    item_count = (
+        select(func.count(PurchaseItem.id))
+        .where(PurchaseItem.purchase_id == Purchase.id)
+        .correlate(Purchase)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            Purchase.id,
+            Purchase.customer_id,
+            Customer.email.label('customer_email'),
+            Purchase.total_amount,
+            Purchase.tax_amount,
+            Purchase.final_amount,
+            Purchase.paid_amount,
+            Purchase.balance_amount,
+            Purchase.created_at,
+            item_count.label('item_count')
+        )
+        .join(Customer, Purchase.customer_id == Customer.id)
+    )
+    if customer_email:
+        stmt = stmt.where(Customer.email == customer_email)
+    return _keyset(stmt, None, after, limit)
+
+
+def _count_select(customer_email: Optional[str]):
+    stmt = select(func.count(Purchase.id))
+    if customer_email:
+        stmt = stmt.join(Customer, Purchase.customer_id == Customer.id).where(Customer.email == customer_email)
+    return stmt
+
+
+def _export_select(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    customer_id: Optional[int],
+    customer_email: Optional[str]
+):
+    """
+    One flat row per purchase line, oldest bill first, amounts as stored integers.
+    
+    Columns are labelled with the export field names (EXPORT_COLUMNS).
+    
+    The window is a range on purchases.created_at (idx_purchase_created_at)
+    and the customer filter an equality on purchases.customer_id
+    (idx_purchase_customer); an email is resolved to its ID in a scalar
+    subquery so the planner can still use that index.
+    """
+    stmt = (
+        select(
+            Purchase.id.label('purchase_id'),
+            Purchase.created_at,
+            Purchase.customer_id,
+            Customer.email.label('customer_email'),
+            stored_minor(Purchase.total_amount).label('bill_total_amount'),
+            stored_minor(Purchase.tax_amount).label('bill_tax_amount'),
+            stored_minor(Purchase.final_amount).label('bill_final_amount'),
+            stored_minor(Purchase.paid_amount).label('paid_amount'),
+            stored_minor(Purchase.balance_amount).label('balance_amount'),
+            PurchaseItem.id.label('item_id'),
+            PurchaseItem.product_id,
+            PurchaseItem.quantity,
+            stored_minor(PurchaseItem.unit_price_snapshot).label('unit_price'),
+            stored_minor(PurchaseItem.tax_percent_snapshot).label('tax_percent'),
+            stored_minor(PurchaseItem.tax_amount).label('tax_amount'),
+            stored_minor(PurchaseItem.total_price).label('total_price')
+        )
+        .join(Customer, Purchase.customer_id == Customer.id)
+        .join(PurchaseItem, PurchaseItem.purchase_id == Purchase.id)
+    )
+    if start:
+        stmt = stmt.where(Purchase.created_at >= start)
+    if end:
+        stmt = stmt.where(Purchase.created_at < end)
+    if customer_id is not None:
+        stmt = stmt.where(Purchase.customer_id == customer_id)
+    if customer_email:
+        stmt = stmt.where(
+            Purchase.customer_id == select(Customer.id).where(Customer.email == customer_email).scalar_subquery()
+        )
+    return stmt.order_by(Purchase.created_at, Purchase.id, PurchaseItem.id)
+
+
 class PurchaseRepository:
     """Repository pattern for Purchase operations"""
     
@@ -19,42 +148,93 @@ class PurchaseRepository:
             self.db.query(Purchase)
             .options(
                 joinedload(Purchase.customer),
-                joinedload(Purchase.purchase_items),
-                joinedload(Purchase.purchase_denominations)
+                selectinload(Purchase.purchase_items),
+                selectinload(Purchase.purchase_denominations)
             )
             .filter(Purchase.id == purchase_id)
             .first()
         )
     
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[Purchase]:
-        """Get all purchases with pagination"""
-        return (
-            self.db.query(Purchase)
-            .options(joinedload(Purchase.customer))
-            .order_by(Purchase.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+    def get_all(self, limit: int = 100, after: Optional[PurchaseKey] = None) -> List[Purchase]:
+        """Get purchases newest first, starting after the keyset `after`"""
+        return list(self.db.scalars(_list_select(None, after, limit)).all())
     
-    def get_by_customer_email(self, email: str, skip: int = 0, limit: int = 100) -> List[Purchase]:
+    def get_by_customer_email(self, email: str, limit: int = 100, after: Optional[PurchaseKey] = None) -> List[Purchase]:
         """Get purchases by customer email"""
-        from app.models.customer import Customer
-        return (
-            self.db.query(Purchase)
-            .join(Customer, Purchase.customer_id == Customer.id)
-            .filter(Customer.email == email)
+        return list(self.db.scalars(_list_select(email, after, limit)).all())
+    
+    def get_summaries(self, customer_email: Optional[str] = None, limit: int = 100, after: Optional[PurchaseKey] = None) -> List[Row]:
+        """Lean purchase listing without line items"""
+        return self.db.execute(_summary_select(customer_email, after, limit)).all()
+    
+    def count(self, customer_email: Optional[str] = None) -> int:
+        """Get total purchase count"""
+        return self.db.scalar(_count_select(customer_email))
+    
+    def iter_export_rows(
+        self,
+        chunk_size: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        customer_id: Optional[int] = None,
+        customer_email: Optional[str] = None
+    ) -> Iterator[List[Row]]:
+        """Stream flat export rows chunk_size at a time over a server-side cursor (yield_per)"""
+        stmt = _export_select(start, end, customer_id, customer_email).execution_options(yield_per=chunk_size)
+        yield from self.db.execute(stmt).partitions()
+
+
+class AsyncPurchaseRepository:
+    """
+    Async repository for Purchase operations (AsyncSession).
+    
+    Lazy loading cannot run under AsyncSession, so every relationship the
+    response serializes is loaded eagerly here.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_id(self, purchase_id: int) -> Optional[Purchase]:
+        """Get purchase by ID with all relationships loaded"""
+        return await self.db.scalar(
+            select(Purchase)
             .options(
                 joinedload(Purchase.customer),
-                joinedload(Purchase.purchase_items),
-                joinedload(Purchase.purchase_denominations)
+                selectinload(Purchase.purchase_items),
+                selectinload(Purchase.purchase_denominations)
             )
-            .order_by(Purchase.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .where(Purchase.id == purchase_id)
         )
     
-    def count(self) -> int:
+    async def get_all(self, limit: int = 100, after: Optional[PurchaseKey] = None) -> List[Purchase]:
+        """Get purchases newest first, starting after the keyset `after`"""
+        result = await self.db.scalars(_list_select(None, after, limit))
+        return list(result.all())
+    
+    async def get_by_customer_email(self, email: str, limit: int = 100, after: Optional[PurchaseKey] = None) -> List[Purchase]:
+        """Get purchases by customer email"""
+        result = await self.db.scalars(_list_select(email, after, limit))
+        return list(result.all())
+    
+    async def get_summaries(self, customer_email: Optional[str] = None, limit: int = 100, after: Optional[PurchaseKey] = None) -> List[Row]:
+        """Lean purchase listing without line items"""
+        result = await self.db.execute(_summary_select(customer_email, after, limit))
+        return list(result.all())
+    
+    async def count(self, customer_email: Optional[str] = None) -> int:
         """Get total purchase count"""
-        return self.db.query(Purchase).count()
+        return await self.db.scalar(_count_select(customer_email))
+    
+    async def iter_export_rows(
+        self,
+        chunk_size: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        customer_id: Optional[int] = None,
+        customer_email: Optional[str] = None
+    ) -> AsyncIterator[List[Row]]:
+        """Stream flat export rows chunk_size at a time over a server-side cursor (AsyncSession.stream)"""
+        result = await self.db.stream(_export_select(start, end, customer_id, customer_email))
+        async for partition in result.partitions(chunk_size):
+            yield partition
@@ -0,0 +1,128 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime
+from app.db.types import stored_minor
+from app.models.customer import Customer
+from app.models.customer_sales_rollup import CustomerSalesRollup
+from app.models.product import Product
+from app.models.product_sales_rollup import ProductSalesRollup
+from app.models.purchase import Purchase
+from app.models.purchase_item import PurchaseItem
+from app.models.sales_rollup import SalesRollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (purchase_id, product_id, quantity, unit price in paise, tax in basis points)
+LineSnapshot = Tuple[int, int, int, int, int]
+
+
+def _rollup_sums(model):
+    """bills, units, revenue paise, tax paise summed over rollup rows"""
+    return (
+        func.sum(model.bills),
+        func.sum(model.units),
+        func.sum(stored_minor(model.revenue)),
+        func.sum(stored_minor(model.tax))
+    )
+
+
+def _leaderboard_select(model, key_column, parent, label_column, start: date, end: date, limit: int):
+    """Top keys of a rollup table by revenue over [start, end], labelled from the parent table"""
+    revenue = func.sum(stored_minor(model.revenue))
+    return (
+        select(key_column, label_column, *_rollup_sums(model))
+        .join(parent, parent.id == key_column)
+        .where(model.day >= start, model.day <= end)
+        .group_by(key_column, label_column)
+        .order_by(revenue.desc(), key_column)
+        .limit(limit)
+    )
+
+
+class ReportRepository:
+    """Read-only queries behind /reports"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def iter_line_snapshots(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        chunk_size: int
+    ) -> Iterator[List[LineSnapshot]]:
+        """
+        Stream historic line snapshots in purchase order, chunk_size rows at a time.
+        
+        Rows are fetched with yield_per (a server-side cursor on PostgreSQL),
+        so memory stays flat however many lines the window holds.
+        """
+        stmt = select(
+            PurchaseItem.purchase_id,
+            PurchaseItem.product_id,
+            PurchaseItem.quantity,
+            stored_minor(PurchaseItem.unit_price_snapshot),
+            stored_minor(PurchaseItem.tax_percent_snapshot)
+        )
+        if start or end:
+            stmt = stmt.join(Purchase, PurchaseItem.purchase_id == Purchase.id)
+            if start:
+                stmt = stmt.where(Purchase.created_at >= start)
+            if end:
+                stmt = stmt.where(Purchase.created_at < end)
+        stmt = stmt.order_by(PurchaseItem.purchase_id, PurchaseItem.id).execution_options(yield_per=chunk_size)
+        
+        for partition in self.db.execute(stmt).partitions():
+            yield [tuple(row) for row in partition]
+    
+    def get_current_pricing(self) -> Dict[int, Tuple[int, int]]:
+        """product_id -> (price in paise, tax in basis points) for the whole catalogue"""
+        rows = self.db.execute(select(Product.id, stored_minor(Product.price), stored_minor(Product.tax_percent))).all()
+        return {product_id: (price, tax) for product_id, price, tax in rows}
+    
+    def get_sales_series(
+        self,
+        start: date,
+        end: date,
+        hourly: bool = False,
+        product_id: Optional[int] = None,
+        customer_id: Optional[int] = None
+    ) -> List[Tuple]:
+        """
+        (day, hour, bills, units, revenue paise, tax paise) per bucket over [start, end].
+        
+        Reads only the rollup tables, so the cost grows with the days in
+        the window, not with the purchases. Store-wide series come from the
+        hourly rollup; product and customer series are daily. hour is None
+        for daily buckets.
+        """
+        if product_id is not None:
+            model, key = ProductSalesRollup, ProductSalesRollup.product_id == product_id
+        elif customer_id is not None:
+            model, key = CustomerSalesRollup, CustomerSalesRollup.customer_id == customer_id
+        else:
+            model, key = SalesRollup, None
+        buckets = [model.day, model.hour] if hourly and model is SalesRollup else [model.day]
+        stmt = select(*buckets, *_rollup_sums(model)).where(model.day >= start, model.day <= end)
+        if key is not None:
+            stmt = stmt.where(key)
+        rows = self.db.execute(stmt.group_by(*buckets).order_by(*buckets)).all()
+        if len(buckets) == 2:
+            return [tuple(row) for row in rows]
+        return [(day, None, *sums) for day, *sums in rows]
+    
+    def get_top_products(self, start: date, end: date, limit: int) -> List[Tuple]:
+        """(product_id, name, bills, units, revenue paise, tax paise), highest revenue first"""
+        stmt = _leaderboard_select(
+            ProductSalesRollup, ProductSalesRollup.product_id, Product, Product.name, start, end, limit
+        )
+        return [tuple(row) for row in self.db.execute(stmt).all()]
+    
+    def get_top_customers(self, start: date, end: date, limit: int) -> List[Tuple]:
+        """(customer_id, email, bills, units, revenue paise, tax paise), highest revenue first"""
+        stmt = _leaderboard_select(
+            CustomerSalesRollup, CustomerSalesRollup.customer_id, Customer, Customer.email, start, end, limit
+        )
+        return [tuple(row) for row in self.db.execute(stmt).all()]
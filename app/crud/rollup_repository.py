@@ -0,0 +1,139 @@
+from sqlalchemy import false, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Tuple
+from datetime import datetime
+from app.db.types import stored_minor
+from app.models.purchase import Purchase
+from app.models.purchase_item import PurchaseItem
+from app.models.rollup_watermark import RollupWatermark
+from app.utils.money import to_rupees
+import logging
+
+logger = logging.getLogger(__name__)
+
+# rollup key (e.g. (day, product_id)) -> [bills, units, revenue in paise, tax in paise]
+RollupDeltas = Dict[Tuple, List[int]]
+
+ROLLUP_MEASURES = ('bills', 'units', 'revenue', 'tax')
+
+
+class RollupRepository:
+    """Maintenance queries for the sales rollup tables (the caller commits rollup writes)"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def read_watermark(self, name: str) -> int:
+        """Last purchase ID folded into the rollups, 0 before the first fold (never writes; safe on a replica)"""
+        return self.db.scalar(select(RollupWatermark.last_purchase_id).where(RollupWatermark.name == name)) or 0
+    
+    def get_watermark(self, name: str) -> int:
+        """Last purchase ID folded into the rollups, creating the watermark on first use (primary only)"""
+        value = self.db.scalar(select(RollupWatermark.last_purchase_id).where(RollupWatermark.name == name))
+        if value is not None:
+            return value
+        try:
+            self.db.add(RollupWatermark(name=name, last_purchase_id=0))
+            self.db.commit()
+        except IntegrityError:
+            # Another worker created it first
+            self.db.rollback()
+        return self.db.scalar(select(RollupWatermark.last_purchase_id).where(RollupWatermark.name == name))
+    
+    def advance_watermark(self, name: str, last_purchase_id: int):
+        """Move the watermark forward to last_purchase_id (never back: a late, lower ID may fold after a higher one)"""
+        self.db.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == name, RollupWatermark.last_purchase_id < last_purchase_id)
+            .values(last_purchase_id=last_purchase_id, updated_at=datetime.utcnow())
+        )
+    
+    def claim_pending_purchases(self, limit: int) -> List[Tuple[int, int, datetime, int, int]]:
+        """
+        Lock and mark up to `limit` committed purchases not yet folded, in ID order.
+        
+        Returns their (id, customer_id, created_at, final paise, tax paise).
+        SKIP LOCKED lets concurrent workers claim disjoint batches on
+        PostgreSQL; the guarded UPDATE catches an overlap elsewhere, in which
+        case nothing is returned and the caller must roll back.
+        """
+        stmt = (
+            select(
+                Purchase.id,
+                Purchase.customer_id,
+                Purchase.created_at,
+                stored_minor(Purchase.final_amount),
+                stored_minor(Purchase.tax_amount)
+            )
+            .where(Purchase.rolled_up == false())
+            .order_by(Purchase.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        purchases = [tuple(row) for row in self.db.execute(stmt).all()]
+        if not purchases:
+            return []
+        
+        result = self.db.execute(
+            update(Purchase)
+            .where(Purchase.id.in_([row[0] for row in purchases]), Purchase.rolled_up == false())
+            .values(rolled_up=True)
+            .execution_options(synchronize_session=False)
+        )
+        return purchases if result.rowcount == len(purchases) else []
+    
+    def get_items_for(self, purchase_ids: List[int]) -> List[Tuple[int, int, int, int, int]]:
+        """(purchase_id, product_id, quantity, line total paise, line tax paise) of the given purchases"""
+        stmt = select(
+            PurchaseItem.purchase_id,
+            PurchaseItem.product_id,
+            PurchaseItem.quantity,
+            stored_minor(PurchaseItem.total_price),
+            stored_minor(PurchaseItem.tax_amount)
+        ).where(PurchaseItem.purchase_id.in_(purchase_ids))
+        return [tuple(row) for row in self.db.execute(stmt).all()]
+    
+    def increment(self, model, key_columns: Tuple[str, ...], deltas: RollupDeltas) -> int:
+        """
+        Add deltas onto rollup rows keyed by key_columns, creating missing rows.
+        
+        Uses the dialect's INSERT ... ON CONFLICT DO UPDATE with col = col +
+        excluded.col, sent as one executemany of a single cached statement;
+        other backends fall back to UPDATE-then-INSERT per row. Returns the
+        number of rows written.
+        """
+        if not deltas:
+            return 0
+        rows = [
+            {
+                **dict(zip(key_columns, key)),
+                'bills': bills,
+                'units': units,
+                'revenue': to_rupees(revenue),
+                'tax': to_rupees(tax)
+            }
+            for key, (bills, units, revenue, tax) in deltas.items()
+        ]
+        table = model.__table__
+        
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c[column] for column in key_columns],
+                set_={column: table.c[column] + stmt.excluded[column] for column in ROLLUP_MEASURES}
+            )
+            self.db.execute(stmt, rows)
+        else:
+            for row in rows:
+                result = self.db.execute(
+                    update(table)
+                    .where(*(table.c[column] == row[column] for column in key_columns))
+                    .values({column: table.c[column] + row[column] for column in ROLLUP_MEASURES})
+                )
+                if result.rowcount == 0:
+                    self.db.execute(table.insert().values(row))
+        return len(rows)
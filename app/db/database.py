@@ -1,33 +1,56 @@
+from fastapi import Request
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from sqlalchemy.pool import QueuePool
 from app.core.config import get_settings
+from app.core.metrics import (
+    TimedAsyncQueuePool, TimedAsyncReadQueuePool, TimedQueuePool, TimedReadQueuePool, instrument_engine
+)
+from app.db.engine_profiles import apply_connect_profile, engine_options
+from functools import lru_cache
+from typing import AsyncIterator, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Production-grade engine with connection pooling
+# Request header for read-your-writes: "primary" sends a read-only endpoint to the primary
+READ_CONSISTENCY_HEADER = "X-Read-Consistency"
+
+# Pool and connection settings come from the backend's profile (app/db/engine_profiles.py)
 engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=False,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    settings.DATABASE_URL, echo=False, **engine_options(settings.DATABASE_URL, settings, TimedQueuePool)
 )
+apply_connect_profile(engine, settings)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Read replica for read-only endpoints; without READ_DATABASE_URL it is the primary itself
+if settings.READ_DATABASE_URL:
+    read_engine = create_engine(
+        settings.READ_DATABASE_URL, echo=False,
+        **engine_options(settings.READ_DATABASE_URL, settings, TimedReadQueuePool)
+    )
+    apply_connect_profile(read_engine, settings)
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 
 @event.listens_for(engine, "connect")
 def receive_connect(dbapi_conn, connection_record):
     logger.debug("Database connection established")
 
 
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    if read_engine is not engine:
+        instrument_engine(read_engine, "read")
+
+
 def get_db() -> Session:
     """Dependency for database session with proper cleanup"""
     db = SessionLocal()
@@ -37,6 +60,112 @@ def get_db() -> Session:
         db.close()
 
 
+def wants_primary(request: Request) -> bool:
+    return request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "primary"
+
+
+def get_read_db(request: Request) -> Session:
+    """
+    Dependency for read-only endpoints: a session on the read replica, or
+    on the primary when no replica is configured or the request asks for
+    it (X-Read-Consistency: primary). Replica reads may lag the primary.
+    """
+    db = SessionLocal() if wants_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def is_replica(db: Session) -> bool:
+    """True when the session reads from a separate replica (so recent writes may be missing)"""
+    return read_engine is not engine and db.get_bind() is read_engine
+
+
+def _async_driver_url(url: str) -> str:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    """Async driver URL: ASYNC_DATABASE_URL, or DATABASE_URL with an async driver"""
+    return settings.ASYNC_DATABASE_URL or _async_driver_url(settings.DATABASE_URL)
+
+
+def get_async_read_database_url() -> Optional[str]:
+    """Async replica URL: ASYNC_READ_DATABASE_URL, or READ_DATABASE_URL with an async driver"""
+    if settings.ASYNC_READ_DATABASE_URL:
+        return settings.ASYNC_READ_DATABASE_URL
+    return _async_driver_url(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else None
+
+
+def _create_async_engine(url: str, poolclass, pool_name: str) -> AsyncEngine:
+    async_engine = create_async_engine(url, echo=False, **engine_options(url, settings, poolclass))
+    apply_connect_profile(async_engine.sync_engine, settings)
+    if settings.METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine, pool_name)
+    return async_engine
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """Async engine, created on first use so the async drivers stay optional"""
+    return _create_async_engine(get_async_database_url(), TimedAsyncQueuePool, "async")
+
+
+@lru_cache()
+def get_async_read_engine() -> AsyncEngine:
+    """Async replica engine; the async primary when no replica is configured"""
+    url = get_async_read_database_url()
+    if url is None:
+        return get_async_engine()
+    return _create_async_engine(url, TimedAsyncReadQueuePool, "async_read")
+
+
+@lru_cache()
+def get_async_sessionmaker() -> async_sessionmaker:
+    # expire_on_commit=False: expired attributes would need lazy IO during serialization
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+@lru_cache()
+def get_async_read_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(bind=get_async_read_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for async database session with proper cleanup"""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Async get_read_db: the replica unless none is configured or the request asks for the primary"""
+    factory = get_async_sessionmaker() if wants_primary(request) else get_async_read_sessionmaker()
+    async with factory() as db:
+        yield db
+
+
+def is_async_replica(db: AsyncSession) -> bool:
+    read = get_async_read_engine()
+    return read is not get_async_engine() and db.bind is read
+
+
 def init_db():
     """Initialize database tables"""
+    from app.db.migrations import (
+        add_missing_columns, add_missing_indexes, backfill_customer_stats, backfill_rollup_flags,
+        convert_fixed_point_columns, replace_stale_unique_constraints
+    )
+    
     Base.metadata.create_all(bind=engine)
+    added_columns = add_missing_columns(engine, Base.metadata)
+    convert_fixed_point_columns(engine, Base.metadata)
+    backfill_customer_stats(engine, added_columns)
+    backfill_rollup_flags(engine, added_columns)
+    replace_stale_unique_constraints(engine, Base.metadata)
+    add_missing_indexes(engine, Base.metadata)
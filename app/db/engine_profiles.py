@@ -0,0 +1,119 @@
+"""
+Per-backend engine profiles, driven by Settings.
+
+Pool: every file or server database gets a (timed) QueuePool sized by
+DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT. In-memory SQLite keeps
+SQLAlchemy's single-connection pool, since each new connection would be a
+new, empty database.
+
+SQLite: pooled connections skip the pre-ping and recycle (there is no
+server to drop them) and every new connection runs the SQLITE_* pragmas.
+WAL lets readers work alongside the single writer, synchronous=NORMAL
+syncs at checkpoints instead of on every commit (still safe against
+corruption in WAL mode), and busy_timeout makes a second writer wait for
+the lock instead of failing with "database is locked".
+
+PostgreSQL: statement_timeout / lock_timeout are set per session through
+the connection startup options, and asyncpg / psycopg 3 prepare repeated
+statements server-side. psycopg2 has no server-side prepared statements;
+switch DATABASE_URL to postgresql+psycopg:// to get them on the sync path.
+Turn POSTGRES_PREPARED_STATEMENTS off behind PgBouncer in transaction mode.
+"""
+from typing import Dict
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine, make_url
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+PSYCOPG_PREPARE_THRESHOLD = 5  # executions before psycopg 3 prepares a statement (its own default)
+
+
+def is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def sqlite_pragmas(config: Settings) -> Dict[str, object]:
+    return {
+        'journal_mode': config.SQLITE_JOURNAL_MODE,
+        'synchronous': config.SQLITE_SYNCHRONOUS,
+        'busy_timeout': config.SQLITE_BUSY_TIMEOUT_MS,
+        'mmap_size': config.SQLITE_MMAP_SIZE,
+        'cache_size': config.SQLITE_CACHE_SIZE,
+    }
+
+
+def _postgres_session_settings(config: Settings) -> Dict[str, str]:
+    """Server settings applied to every new session (0 leaves the server default)"""
+    timeouts = {
+        'statement_timeout': config.POSTGRES_STATEMENT_TIMEOUT_MS,
+        'lock_timeout': config.POSTGRES_LOCK_TIMEOUT_MS,
+    }
+    return {name: str(value) for name, value in timeouts.items() if value}
+
+
+def _postgres_connect_args(url: URL, config: Settings) -> Dict:
+    session_settings = _postgres_session_settings(config)
+    driver = url.get_driver_name()
+    if driver == "asyncpg":
+        return {
+            'server_settings': session_settings,
+            'prepared_statement_cache_size': (
+                config.POSTGRES_STATEMENT_CACHE_SIZE if config.POSTGRES_PREPARED_STATEMENTS else 0
+            ),
+        }
+    
+    connect_args = {}
+    if session_settings:
+        connect_args['options'] = " ".join(f"-c {name}={value}" for name, value in session_settings.items())
+    if driver == "psycopg":
+        connect_args['prepare_threshold'] = (
+            PSYCOPG_PREPARE_THRESHOLD if config.POSTGRES_PREPARED_STATEMENTS else None
+        )
+    elif config.POSTGRES_PREPARED_STATEMENTS:
+        logger.info(f"Driver {driver} has no server-side prepared statements; use postgresql+psycopg for them")
+    return connect_args
+
+
+def engine_options(url, config: Settings, poolclass) -> Dict:
+    """Keyword arguments for create_engine / create_async_engine under the backend's profile"""
+    url = make_url(url)
+    if is_memory_sqlite(url):
+        return {'connect_args': {"check_same_thread": False}} if url.get_driver_name() == "pysqlite" else {}
+    
+    options = {
+        'poolclass': poolclass,
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+    }
+    if url.get_backend_name() == "sqlite":
+        if url.get_driver_name() == "pysqlite":
+            options['connect_args'] = {"check_same_thread": False}
+        return options
+    
+    options.update(pool_pre_ping=config.DB_POOL_PRE_PING, pool_recycle=config.DB_POOL_RECYCLE)
+    if url.get_backend_name() == "postgresql":
+        options['connect_args'] = _postgres_connect_args(url, config)
+    return options
+
+
+def apply_connect_profile(engine: Engine, config: Settings):
+    """Connection-level settings that cannot go through connect_args (SQLite pragmas)"""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(config)
+    if is_memory_sqlite(engine.url):
+        pragmas.pop('journal_mode')  # in-memory databases only support MEMORY / OFF
+    
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
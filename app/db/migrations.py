@@ -0,0 +1,225 @@
+from sqlalchemy import Integer, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import AddConstraint, CreateColumn, MetaData, Table, UniqueConstraint
+from typing import Dict, Optional, Set, Tuple
+import logging
+
+from app.db.types import FixedPoint
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine: Engine, metadata: MetaData) -> Set[Tuple[str, str]]:
+    """
+    Additive schema migration for existing databases.
+
+    `create_all` only creates missing tables, so columns added to a model
+    later never reach an existing database. This adds every missing column
+    that can be added safely (nullable or with a server default) and
+    returns the (table, column) pairs it added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = set()
+
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+
+                if not column.nullable and column.server_default is None:
+                    logger.warning(
+                        f"Cannot add NOT NULL column {table.name}.{column.name} without a server default"
+                    )
+                    continue
+
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.add((table.name, column.name))
+                logger.info(f"Added column {table.name}.{column.name}")
+    return added
+
+
+def backfill_customer_stats(engine: Engine, added_columns: Set[Tuple[str, str]]):
+    """
+    Seed the running customer aggregates from purchase history.
+
+    Only needed once, when add_missing_columns has just created them on an
+    existing database; from then on checkout keeps them current. Runs after
+    convert_fixed_point_columns so final_amount is already in paise.
+    """
+    stats = {'bill_count', 'lifetime_spend', 'last_purchase_id', 'last_purchase_at'}
+    if not any(table == "customers" and column in stats for table, column in added_columns):
+        return
+
+    with engine.begin() as conn:
+        result = conn.execute(text(
+            "UPDATE customers SET "
+            "bill_count = (SELECT COUNT(*) FROM purchases p WHERE p.customer_id = customers.id), "
+            "lifetime_spend = COALESCE((SELECT SUM(p.final_amount) FROM purchases p WHERE p.customer_id = customers.id), 0), "
+            "last_purchase_id = (SELECT MAX(p.id) FROM purchases p WHERE p.customer_id = customers.id), "
+            "last_purchase_at = (SELECT p.created_at FROM purchases p WHERE p.id = "
+            "(SELECT MAX(p2.id) FROM purchases p2 WHERE p2.customer_id = customers.id))"
+        ))
+    logger.info(f"Backfilled lifetime stats for {result.rowcount} customer(s)")
+
+
+def backfill_rollup_flags(engine: Engine, added_columns: Set[Tuple[str, str]]):
+    """
+    Mark purchases the sales rollups already hold as folded.
+
+    Only needed once, when add_missing_columns has just created
+    purchases.rolled_up on an existing database: everything up to the old
+    ID watermark was folded, anything after it is left for the next run.
+    """
+    if ("purchases", "rolled_up") not in added_columns:
+        return
+
+    with engine.begin() as conn:
+        result = conn.execute(text(
+            "UPDATE purchases SET rolled_up = TRUE WHERE id <= "
+            "COALESCE((SELECT last_purchase_id FROM rollup_watermarks WHERE name = 'sales'), 0)"
+        ))
+    logger.info(f"Marked {result.rowcount} purchase(s) as already rolled up")
+
+
+def add_missing_indexes(engine: Engine, metadata: MetaData):
+    """Create model indexes that an existing table does not have yet"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            present = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(conn)
+                    logger.info(f"Created index {index.name} on {table.name}")
+
+
+def convert_fixed_point_columns(engine: Engine, metadata: MetaData):
+    """
+    Rescale money/percent columns still stored as floating point.
+
+    A FLOAT column mapped to a FixedPoint type is converted to its integer
+    representation (rupees -> paise, percent -> basis points), rounding
+    half up at the column's scale. PostgreSQL converts in place with
+    ALTER COLUMN ... USING; SQLite rebuilds the table around the new type.
+    Columns already stored as integers are left alone, so this is idempotent.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        reflected = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+        stale = [
+            column for column in table.columns
+            if isinstance(column.type, FixedPoint)
+            and column.name in reflected
+            and not isinstance(reflected[column.name], Integer)
+        ]
+        if not stale:
+            continue
+
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                _rebuild_sqlite_table(conn, inspector, table, {
+                    column.name: (
+                        f"CAST(ROUND(ROUND({column.name}, {column.type.scale}) * {10 ** column.type.scale}) AS INTEGER)"
+                    )
+                    for column in stale
+                })
+                continue
+
+            alterations = ", ".join(
+                f"ALTER COLUMN {column.name} TYPE BIGINT "
+                f"USING ROUND(CAST({column.name} AS NUMERIC) * {10 ** column.type.scale})"
+                for column in stale
+            )
+            conn.execute(text(f"ALTER TABLE {table.name} {alterations}"))
+        logger.info(f"Converted {table.name}.({', '.join(column.name for column in stale)}) to fixed point")
+
+
+def replace_stale_unique_constraints(engine: Engine, metadata: MetaData):
+    """
+    Bring UNIQUE constraints in line with the models when a key was widened
+    (e.g. denominations.value -> (drawer_id, value)).
+
+    PostgreSQL drops the stale constraint and adds the model's. SQLite cannot
+    alter constraints, so the table is rebuilt from the model and its rows
+    copied over.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        expected = {
+            tuple(sorted(column.name for column in constraint.columns))
+            for constraint in table.constraints if isinstance(constraint, UniqueConstraint)
+        }
+        expected.update((column.name,) for column in table.columns if column.unique)
+        reflected = inspector.get_unique_constraints(table.name)
+        stale = [c for c in reflected if tuple(sorted(c['column_names'])) not in expected]
+        if not stale:
+            continue
+
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                _rebuild_sqlite_table(conn, inspector, table)
+                continue
+
+            for constraint in stale:
+                conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{constraint["name"]}"'))
+                logger.info(f"Dropped unique constraint {constraint['name']} on {table.name}")
+            present = {tuple(sorted(c['column_names'])) for c in reflected if c not in stale}
+            for constraint in table.constraints:
+                columns = tuple(sorted(column.name for column in constraint.columns))
+                if isinstance(constraint, UniqueConstraint) and columns not in present:
+                    conn.execute(AddConstraint(constraint))
+                    logger.info(f"Added unique constraint {constraint.name} on {table.name}")
+
+
+def _rebuild_sqlite_table(conn, inspector, table: Table, expressions: Optional[Dict[str, str]] = None):
+    """
+    Recreate a table from its model and copy the rows across.
+
+    The new table is built under a temporary name and renamed over the old
+    one, so foreign keys in other tables keep pointing at the right name.
+    `expressions` optionally transforms columns while they are copied.
+    """
+    expressions = expressions or {}
+    new_name = f"{table.name}_new"
+    names = [column['name'] for column in inspector.get_columns(table.name) if column['name'] in table.columns]
+    columns = ", ".join(names)
+    values = ", ".join(expressions.get(name, name) for name in names)
+    # Index names are global in SQLite: free them for the new table
+    for index in inspector.get_indexes(table.name):
+        conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+    # Copied into the same MetaData so its foreign keys resolve; removed again below.
+    # Indexes are created under their real names once the table has its own name.
+    new_table = table.to_metadata(table.metadata, name=new_name)
+    new_table.indexes.clear()
+    try:
+        new_table.create(conn)
+    finally:
+        table.metadata.remove(new_table)
+    conn.execute(text(f"INSERT INTO {new_name} ({columns}) SELECT {values} FROM {table.name}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {new_name} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn)
+    logger.info(f"Rebuilt table {table.name}")
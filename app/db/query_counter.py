@@ -0,0 +1,30 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import List
+
+
+class QueryCounter:
+    """
+    Count SQL statements executed on an engine inside a `with` block.
+    
+    Used to assert that a code path issues a fixed number of queries
+    regardless of data size (N+1 regressions show up as growth).
+    """
+    
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
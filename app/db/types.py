@@ -0,0 +1,48 @@
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import type_coerce
+from sqlalchemy.types import BigInteger, TypeDecorator
+
+from app.utils.money import from_minor, to_minor
+
+
+class FixedPoint(TypeDecorator):
+    """
+    Exact decimal stored as a BIGINT count of 10^-scale units.
+    
+    Python sees quantized Decimals (binds also accept int/float/str), the
+    database sees integers: sums and comparisons stay exact on every backend
+    and SQLite never falls back to REAL arithmetic.
+    """
+    
+    impl = BigInteger
+    cache_ok = True
+    scale = 2
+    
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return to_minor(value, self.scale)
+    
+    def process_result_value(self, value, dialect) -> Optional[Decimal]:
+        if value is None:
+            return None
+        return from_minor(int(value), self.scale)
+
+
+class Money(FixedPoint):
+    """Rupees, stored as integer paise"""
+    cache_ok = True
+    scale = 2
+
+
+class Percent(FixedPoint):
+    """Percentages, stored as integer basis points (18.5% -> 1850)"""
+    cache_ok = True
+    scale = 2
+
+
+def stored_minor(column):
+    """Read a FixedPoint column as its stored integer (no Decimal per row)"""
+    return type_coerce(column, BigInteger)
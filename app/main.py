@@ -1,13 +1,20 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import logging
 
-from app.db.database import init_db
+from app.db.database import init_db, get_async_engine, SessionLocal
+from app.crud.idempotency_repository import IdempotencyRepository
+from app.services.rollup_service import SalesRollupService
 from app.core.config import get_settings
 from app.core.exceptions import BillingException
-from app.routers import product_router, purchase_router, denomination_router, ui_router
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.routers import (
+    product_router, purchase_router, denomination_router, report_router, customer_router, ui_router
+)
 
 # Configure logging
 logging.basicConfig(
@@ -19,14 +26,51 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+def purge_idempotency_keys() -> int:
+    with SessionLocal() as db:
+        return IdempotencyRepository(db).purge_expired()
+
+
+async def sweep_idempotency_keys():
+    """Delete expired Idempotency-Key rows every IDEMPOTENCY_SWEEP_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(purge_idempotency_keys)
+        except Exception as e:
+            logger.error(f"Idempotency key sweep failed: {str(e)}")
+
+
+def refresh_sales_rollups() -> int:
+    with SessionLocal() as db:
+        return SalesRollupService(db).catch_up()
+
+
+async def roll_up_sales():
+    """Fold new purchases into the sales rollups every ROLLUP_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.ROLLUP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(refresh_sales_rollups)
+        except Exception as e:
+            logger.error(f"Sales rollup failed: {str(e)}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     logger.info("Starting Billing System API...")
     init_db()
     logger.info("Database initialized")
+    jobs = [asyncio.create_task(sweep_idempotency_keys()), asyncio.create_task(roll_up_sales())]
     yield
     logger.info("Shutting down Billing System API...")
+    for job in jobs:
+        job.cancel()
+        with suppress(asyncio.CancelledError):
+            await job
+    if settings.ASYNC_DATABASE_ENABLED:
+        await get_async_engine().dispose()
 
 
 app = FastAPI(
@@ -46,6 +90,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and SQL totals (outermost, so it times everything below)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 # Global exception handler
 @app.exception_handler(BillingException)
@@ -78,11 +126,28 @@ def health_check():
     }
 
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Health"], include_in_schema=False)
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 # Include routers
 app.include_router(ui_router.router)  # UI routes (no prefix)
-app.include_router(product_router.router, prefix=settings.API_V1_PREFIX)
-app.include_router(purchase_router.router, prefix=settings.API_V1_PREFIX)
-app.include_router(denomination_router.router, prefix=settings.API_V1_PREFIX)
+if settings.ASYNC_DATABASE_ENABLED:
+    # Async stack: AsyncSession per request, no threadpool worker held on DB waits
+    app.include_router(product_router.async_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(purchase_router.async_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(denomination_router.async_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(report_router.async_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(customer_router.async_router, prefix=settings.API_V1_PREFIX)
+else:
+    app.include_router(product_router.router, prefix=settings.API_V1_PREFIX)
+    app.include_router(purchase_router.router, prefix=settings.API_V1_PREFIX)
+    app.include_router(denomination_router.router, prefix=settings.API_V1_PREFIX)
+    app.include_router(report_router.router, prefix=settings.API_V1_PREFIX)
+    app.include_router(customer_router.router, prefix=settings.API_V1_PREFIX)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String
+from app.db.database import Base
+
+
+class CatalogVersion(Base):
+    """
+    Counter bumped in the same transaction as every catalog write,
+    including checkout's stock decrement.
+    
+    Product listings derive their ETag from it alone. The bump takes the
+    row lock, so the counter moves in commit order; a row timestamp is
+    taken at statement time and can commit out of order. Unlike a
+    process-local counter it survives restarts, agrees across workers and
+    reaches read replicas together with the write.
+    """
+    __tablename__ = "catalog_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    def __repr__(self):
+        return f"<CatalogVersion(name='{self.name}', version={self.version})>"
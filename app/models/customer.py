@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
+from app.db.types import Money
 
 
 class Customer(Base):
@@ -11,6 +12,12 @@ class Customer(Base):
     email = Column(String(255), unique=True, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    # Running aggregates, bumped atomically in the checkout transaction
+    bill_count = Column(Integer, nullable=False, default=0, server_default="0")
+    lifetime_spend = Column(Money, nullable=False, default=0, server_default="0")
+    last_purchase_id = Column(Integer, nullable=True)
+    last_purchase_at = Column(DateTime, nullable=True)
+    
     # Relationships
     purchases = relationship("Purchase", back_populates="customer", lazy="select")
     
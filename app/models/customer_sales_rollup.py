@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, ForeignKey, Index
+from app.db.database import Base
+from app.db.types import Money
+
+
+class CustomerSalesRollup(Base):
+    """
+    Purchases of one customer on one UTC day, maintained by the rollup job.
+    
+    revenue and tax are the summed bill final_amount and tax_amount.
+    """
+    __tablename__ = "customer_sales_rollups"
+    
+    day = Column(Date, primary_key=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    bills = Column(Integer, nullable=False, default=0, server_default="0")
+    units = Column(BigInteger, nullable=False, default=0, server_default="0")
+    revenue = Column(Money, nullable=False, default=0, server_default="0")
+    tax = Column(Money, nullable=False, default=0, server_default="0")
+    
+    __table_args__ = (
+        Index('idx_customer_sales_rollup_customer_day', 'customer_id', 'day'),
+    )
+    
+    def __repr__(self):
+        return f"<CustomerSalesRollup(day={self.day}, customer_id={self.customer_id}, revenue={self.revenue})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, CheckConstraint, Index
+from sqlalchemy import Column, Integer, DateTime, CheckConstraint, Index, UniqueConstraint
 from datetime import datetime
 from app.db.database import Base
 
@@ -7,15 +7,22 @@ class Denomination(Base):
     __tablename__ = "denominations"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    value = Column(Integer, unique=True, nullable=False)
+    # Each till has its own cash drawer, so concurrent tills never share rows
+    drawer_id = Column(Integer, nullable=False, default=1, server_default="1")
+    value = Column(Integer, nullable=False)
     available_count = Column(Integer, nullable=False, default=0)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     __table_args__ = (
         CheckConstraint('value > 0', name='check_value_positive'),
         CheckConstraint('available_count >= 0', name='check_count_positive'),
+        UniqueConstraint('drawer_id', 'value', name='uq_denomination_drawer_value'),
         Index('idx_denomination_value', 'value'),
     )
     
+    # Optimistic concurrency: ORM UPDATEs are guarded by and bump the version
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self):
-        return f"<Denomination(value={self.value}, count={self.available_count})>"
+        return f"<Denomination(drawer_id={self.drawer_id}, value={self.value}, count={self.available_count})>"
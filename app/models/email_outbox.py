@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class EmailOutbox(Base):
+    """
+    Invoice emails waiting for delivery.
+    
+    Rows are written in the same transaction as the purchase, so an invoice
+    is queued if and only if the bill is committed. The email worker drains
+    pending rows; after EMAIL_OUTBOX_MAX_ATTEMPTS failures a row is parked
+    in the dead-letter state.
+    """
+    __tablename__ = "email_outbox"
+    
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    purchase_id = Column(Integer, ForeignKey("purchases.id", ondelete="CASCADE"), nullable=False)
+    to_email = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(16), nullable=False, default=STATUS_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_email_outbox_due', 'status', 'next_attempt_at'),
+        Index('idx_email_outbox_purchase', 'purchase_id'),
+    )
+    
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, purchase_id={self.purchase_id}, status='{self.status}')>"
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Stored outcome of a POST /purchases sent with an Idempotency-Key header.
+    
+    The row is inserted as the first write of the billing transaction, so
+    the unique index makes a concurrent duplicate wait for (and then see)
+    the original's commit instead of billing twice. Rows expire after
+    IDEMPOTENCY_KEY_TTL_SECONDS and are removed by the periodic sweep.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    purchase_id = Column(Integer, ForeignKey("purchases.id", ondelete="CASCADE"), nullable=True)
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_idempotency_key', 'key', unique=True),
+        Index('idx_idempotency_expires_at', 'expires_at'),
+    )
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(key='{self.key}', purchase_id={self.purchase_id})>"
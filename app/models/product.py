@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, CheckConstraint, Index
+from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
+from app.db.types import Money, Percent
 
 
 class Product(Base):
@@ -10,10 +11,11 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(255), nullable=False, unique=True)
     stock = Column(Integer, nullable=False, default=0)
-    price = Column(Float, nullable=False)
-    tax_percent = Column(Float, nullable=False, default=0)
+    price = Column(Money, nullable=False)
+    tax_percent = Column(Percent, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
     purchase_items = relationship("PurchaseItem", back_populates="product", lazy="select")
@@ -25,5 +27,8 @@ class Product(Base):
         Index('idx_product_name', 'name'),
     )
     
+    # Optimistic concurrency: ORM UPDATEs are guarded by and bump the version
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', stock={self.stock})>"
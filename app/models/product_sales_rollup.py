@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, ForeignKey, Index
+from app.db.database import Base
+from app.db.types import Money
+
+
+class ProductSalesRollup(Base):
+    """
+    Sales of one product on one UTC day, maintained by the rollup job.
+    
+    revenue and tax are the summed line totals (tax inclusive) and line
+    taxes; bills counts the purchases that contained the product.
+    """
+    __tablename__ = "product_sales_rollups"
+    
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    bills = Column(Integer, nullable=False, default=0, server_default="0")
+    units = Column(BigInteger, nullable=False, default=0, server_default="0")
+    revenue = Column(Money, nullable=False, default=0, server_default="0")
+    tax = Column(Money, nullable=False, default=0, server_default="0")
+    
+    __table_args__ = (
+        Index('idx_product_sales_rollup_product_day', 'product_id', 'day'),
+    )
+    
+    def __repr__(self):
+        return f"<ProductSalesRollup(day={self.day}, product_id={self.product_id}, revenue={self.revenue})>"
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey, Index, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
+from app.db.types import Money
 
 
 class Purchase(Base):
@@ -9,12 +10,14 @@ class Purchase(Base):
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
-    total_amount = Column(Float, nullable=False)
-    tax_amount = Column(Float, nullable=False)
-    final_amount = Column(Float, nullable=False)
-    paid_amount = Column(Float, nullable=False)
-    balance_amount = Column(Float, nullable=False)
+    total_amount = Column(Money, nullable=False)
+    tax_amount = Column(Money, nullable=False)
+    final_amount = Column(Money, nullable=False)
+    paid_amount = Column(Money, nullable=False)
+    balance_amount = Column(Money, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Set once the purchase is folded into the sales rollups
+    rolled_up = Column(Boolean, nullable=False, default=False, server_default=false())
     
     # Relationships
     customer = relationship("Customer", back_populates="purchases")
@@ -24,6 +27,11 @@ class Purchase(Base):
     __table_args__ = (
         Index('idx_purchase_customer', 'customer_id'),
         Index('idx_purchase_created_at', 'created_at'),
+        # Partial: only purchases still waiting for the rollup job
+        Index(
+            'idx_purchase_pending_rollup', 'id',
+            postgresql_where=rolled_up == false(), sqlite_where=rolled_up == false()
+        ),
     )
     
     def __repr__(self):
@@ -8,6 +8,7 @@ class PurchaseDenomination(Base):
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     purchase_id = Column(Integer, ForeignKey("purchases.id", ondelete="CASCADE"), nullable=False)
+    drawer_id = Column(Integer, nullable=False, default=1, server_default="1")
     denomination_value = Column(Integer, nullable=False)
     count_given = Column(Integer, nullable=False)
     
@@ -16,6 +17,7 @@ class PurchaseDenomination(Base):
     
     __table_args__ = (
         Index('idx_purchase_denomination_purchase', 'purchase_id'),
+        Index('idx_purchase_denomination_drawer', 'drawer_id', 'denomination_value'),
     )
     
     def __repr__(self):
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, Index
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.db.types import Money, Percent
 
 
 class PurchaseItem(Base):
@@ -10,10 +11,10 @@ class PurchaseItem(Base):
     purchase_id = Column(Integer, ForeignKey("purchases.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id", ondelete="RESTRICT"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    unit_price_snapshot = Column(Float, nullable=False)
-    tax_percent_snapshot = Column(Float, nullable=False)
-    tax_amount = Column(Float, nullable=False)
-    total_price = Column(Float, nullable=False)
+    unit_price_snapshot = Column(Money, nullable=False)
+    tax_percent_snapshot = Column(Percent, nullable=False)
+    tax_amount = Column(Money, nullable=False)
+    total_price = Column(Money, nullable=False)
     
     # Relationships
     purchase = relationship("Purchase", back_populates="purchase_items")
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.db.database import Base
+
+
+class RollupWatermark(Base):
+    """
+    Highest purchase ID already folded into a family of rollup tables.
+    
+    The rollup job claims the next range by moving the watermark with a
+    compare-and-set UPDATE in the same transaction that writes the rollup
+    rows, so a range is counted exactly once even with several workers.
+    """
+    __tablename__ = "rollup_watermarks"
+    
+    name = Column(String(50), primary_key=True)
+    last_purchase_id = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<RollupWatermark(name='{self.name}', last_purchase_id={self.last_purchase_id})>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, BigInteger, Date
+from app.db.database import Base
+from app.db.types import Money
+
+
+class SalesRollup(Base):
+    """
+    Store-wide takings in one UTC hour, maintained by the rollup job.
+    
+    revenue and tax are the summed bill final_amount and tax_amount; a
+    day's report reads at most 24 rows whatever the purchase volume.
+    """
+    __tablename__ = "sales_rollups"
+    
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    bills = Column(Integer, nullable=False, default=0, server_default="0")
+    units = Column(BigInteger, nullable=False, default=0, server_default="0")
+    revenue = Column(Money, nullable=False, default=0, server_default="0")
+    tax = Column(Money, nullable=False, default=0, server_default="0")
+    
+    def __repr__(self):
+        return f"<SalesRollup(day={self.day}, hour={self.hour}, bills={self.bills}, revenue={self.revenue})>"
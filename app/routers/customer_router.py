@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_db, get_async_db
+from app.crud.customer_crud import CustomerRepository, AsyncCustomerRepository
+from app.schemas.customer_schema import CustomerProfile
+
+router = APIRouter(prefix="/customers", tags=["Customers"])
+async_router = APIRouter(prefix="/customers", tags=["Customers"])
+
+
+def _found(profile, email: str):
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Customer '{email}' not found")
+    return profile
+
+
+@router.get("/{email}", response_model=CustomerProfile)
+def get_customer_profile(email: str, db: Session = Depends(get_db)):
+    """Bill count, lifetime spend and last purchase of a customer (one row read)"""
+    return _found(CustomerRepository(db).get_profile(email), email)
+
+
+@async_router.get("/{email}", response_model=CustomerProfile)
+async def get_customer_profile_async(email: str, db: AsyncSession = Depends(get_async_db)):
+    """Bill count, lifetime spend and last purchase of a customer (one row read)"""
+    return _found(await AsyncCustomerRepository(db).get_profile(email), email)
@@ -1,13 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db.database import get_db
-from app.schemas.schemas import DenominationCreate, DenominationUpdate, DenominationResponse
-from app.crud.denomination_repository import DenominationRepository
-from app.core.exceptions import ResourceNotFoundException
+from app.db.database import get_db, get_async_db
+from app.schemas.schemas import (
+    DenominationCreate, DenominationUpdate, DenominationResponse,
+    DrawerSummary, DrawerReconcileRequest, DrawerReconciliation
+)
+from app.crud.denomination_repository import DenominationRepository, AsyncDenominationRepository, DEFAULT_DRAWER_ID
+from app.services.drawer_service import build_drawer_summary, reconcile_drawer, uncounted_values
+from app.core.exceptions import ConcurrencyConflictException, ResourceNotFoundException
+from app.utils.http_cache import REVALIDATE, is_not_modified, make_etag, not_modified, schema_fingerprint, set_validators
 
 router = APIRouter(prefix="/denominations", tags=["Denominations"])
+async_router = APIRouter(prefix="/denominations", tags=["Denominations"])
+
+_LIST_FINGERPRINT = schema_fingerprint(DenominationResponse)
+
+
+def _drawer_etag(drawer_id: int, watermark) -> str:
+    return make_etag("denominations", drawer_id, watermark, _LIST_FINGERPRINT)
+
+
+def _require_full_count(denominations, counted: dict):
+    """apply=true overwrites every line, so a value left out would be zeroed"""
+    missing = uncounted_values(denominations, counted)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"apply=true needs a full count; not counted: {', '.join(map(str, missing))}"
+        )
 
 
 @router.post("/", response_model=DenominationResponse, status_code=status.HTTP_201_CREATED)
@@ -21,37 +44,214 @@ def create_denomination(denom: DenominationCreate, db: Session = Depends(get_db)
 
 
 @router.get("/", response_model=List[DenominationResponse])
-def get_denominations(db: Session = Depends(get_db)):
-    """Get all denominations"""
+def get_denominations(
+    request: Request,
+    response: Response,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Get all denominations of a drawer.
+    
+    The ETag follows the drawer's watermark (checkout bumps it), so a till
+    polling with If-None-Match gets a 304 until its drawer changes.
+    """
+    repo = DenominationRepository(db)
+    etag = _drawer_etag(drawer_id, repo.get_watermark(drawer_id))
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    set_validators(response, etag, REVALIDATE)
+    return repo.get_all(drawer_id)
+
+
+@router.get("/drawers", response_model=List[DrawerSummary])
+def get_drawers(db: Session = Depends(get_db)):
+    """Summary of every till's drawer"""
+    repo = DenominationRepository(db)
+    return [
+        build_drawer_summary(drawer_id, repo.get_all(drawer_id), repo.get_change_given(drawer_id))
+        for drawer_id in repo.get_drawer_ids()
+    ]
+
+
+@router.get("/drawers/{drawer_id}", response_model=DrawerSummary)
+def get_drawer(drawer_id: int, db: Session = Depends(get_db)):
+    """Contents of one till's drawer and the change it has given"""
+    repo = DenominationRepository(db)
+    denominations = repo.get_all(drawer_id)
+    if not denominations:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Drawer not found")
+    return build_drawer_summary(drawer_id, denominations, repo.get_change_given(drawer_id))
+
+
+@router.post("/drawers/{drawer_id}/reconcile", response_model=DrawerReconciliation)
+def reconcile(drawer_id: int, request: DrawerReconcileRequest, db: Session = Depends(get_db)):
+    """Compare a physical count with the recorded drawer; apply=true adopts a full count"""
     repo = DenominationRepository(db)
-    return repo.get_all()
+    counted = {line.value: line.count for line in request.counted}
+    if not request.apply:
+        return reconcile_drawer(drawer_id, repo.get_all(drawer_id), counted)
+    
+    # Hold the drawer from the comparison to the commit: a checkout in between would be overwritten
+    denominations = repo.lock_drawer(drawer_id)
+    _require_full_count(denominations, counted)
+    reconciliation = reconcile_drawer(drawer_id, denominations, counted)
+    try:
+        repo.set_counts(drawer_id, {line['value']: line['counted'] for line in reconciliation['lines']})
+    except ConcurrencyConflictException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+    reconciliation['applied'] = True
+    return reconciliation
 
 
 @router.get("/{value}", response_model=DenominationResponse)
-def get_denomination(value: int, db: Session = Depends(get_db)):
+def get_denomination(
+    value: int,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: Session = Depends(get_db)
+):
     """Get denomination by value"""
     repo = DenominationRepository(db)
-    denom = repo.get_by_value(value)
+    denom = repo.get_by_value(value, drawer_id)
     if not denom:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Denomination not found")
     return denom
 
 
 @router.put("/{value}", response_model=DenominationResponse)
-def update_denomination(value: int, denom: DenominationUpdate, db: Session = Depends(get_db)):
+def update_denomination(
+    value: int,
+    denom: DenominationUpdate,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: Session = Depends(get_db)
+):
     """Update denomination count"""
     try:
         repo = DenominationRepository(db)
-        return repo.update(value, denom)
+        return repo.update(value, denom, drawer_id)
     except ResourceNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
 
 
 @router.delete("/{value}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_denomination(value: int, db: Session = Depends(get_db)):
+def delete_denomination(
+    value: int,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: Session = Depends(get_db)
+):
     """Delete denomination"""
     try:
         repo = DenominationRepository(db)
-        repo.delete(value)
+        repo.delete(value, drawer_id)
+    except ResourceNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+
+
+# Async request path (ASYNC_DATABASE_ENABLED)
+@async_router.post("/", response_model=DenominationResponse, status_code=status.HTTP_201_CREATED)
+async def create_denomination_async(denom: DenominationCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new denomination"""
+    try:
+        repo = AsyncDenominationRepository(db)
+        return await repo.create(denom)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@async_router.get("/", response_model=List[DenominationResponse])
+async def get_denominations_async(
+    request: Request,
+    response: Response,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all denominations of a drawer (ETag follows the drawer's watermark)"""
+    repo = AsyncDenominationRepository(db)
+    etag = _drawer_etag(drawer_id, await repo.get_watermark(drawer_id))
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    set_validators(response, etag, REVALIDATE)
+    return await repo.get_all(drawer_id)
+
+
+@async_router.get("/drawers", response_model=List[DrawerSummary])
+async def get_drawers_async(db: AsyncSession = Depends(get_async_db)):
+    """Summary of every till's drawer"""
+    repo = AsyncDenominationRepository(db)
+    return [
+        build_drawer_summary(drawer_id, await repo.get_all(drawer_id), await repo.get_change_given(drawer_id))
+        for drawer_id in await repo.get_drawer_ids()
+    ]
+
+
+@async_router.get("/drawers/{drawer_id}", response_model=DrawerSummary)
+async def get_drawer_async(drawer_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Contents of one till's drawer and the change it has given"""
+    repo = AsyncDenominationRepository(db)
+    denominations = await repo.get_all(drawer_id)
+    if not denominations:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Drawer not found")
+    return build_drawer_summary(drawer_id, denominations, await repo.get_change_given(drawer_id))
+
+
+@async_router.post("/drawers/{drawer_id}/reconcile", response_model=DrawerReconciliation)
+async def reconcile_async(drawer_id: int, request: DrawerReconcileRequest, db: AsyncSession = Depends(get_async_db)):
+    """Compare a physical count with the recorded drawer; apply=true adopts a full count"""
+    repo = AsyncDenominationRepository(db)
+    counted = {line.value: line.count for line in request.counted}
+    if not request.apply:
+        return reconcile_drawer(drawer_id, await repo.get_all(drawer_id), counted)
+    
+    # Hold the drawer from the comparison to the commit: a checkout in between would be overwritten
+    denominations = await repo.lock_drawer(drawer_id)
+    _require_full_count(denominations, counted)
+    reconciliation = reconcile_drawer(drawer_id, denominations, counted)
+    try:
+        await repo.set_counts(drawer_id, {line['value']: line['counted'] for line in reconciliation['lines']})
+    except ConcurrencyConflictException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+    reconciliation['applied'] = True
+    return reconciliation
+
+
+@async_router.get("/{value}", response_model=DenominationResponse)
+async def get_denomination_async(
+    value: int,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get denomination by value"""
+    repo = AsyncDenominationRepository(db)
+    denom = await repo.get_by_value(value, drawer_id)
+    if not denom:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Denomination not found")
+    return denom
+
+
+@async_router.put("/{value}", response_model=DenominationResponse)
+async def update_denomination_async(
+    value: int,
+    denom: DenominationUpdate,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update denomination count"""
+    try:
+        repo = AsyncDenominationRepository(db)
+        return await repo.update(value, denom, drawer_id)
+    except ResourceNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+
+
+@async_router.delete("/{value}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_denomination_async(
+    value: int,
+    drawer_id: int = Query(DEFAULT_DRAWER_ID, gt=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete denomination"""
+    try:
+        repo = AsyncDenominationRepository(db)
+        await repo.delete(value, drawer_id)
     except ResourceNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
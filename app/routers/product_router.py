@@ -1,13 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
 
-from app.db.database import get_db
-from app.schemas.schemas import ProductCreate, ProductUpdate, ProductResponse
-from app.crud.product_repository import ProductRepository
+from app.db.database import get_db, get_async_db, get_read_db, get_async_read_db
+from app.schemas.schemas import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductCatalogEntry, ProductImportReport, PaginatedResponse
+)
+from app.crud.product_repository import ProductRepository, AsyncProductRepository
 from app.core.exceptions import ResourceNotFoundException
+from app.utils.pagination import build_page, decode_cursor, cursor_int
+from app.utils.catalog_cache import catalog_cache
+from app.utils.http_cache import REVALIDATE, is_not_modified, make_etag, not_modified, schema_fingerprint, set_validators
+from app.services.product_import_service import ProductImportService, detect_format, iter_lines
 
 router = APIRouter(prefix="/products", tags=["Products"])
+async_router = APIRouter(prefix="/products", tags=["Products"])
+
+_PAGE_FINGERPRINT = schema_fingerprint(PaginatedResponse[ProductResponse])
+_PRODUCT_FINGERPRINT = schema_fingerprint(ProductResponse)
+
+
+def _after_id(cursor: Optional[str]) -> Optional[int]:
+    values = decode_cursor(cursor)
+    return cursor_int(values, "id") if values is not None else None
+
+
+def _product_cursor(product) -> dict:
+    return {"id": product.id}
+
+
+def _page_etag(request: Request, watermark) -> str:
+    """Same table watermark and same query string: same page"""
+    return make_etag("products", watermark, request.url.query, _PAGE_FINGERPRINT)
+
+
+def _product_etag(product) -> str:
+    return make_etag("product", product.id, product.version, product.updated_at, _PRODUCT_FINGERPRINT)
 
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
@@ -20,24 +50,89 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@router.get("/", response_model=List[ProductResponse])
+@router.post("/bulk", response_model=ProductImportReport)
+async def bulk_import_products(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults to the Content-Type"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a CSV or NDJSON catalog and upsert products by name.
+    
+    Rows are validated with ProductCreate and written in chunks; invalid
+    rows are reported per row without aborting the import.
+    """
+    def write_chunk(rows):
+        try:
+            result = ProductRepository(db).bulk_upsert_isolated(rows)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+    
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+        service = ProductImportService(lambda rows: run_in_threadpool(write_chunk, rows))
+        return await service.run(iter_lines(request.stream()), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/", response_model=PaginatedResponse[ProductResponse])
 def get_products(
-    skip: int = Query(0, ge=0),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    include_total: bool = Query(False),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all products with pagination"""
+    """
+    Get products with keyset pagination (pass next_cursor back as cursor).
+    
+    The ETag follows the products table's watermark, so a repeat poll with
+    If-None-Match costs two index lookups and returns 304 until a product
+    changes.
+    """
+    repo = ProductRepository(db)
+    # Watermark before the page: a write in between only makes the next poll refetch
+    etag = _page_etag(request, repo.get_watermark())
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    # One extra row tells whether another page exists
+    products = repo.get_all(limit=limit + 1, after_id=_after_id(cursor))
+    total = repo.count() if include_total else None
+    set_validators(response, etag, REVALIDATE)
+    return build_page(products, limit, _product_cursor, total)
+
+
+@router.get("/catalog", response_model=List[ProductCatalogEntry])
+def get_catalog(ids: List[int] = Query(..., max_length=500), db: Session = Depends(get_db)):
+    """Name, price and tax for many products in one call (cached; no stock)"""
+    unique_ids = list(dict.fromkeys(ids))
     repo = ProductRepository(db)
-    return repo.get_all(skip=skip, limit=limit)
+    entries = repo.get_catalog_entries(unique_ids)
+    return [entries[product_id] for product_id in unique_ids if product_id in entries]
+
+
+@router.get("/catalog/stats")
+def get_catalog_stats() -> Dict[str, Any]:
+    """Catalog cache size and hit/miss counters"""
+    return catalog_cache.stats()
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Get product by ID"""
+def get_product(product_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Get product by ID (ETag from its version; If-None-Match skips serialization)"""
     repo = ProductRepository(db)
     product = repo.get_by_id(product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    etag = _product_etag(product)
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    set_validators(response, etag, REVALIDATE)
     return product
 
 
@@ -59,3 +154,112 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
         repo.delete(product_id)
     except ResourceNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+
+
+# Async request path (ASYNC_DATABASE_ENABLED)
+@async_router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
+async def create_product_async(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new product"""
+    try:
+        repo = AsyncProductRepository(db)
+        return await repo.create(product)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@async_router.post("/bulk", response_model=ProductImportReport)
+async def bulk_import_products_async(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults to the Content-Type"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream a CSV or NDJSON catalog and upsert products by name"""
+    async def write_chunk(rows):
+        try:
+            result = await AsyncProductRepository(db).bulk_upsert_isolated(rows)
+            await db.commit()
+            return result
+        except Exception:
+            await db.rollback()
+            raise
+    
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+        service = ProductImportService(write_chunk)
+        return await service.run(iter_lines(request.stream()), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@async_router.get("/", response_model=PaginatedResponse[ProductResponse])
+async def get_products_async(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=100),
+    include_total: bool = Query(False),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get products with keyset pagination (ETag follows the products table's watermark)"""
+    repo = AsyncProductRepository(db)
+    etag = _page_etag(request, await repo.get_watermark())
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    products = await repo.get_all(limit=limit + 1, after_id=_after_id(cursor))
+    total = await repo.count() if include_total else None
+    set_validators(response, etag, REVALIDATE)
+    return build_page(products, limit, _product_cursor, total)
+
+
+@async_router.get("/catalog", response_model=List[ProductCatalogEntry])
+async def get_catalog_async(ids: List[int] = Query(..., max_length=500), db: AsyncSession = Depends(get_async_db)):
+    """Name, price and tax for many products in one call (cached; no stock)"""
+    unique_ids = list(dict.fromkeys(ids))
+    repo = AsyncProductRepository(db)
+    entries = await repo.get_catalog_entries(unique_ids)
+    return [entries[product_id] for product_id in unique_ids if product_id in entries]
+
+
+@async_router.get("/catalog/stats")
+async def get_catalog_stats_async() -> Dict[str, Any]:
+    """Catalog cache size and hit/miss counters"""
+    return catalog_cache.stats()
+
+
+@async_router.get("/{product_id}", response_model=ProductResponse)
+async def get_product_async(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get product by ID (ETag from its version; If-None-Match skips serialization)"""
+    repo = AsyncProductRepository(db)
+    product = await repo.get_by_id(product_id)
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    etag = _product_etag(product)
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    set_validators(response, etag, REVALIDATE)
+    return product
+
+
+@async_router.put("/{product_id}", response_model=ProductResponse)
+async def update_product_async(product_id: int, product: ProductUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Update product"""
+    try:
+        repo = AsyncProductRepository(db)
+        return await repo.update(product_id, product)
+    except ResourceNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+
+
+@async_router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_product_async(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete product"""
+    try:
+        repo = AsyncProductRepository(db)
+        await repo.delete(product_id)
+    except ResourceNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
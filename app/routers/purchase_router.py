@@ -1,23 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Literal, Optional
+from datetime import datetime
 
-from app.db.database import get_db
-from app.schemas.schemas import PurchaseCreate, PurchaseResponse
-from app.services.billing_service import BillingService
-from app.crud.purchase_repository import PurchaseRepository
+from app.db.database import (
+    SessionLocal, get_db, get_async_db, get_read_db, get_async_read_db, get_async_sessionmaker,
+    is_replica, is_async_replica
+)
+from app.schemas.schemas import (
+    PurchaseCreate, PurchaseResponse, PurchaseSummary, PurchaseBatchResponse, PaginatedResponse
+)
+from app.services.billing_service import BillingService, AsyncBillingService
+from app.services.export_service import PurchaseExportService
+from app.utils.invoice_renderer import invoice_renderer
+from app.utils.http_cache import IMMUTABLE, is_not_modified, make_etag, not_modified, schema_fingerprint, set_validators
+from app.crud.purchase_repository import PurchaseRepository, AsyncPurchaseRepository, PurchaseKey
+from app.utils.pagination import build_page, decode_cursor, cursor_datetime, cursor_int
 from app.core.exceptions import (
     ResourceNotFoundException,
     InsufficientStockException,
     InvalidPaymentException,
-    InsufficientDenominationException
+    InsufficientDenominationException,
+    ConcurrencyConflictException,
+    IdempotencyKeyReuseException
 )
+from app.core.config import get_settings
+
+settings = get_settings()
+
+InvoiceVariant = Literal["html", "text", "receipt"]
 
 router = APIRouter(prefix="/purchases", tags=["Purchases"])
+async_router = APIRouter(prefix="/purchases", tags=["Purchases"])
+
+_PURCHASE_FINGERPRINT = schema_fingerprint(PurchaseResponse)
+
+
+def _after_key(cursor: Optional[str]) -> Optional[PurchaseKey]:
+    values = decode_cursor(cursor)
+    if values is None:
+        return None
+    return cursor_datetime(values, "created_at"), cursor_int(values, "id")
+
+
+def _purchase_cursor(purchase) -> dict:
+    return {"created_at": purchase.created_at, "id": purchase.id}
+
+
+def _purchase_etag(purchase_id: int, variant: Optional[str] = None) -> str:
+    """Committed purchases never change, so the ID (and representation) is the whole validator"""
+    if variant is None:
+        return make_etag("purchase", purchase_id, _PURCHASE_FINGERPRINT)
+    return make_etag("invoice", purchase_id, variant, invoice_renderer.fingerprint)
+
+
+def _mark_replay(response: Response, replayed: bool):
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+
+
+def _check_batch_size(purchases: List[PurchaseCreate]):
+    if not purchases:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch must contain at least one bill")
+    if len(purchases) > settings.CHECKOUT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch is limited to {settings.CHECKOUT_BATCH_MAX_SIZE} bills"
+        )
+
+
+def _export_service(fmt: str, start: Optional[datetime], end: Optional[datetime]) -> PurchaseExportService:
+    if start and end and start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    return PurchaseExportService(fmt)
+
+
+def _export_response(service: PurchaseExportService, body) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type=service.media_type,
+        headers={"Content-Disposition": f'attachment; filename="purchases.{service.fmt}"'}
+    )
+
+
+def _get_purchase(db: Session, purchase_id: int):
+    """
+    Read-your-writes: a bill fetched right after checkout may not have
+    reached the replica yet, so a replica miss is retried on the primary.
+    """
+    purchase = PurchaseRepository(db).get_by_id(purchase_id)
+    if purchase is None and is_replica(db):
+        with SessionLocal() as primary:
+            purchase = PurchaseRepository(primary).get_by_id(purchase_id)
+    return purchase
+
+
+async def _get_purchase_async(db: AsyncSession, purchase_id: int):
+    purchase = await AsyncPurchaseRepository(db).get_by_id(purchase_id)
+    if purchase is None and is_async_replica(db):
+        async with get_async_sessionmaker()() as primary:
+            purchase = await AsyncPurchaseRepository(primary).get_by_id(purchase_id)
+    return purchase
+
+
+def _batch_response(results: List[Dict]) -> dict:
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
 
 
 @router.post("/", response_model=PurchaseResponse, status_code=status.HTTP_201_CREATED)
-def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
+def create_purchase(
+    purchase: PurchaseCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
     """
     Create a new purchase (Generate Bill).
     
@@ -29,11 +128,15 @@ def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
     5. Updates inventory
     6. Handles change denominations
     
-    All operations are wrapped in a database transaction.
+    All operations are wrapped in a database transaction. Send an
+    Idempotency-Key header to make retries safe: a repeat returns the
+    original response (with Idempotent-Replayed: true) and bills nothing.
     """
     try:
         service = BillingService(db)
-        return service.create_purchase(purchase)
+        result = service.create_purchase(purchase, idempotency_key)
+        _mark_replay(response, service.replayed)
+        return result
     except ResourceNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
     except InsufficientStockException as e:
@@ -42,29 +145,251 @@ def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except InsufficientDenominationException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except ConcurrencyConflictException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+    except IdempotencyKeyReuseException as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/batch", response_model=PurchaseBatchResponse)
+def create_purchases_batch(purchases: List[PurchaseCreate], db: Session = Depends(get_db)):
+    """
+    Create many purchases in one request (e.g. an offline till replaying its queue).
+    
+    Bills are processed in order against shared product and drawer reads.
+    Each bill succeeds or fails on its own; the response lists a status
+    per bill in request order.
+    """
+    _check_batch_size(purchases)
+    try:
+        service = BillingService(db)
+        return _batch_response(service.create_purchases_batch(purchases))
+    except ConcurrencyConflictException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@router.get("/", response_model=List[PurchaseResponse])
+@router.get("/", response_model=PaginatedResponse[PurchaseResponse])
 def get_purchases(
     customer_email: str = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    include_total: bool = Query(False),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all purchases with optional customer email filter and pagination"""
+    """Get purchases newest first with optional customer email filter and keyset pagination"""
     repo = PurchaseRepository(db)
+    after = _after_key(cursor)
+    # One extra row tells whether another page exists
     if customer_email:
-        return repo.get_by_customer_email(customer_email, skip=skip, limit=limit)
-    return repo.get_all(skip=skip, limit=limit)
+        purchases = repo.get_by_customer_email(customer_email, limit=limit + 1, after=after)
+    else:
+        purchases = repo.get_all(limit=limit + 1, after=after)
+    total = repo.count(customer_email) if include_total else None
+    return build_page(purchases, limit, _purchase_cursor, total)
 
 
-@router.get("/{purchase_id}", response_model=PurchaseResponse)
-def get_purchase(purchase_id: int, db: Session = Depends(get_db)):
-    """Get purchase by ID with all details"""
+@router.get("/summary", response_model=PaginatedResponse[PurchaseSummary])
+def get_purchase_summaries(
+    customer_email: str = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=100),
+    include_total: bool = Query(False),
+    db: Session = Depends(get_read_db)
+):
+    """Lean purchase listing (no line items): a single query per page"""
     repo = PurchaseRepository(db)
-    purchase = repo.get_by_id(purchase_id)
+    rows = repo.get_summaries(customer_email, limit=limit + 1, after=_after_key(cursor))
+    total = repo.count(customer_email) if include_total else None
+    return build_page(rows, limit, _purchase_cursor, total)
+
+
+@router.get("/export")
+def export_purchases(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    start: Optional[datetime] = Query(None, description="purchases created at or after"),
+    end: Optional[datetime] = Query(None, description="purchases created before"),
+    customer_id: Optional[int] = Query(None),
+    customer_email: Optional[str] = Query(None)
+):
+    """
+    Stream purchases as flat line rows (NDJSON or CSV), oldest first.
+    
+    Rows are read over a server-side cursor and written as they arrive,
+    so a month of bills costs the same memory as a page.
+    """
+    service = _export_service(format, start, end)
+    return _export_response(
+        service,
+        service.stream(start=start, end=end, customer_id=customer_id, customer_email=customer_email)
+    )
+
+
+@router.get("/{purchase_id}", response_model=PurchaseResponse)
+def get_purchase(purchase_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """
+    Get purchase by ID with all details.
+    
+    Served with a strong ETag and Cache-Control: immutable; a matching
+    If-None-Match gets a 304 without touching the database.
+    """
+    etag = _purchase_etag(purchase_id)
+    if is_not_modified(request, etag):
+        return not_modified(etag, IMMUTABLE)
+    purchase = _get_purchase(db, purchase_id)
     if not purchase:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Purchase not found")
+    set_validators(response, etag, IMMUTABLE)
     return purchase
+
+
+def _invoice_response(purchase, variant: str, etag: str) -> StreamingResponse:
+    if not purchase:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Purchase not found")
+    return StreamingResponse(
+        invoice_renderer.stream(BillingService.build_invoice_payload(purchase), variant),
+        media_type=f"{invoice_renderer.media_type(variant)}; charset=utf-8",
+        headers={"ETag": etag, "Cache-Control": IMMUTABLE}
+    )
+
+
+@router.get("/{purchase_id}/invoice")
+def get_purchase_invoice(
+    purchase_id: int,
+    request: Request,
+    variant: InvoiceVariant = Query("html"),
+    db: Session = Depends(get_read_db)
+):
+    """Render the invoice as HTML, plain text or a fixed-width till receipt (immutable, like the purchase)"""
+    etag = _purchase_etag(purchase_id, variant)
+    if is_not_modified(request, etag):
+        return not_modified(etag, IMMUTABLE)
+    return _invoice_response(_get_purchase(db, purchase_id), variant, etag)
+
+
+# Async request path (ASYNC_DATABASE_ENABLED)
+@async_router.post("/", response_model=PurchaseResponse, status_code=status.HTTP_201_CREATED)
+async def create_purchase_async(
+    purchase: PurchaseCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new purchase (Generate Bill). Same flow as the sync endpoint."""
+    try:
+        service = AsyncBillingService(db)
+        result = await service.create_purchase(purchase, idempotency_key)
+        _mark_replay(response, service.replayed)
+        return result
+    except ResourceNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    except InsufficientStockException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except InvalidPaymentException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except InsufficientDenominationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except ConcurrencyConflictException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+    except IdempotencyKeyReuseException as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@async_router.post("/batch", response_model=PurchaseBatchResponse)
+async def create_purchases_batch_async(purchases: List[PurchaseCreate], db: AsyncSession = Depends(get_async_db)):
+    """Create many purchases in one request. Same flow as the sync endpoint."""
+    _check_batch_size(purchases)
+    try:
+        service = AsyncBillingService(db)
+        return _batch_response(await service.create_purchases_batch(purchases))
+    except ConcurrencyConflictException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@async_router.get("/", response_model=PaginatedResponse[PurchaseResponse])
+async def get_purchases_async(
+    customer_email: str = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=100),
+    include_total: bool = Query(False),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get purchases newest first with optional customer email filter and keyset pagination"""
+    repo = AsyncPurchaseRepository(db)
+    after = _after_key(cursor)
+    if customer_email:
+        purchases = await repo.get_by_customer_email(customer_email, limit=limit + 1, after=after)
+    else:
+        purchases = await repo.get_all(limit=limit + 1, after=after)
+    total = await repo.count(customer_email) if include_total else None
+    return build_page(purchases, limit, _purchase_cursor, total)
+
+
+@async_router.get("/summary", response_model=PaginatedResponse[PurchaseSummary])
+async def get_purchase_summaries_async(
+    customer_email: str = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=100),
+    include_total: bool = Query(False),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Lean purchase listing (no line items): a single query per page"""
+    repo = AsyncPurchaseRepository(db)
+    rows = await repo.get_summaries(customer_email, limit=limit + 1, after=_after_key(cursor))
+    total = await repo.count(customer_email) if include_total else None
+    return build_page(rows, limit, _purchase_cursor, total)
+
+
+@async_router.get("/export")
+async def export_purchases_async(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    start: Optional[datetime] = Query(None, description="purchases created at or after"),
+    end: Optional[datetime] = Query(None, description="purchases created before"),
+    customer_id: Optional[int] = Query(None),
+    customer_email: Optional[str] = Query(None)
+):
+    """Stream purchases as flat line rows (NDJSON or CSV), oldest first"""
+    service = _export_service(format, start, end)
+    return _export_response(
+        service,
+        service.stream_async(start=start, end=end, customer_id=customer_id, customer_email=customer_email)
+    )
+
+
+@async_router.get("/{purchase_id}", response_model=PurchaseResponse)
+async def get_purchase_async(
+    purchase_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get purchase by ID with all details (immutable; If-None-Match answered without a query)"""
+    etag = _purchase_etag(purchase_id)
+    if is_not_modified(request, etag):
+        return not_modified(etag, IMMUTABLE)
+    purchase = await _get_purchase_async(db, purchase_id)
+    if not purchase:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Purchase not found")
+    set_validators(response, etag, IMMUTABLE)
+    return purchase
+
+
+@async_router.get("/{purchase_id}/invoice")
+async def get_purchase_invoice_async(
+    purchase_id: int,
+    request: Request,
+    variant: InvoiceVariant = Query("html"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Render the invoice as HTML, plain text or a fixed-width till receipt (immutable, like the purchase)"""
+    etag = _purchase_etag(purchase_id, variant)
+    if is_not_modified(request, etag):
+        return not_modified(etag, IMMUTABLE)
+    return _invoice_response(await _get_purchase_async(db, purchase_id), variant, etag)
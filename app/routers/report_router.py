@@ -0,0 +1,180 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional, Tuple
+from datetime import date, datetime, timedelta
+
+from app.db.database import get_db, get_async_db, get_read_db, get_async_read_db
+from app.schemas.schemas import (
+    RepricingRequest, RepricingReport, SalesSeriesReport, ProductSalesReport,
+    CustomerSalesReport, RollupRefreshResult
+)
+from app.services.repricing_service import RepricingService, AsyncRepricingService
+from app.services.rollup_service import SalesRollupService, AsyncSalesRollupService
+from app.core.config import get_settings
+
+settings = get_settings()
+
+Granularity = Literal["day", "hour"]
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+async_router = APIRouter(prefix="/reports", tags=["Reports"])
+
+
+def _check_window(request: RepricingRequest):
+    if request.start and request.end and request.start >= request.end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+
+
+def _sales_window(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """Inclusive UTC day window; defaults to the last REPORT_DEFAULT_DAYS days"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=settings.REPORT_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    return start, end
+
+
+@router.post("/repricing", response_model=RepricingReport)
+def repricing_report(request: RepricingRequest, db: Session = Depends(get_read_db)):
+    """What-if: re-price historic bills with other prices or tax rates (nothing is written)"""
+    _check_window(request)
+    return RepricingService(db).run(request)
+
+
+@router.get("/sales", response_model=SalesSeriesReport)
+def sales_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: Granularity = "day",
+    db: Session = Depends(get_read_db)
+):
+    """Takings per day or hour, read from the sales rollups"""
+    return SalesRollupService(db).sales_series(*_sales_window(start, end), granularity)
+
+
+@router.get("/products", response_model=ProductSalesReport)
+def product_sales_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    """Best-selling products by revenue"""
+    return SalesRollupService(db).top_products(*_sales_window(start, end), limit)
+
+
+@router.get("/products/{product_id}", response_model=SalesSeriesReport)
+def product_sales_series(
+    product_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Sales of one product per day"""
+    return SalesRollupService(db).sales_series(*_sales_window(start, end), product_id=product_id)
+
+
+@router.get("/customers", response_model=CustomerSalesReport)
+def customer_sales_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    """Top customers by spend"""
+    return SalesRollupService(db).top_customers(*_sales_window(start, end), limit)
+
+
+@router.get("/customers/{customer_id}", response_model=SalesSeriesReport)
+def customer_sales_series(
+    customer_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Purchases of one customer per day"""
+    return SalesRollupService(db).sales_series(*_sales_window(start, end), customer_id=customer_id)
+
+
+@router.post("/rollups/refresh", response_model=RollupRefreshResult)
+def refresh_rollups(db: Session = Depends(get_db)):
+    """Fold new purchases into the rollups now instead of waiting for the next run"""
+    service = SalesRollupService(db)
+    folded = service.catch_up()
+    return {'folded': folded, 'as_of_purchase_id': service.get_watermark()}
+
+
+# Async request path (ASYNC_DATABASE_ENABLED)
+@async_router.post("/repricing", response_model=RepricingReport)
+async def repricing_report_async(request: RepricingRequest, db: AsyncSession = Depends(get_async_read_db)):
+    """What-if: re-price historic bills with other prices or tax rates (nothing is written)"""
+    _check_window(request)
+    return await AsyncRepricingService(db).run(request)
+
+
+@async_router.get("/sales", response_model=SalesSeriesReport)
+async def sales_report_async(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: Granularity = "day",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Takings per day or hour, read from the sales rollups"""
+    return await AsyncSalesRollupService(db).sales_series(*_sales_window(start, end), granularity)
+
+
+@async_router.get("/products", response_model=ProductSalesReport)
+async def product_sales_report_async(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Best-selling products by revenue"""
+    return await AsyncSalesRollupService(db).top_products(*_sales_window(start, end), limit)
+
+
+@async_router.get("/products/{product_id}", response_model=SalesSeriesReport)
+async def product_sales_series_async(
+    product_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Sales of one product per day"""
+    return await AsyncSalesRollupService(db).sales_series(
+        *_sales_window(start, end), product_id=product_id
+    )
+
+
+@async_router.get("/customers", response_model=CustomerSalesReport)
+async def customer_sales_report_async(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Top customers by spend"""
+    return await AsyncSalesRollupService(db).top_customers(*_sales_window(start, end), limit)
+
+
+@async_router.get("/customers/{customer_id}", response_model=SalesSeriesReport)
+async def customer_sales_series_async(
+    customer_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Purchases of one customer per day"""
+    return await AsyncSalesRollupService(db).sales_series(
+        *_sales_window(start, end), customer_id=customer_id
+    )
+
+
+@async_router.post("/rollups/refresh", response_model=RollupRefreshResult)
+async def refresh_rollups_async(db: AsyncSession = Depends(get_async_db)):
+    """Fold new purchases into the rollups now instead of waiting for the next run"""
+    service = AsyncSalesRollupService(db)
+    folded = await service.catch_up()
+    return {'folded': folded, 'as_of_purchase_id': await service.get_watermark()}
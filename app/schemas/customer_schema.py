@@ -0,0 +1,15 @@
+from pydantic import BaseModel, EmailStr
+from typing import Optional
+from datetime import datetime
+
+
+class CustomerProfile(BaseModel):
+    """Lifetime figures kept on the customer row by checkout"""
+    id: int
+    email: EmailStr
+    created_at: datetime
+    bill_count: int
+    lifetime_spend: float
+    average_bill: float
+    last_purchase_id: Optional[int] = None
+    last_purchase_at: Optional[datetime] = None
@@ -1,6 +1,18 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import List, Optional, Any
-from datetime import datetime
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, ConfigDict
+from typing import Annotated, Dict, List, Optional, Any, Generic, Literal, TypeVar
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def _whole_paise(amount: float) -> float:
+    """Prices are stored as integer paise: anything finer would be rounded (possibly to 0)"""
+    if Decimal(str(amount)).as_tuple().exponent < -2:
+        raise ValueError("must have at most 2 decimal places")
+    return amount
+
+
+# A unit price: at least one paisa, in whole paise
+Price = Annotated[float, Field(ge=0.01), AfterValidator(_whole_paise)]
 
 
 # Customer Schemas
@@ -23,7 +35,7 @@ class CustomerResponse(CustomerBase):
 class ProductBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     stock: int = Field(..., ge=0)
-    price: float = Field(..., gt=0)
+    price: Price
     tax_percent: float = Field(..., ge=0, le=100)
 
 
@@ -34,7 +46,7 @@ class ProductCreate(ProductBase):
 class ProductUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=255)
     stock: Optional[int] = Field(None, ge=0)
-    price: Optional[float] = Field(None, gt=0)
+    price: Optional[Price] = None
     tax_percent: Optional[float] = Field(None, ge=0, le=100)
 
 
@@ -46,6 +58,29 @@ class ProductResponse(ProductBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductCatalogEntry(BaseModel):
+    """Cached catalog view of a product (no stock)"""
+    id: int
+    name: str
+    price: float
+    tax_percent: float
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ProductImportReport(BaseModel):
+    processed: int
+    upserted: int
+    failed: int
+    errors: List[ProductImportError] = []
+    errors_truncated: bool = False
+
+
 # Denomination Schemas
 class DenominationBase(BaseModel):
     value: int = Field(..., gt=0)
@@ -53,7 +88,7 @@ class DenominationBase(BaseModel):
 
 
 class DenominationCreate(DenominationBase):
-    pass
+    drawer_id: int = Field(1, gt=0)
 
 
 class DenominationUpdate(BaseModel):
@@ -62,11 +97,55 @@ class DenominationUpdate(BaseModel):
 
 class DenominationResponse(DenominationBase):
     id: int
+    drawer_id: int
     updated_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
 
 
+# Cash drawer (one per till) Schemas
+class DrawerSummary(BaseModel):
+    drawer_id: int
+    denominations: List[DenominationResponse]
+    total_value: int
+    change_given: Dict[int, int] = {}  # note value -> notes handed out as change, all time
+
+
+class DrawerCountLine(BaseModel):
+    value: int = Field(..., gt=0)
+    count: int = Field(..., ge=0)
+
+
+def _one_line_per_value(counted: List[DrawerCountLine]) -> List[DrawerCountLine]:
+    """A repeated value would silently keep only its last count"""
+    values = [line.value for line in counted]
+    repeated = sorted({value for value in values if values.count(value) > 1})
+    if repeated:
+        raise ValueError(f"each value may be counted once; repeated: {', '.join(map(str, repeated))}")
+    return counted
+
+
+class DrawerReconcileRequest(BaseModel):
+    counted: Annotated[List[DrawerCountLine], AfterValidator(_one_line_per_value)] = Field(..., min_length=1)
+    apply: bool = False  # overwrite the recorded counts with the counted ones
+
+
+class DrawerReconcileLine(BaseModel):
+    value: int
+    expected: int
+    counted: int
+    variance: int
+
+
+class DrawerReconciliation(BaseModel):
+    drawer_id: int
+    lines: List[DrawerReconcileLine]
+    expected_total: int
+    counted_total: int
+    variance_total: int
+    applied: bool
+
+
 # Purchase Item Schema
 class PurchaseItemInput(BaseModel):
     product_id: int = Field(..., gt=0)
@@ -97,11 +176,13 @@ class PurchaseCreate(BaseModel):
     items: List[PurchaseItemInput] = Field(..., min_length=1)
     paid_amount: float = Field(..., gt=0)
     denominations: List[DenominationInput] = Field(..., min_length=1)
+    drawer_id: int = Field(1, gt=0)  # till whose drawer gives the change
 
 
 class PurchaseDenominationResponse(BaseModel):
     denomination_value: int
     count_given: int
+    drawer_id: int = 1
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -121,10 +202,134 @@ class PurchaseResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PurchaseSummary(BaseModel):
+    """Purchase list row without line items"""
+    id: int
+    customer_id: int
+    customer_email: str
+    total_amount: float
+    tax_amount: float
+    final_amount: float
+    paid_amount: float
+    balance_amount: float
+    created_at: datetime
+    item_count: int
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PurchaseBatchResult(BaseModel):
+    """Outcome of one bill in a batch checkout"""
+    index: int  # position in the submitted list
+    status: Literal["created", "failed"]
+    purchase_id: Optional[int] = None
+    final_amount: Optional[float] = None
+    balance_amount: Optional[float] = None
+    error: Optional[str] = None
+    details: Optional[Any] = None
+
+
+class PurchaseBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[PurchaseBatchResult]
+
+
+# Report Schemas
+class RepricingRequest(BaseModel):
+    """What-if scenario replayed over historic line snapshots"""
+    start: Optional[datetime] = None  # purchases created at or after
+    end: Optional[datetime] = None  # purchases created before
+    current_prices: bool = False  # reprice at today's catalog price and tax
+    price_overrides: Dict[int, Price] = {}  # product_id -> unit price
+    tax_overrides: Dict[int, Annotated[float, Field(ge=0, le=100)]] = {}  # product_id -> tax percent
+    tax_percent: Optional[float] = Field(None, ge=0, le=100)  # every line without a tax override
+
+
+class RepricingTotals(BaseModel):
+    total_amount: float
+    tax_amount: float
+    final_amount: float
+
+
+class RepricingProductLine(BaseModel):
+    product_id: int
+    units: int
+    actual_final: float
+    repriced_final: float
+    delta: float
+
+
+class RepricingReport(BaseModel):
+    purchases: int
+    lines: int
+    bills_changed: int
+    actual: RepricingTotals
+    repriced: RepricingTotals
+    delta: RepricingTotals
+    products: List[RepricingProductLine]  # largest absolute delta first
+    engine: str  # "numpy" or "python"
+
+
+class SalesFigures(BaseModel):
+    bills: int
+    units: int
+    revenue: float  # tax inclusive
+    tax: float
+
+
+class SalesBucket(SalesFigures):
+    day: date
+    hour: Optional[int] = None  # UTC hour; only for granularity=hour
+
+
+class SalesSeriesReport(BaseModel):
+    start: date
+    end: date
+    granularity: Literal["day", "hour"]
+    product_id: Optional[int] = None
+    customer_id: Optional[int] = None
+    as_of_purchase_id: int  # rollups include every purchase up to this ID
+    buckets: List[SalesBucket]
+    totals: SalesFigures
+
+
+class ProductSales(SalesFigures):
+    product_id: int
+    name: str
+
+
+class ProductSalesReport(BaseModel):
+    start: date
+    end: date
+    as_of_purchase_id: int
+    products: List[ProductSales]  # highest revenue first
+
+
+class CustomerSales(SalesFigures):
+    customer_id: int
+    email: str
+
+
+class CustomerSalesReport(BaseModel):
+    start: date
+    end: date
+    as_of_purchase_id: int
+    customers: List[CustomerSales]  # highest revenue first
+
+
+class RollupRefreshResult(BaseModel):
+    folded: int
+    as_of_purchase_id: int
+
+
 # Pagination
-class PaginatedResponse(BaseModel):
-    items: List[Any]
-    total: int
-    page: int
+T = TypeVar("T")
+
+
+class PaginatedResponse(BaseModel, Generic[T]):
+    """Keyset page: pass next_cursor back as ?cursor= for the following page"""
+    items: List[T]
+    next_cursor: Optional[str] = None
     page_size: int
-    total_pages: int
+    total: Optional[int] = None  # only computed when include_total=true
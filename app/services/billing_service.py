@@ -1,29 +1,59 @@
+from sqlalchemy import case, insert, update
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import Any, List, Dict, Optional, Tuple
+from datetime import datetime
 from decimal import Decimal
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import random
+import time
 
-from app.models.customer import Customer
 from app.models.product import Product
 from app.models.purchase import Purchase
 from app.models.purchase_item import PurchaseItem
 from app.models.denomination import Denomination
 from app.models.purchase_denomination import PurchaseDenomination
-from app.schemas.schemas import PurchaseCreate, PurchaseItemInput
+from app.crud.customer_crud import CustomerRepository
+from app.crud.product_repository import bump_catalog_version
+from app.crud.email_outbox_repository import EmailOutboxRepository
+from app.crud.idempotency_repository import IdempotencyRepository
+from app.schemas.schemas import PurchaseCreate, PurchaseItemInput, PurchaseResponse
 from app.core.exceptions import (
     ResourceNotFoundException,
     InsufficientStockException,
     InvalidPaymentException,
-    InsufficientDenominationException
+    InsufficientDenominationException,
+    ConcurrencyConflictException,
+    IdempotencyKeyReuseException
 )
+from app.core.config import get_settings
+from app.core.metrics import CHECKOUT_STEP_SECONDS, StepTimer
 from app.utils.denomination_calculator import calculate_change_denominations
-from app.services.email_service import EmailService
+from app.utils.idempotency_cache import idempotency_cache, request_fingerprint
+from app.utils.money import as_money, to_basis_points, to_paise, to_rupees
+from app.utils.pricing_engine import price_lines
 import logging
 
 logger = logging.getLogger(__name__)
-executor = ThreadPoolExecutor(max_workers=2)
+settings = get_settings()
+
+
+# (Idempotency-Key, request fingerprint)
+Idempotency = Tuple[str, str]
+
+
+def _retry_delay(attempt: int) -> float:
+    """Jittered exponential backoff between checkout attempts"""
+    return settings.CHECKOUT_RETRY_BACKOFF * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+def _idempotency(purchase_data: PurchaseCreate, idempotency_key: Optional[str]) -> Optional[Idempotency]:
+    if not idempotency_key:
+        return None
+    return idempotency_key, request_fingerprint(purchase_data.model_dump(mode="json"))
 
 
 class BillingService:
@@ -32,14 +62,74 @@ class BillingService:
     Follows the exact data flow: Customer -> Purchase -> PurchaseItems -> Stock Update -> Denominations
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, concurrency_mode: Optional[str] = None):
         self.db = db
+        self.concurrency_mode = concurrency_mode or settings.CHECKOUT_CONCURRENCY_MODE
+        self.replayed = False  # set when create_purchase returned a stored response
+    
+    @property
+    def optimistic(self) -> bool:
+        return self.concurrency_mode == "optimistic"
     
-    def create_purchase(self, purchase_data: PurchaseCreate) -> Purchase:
+    def create_purchase(self, purchase_data: PurchaseCreate, idempotency_key: Optional[str] = None) -> Any:
+        """
+        Create a purchase, retrying when a concurrent checkout won the race.
+        
+        In pessimistic mode rows are locked up front, so conflicts only surface
+        on backends without SELECT ... FOR UPDATE (SQLite). In optimistic mode
+        a version mismatch rolls the attempt back and the whole flow re-reads.
+        
+        With an idempotency key, a repeated request returns the stored
+        PurchaseResponse (as a dict) without running the billing flow again.
+        """
+        idempotency = _idempotency(purchase_data, idempotency_key)
+        if idempotency:
+            stored = self._stored_response(idempotency)
+            if stored is not None:
+                return stored
+        
+        attempts = settings.CHECKOUT_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._create_purchase_once(purchase_data, idempotency)
+            except ConcurrencyConflictException:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Checkout conflict, retrying (attempt {attempt}/{attempts - 1})")
+                time.sleep(_retry_delay(attempt))
+            except IntegrityError:
+                # A concurrent request with the same key committed first
+                stored = self._stored_response(idempotency) if idempotency else None
+                if stored is None:
+                    raise
+                return stored
+    
+    def _stored_response(self, idempotency: Idempotency) -> Optional[Dict]:
+        """Completed response for this key (front cache, then database), or None"""
+        key, request_hash = idempotency
+        cached = idempotency_cache.get(key)
+        if cached is None:
+            record = IdempotencyRepository(self.db).get_active(key)
+            if record is None or record.response is None:
+                return None
+            cached = (record.request_hash, record.response)
+            idempotency_cache.put(key, *cached, record.expires_at)
+        
+        if cached[0] != request_hash:
+            raise IdempotencyKeyReuseException(
+                "Idempotency-Key was already used for a different request",
+                details={"idempotency_key": key}
+            )
+        self.replayed = True
+        logger.info(f"Replaying stored response for Idempotency-Key {key}")
+        return cached[1]
+    
+    def _create_purchase_once(self, purchase_data: PurchaseCreate, idempotency: Optional[Idempotency] = None) -> Purchase:
         """
         Create a complete purchase with full transaction management.
         
         Transaction Flow:
+        0. Claim the idempotency key, if one was sent
         1. Validate denominations match paid amount
         2. Get or create customer
         3. Validate products and stock
@@ -48,60 +138,106 @@ class BillingService:
         6. Create purchase items with snapshots
         7. Update product stock
         8. Handle change denominations
-        9. Commit or rollback
+        9. Bump the customer's lifetime stats
+        10. Queue invoice email in the outbox (and store the idempotent response)
+        11. Commit or rollback
         """
         try:
+            # Claim the idempotency key first: a concurrent duplicate waits here
+            # (unique index) before taking any product or drawer locks
+            timer = StepTimer(CHECKOUT_STEP_SECONDS)
+            idempotency_record = None
+            if idempotency:
+                idempotency_record = IdempotencyRepository(self.db).claim(*idempotency)
+            
             # Step 1: Validate denominations
-            self._validate_denominations(purchase_data.denominations, purchase_data.paid_amount)
+            paid_amount = as_money(purchase_data.paid_amount)
+            self._validate_denominations(purchase_data.denominations, paid_amount)
+            timer.lap("validate")
             
             # Step 2: Get or create customer
-            customer = self._get_or_create_customer(purchase_data.customer_email)
+            customers = CustomerRepository(self.db)
+            email = purchase_data.customer_email
+            customer_id = customers.get_or_create_ids([email])[email]
+            timer.lap("customer")
             
             # Step 3: Validate products and stock
             products_data = self._validate_and_fetch_products(purchase_data.items)
+            timer.lap("fetch")
             
             # Step 4: Calculate totals
             calculations = self._calculate_purchase_totals(products_data)
             
             # Step 5: Validate payment
-            if purchase_data.paid_amount < calculations['final_amount']:
+            if paid_amount < calculations['final_amount']:
                 raise InvalidPaymentException(
-                    f"Insufficient payment. Required: {calculations['final_amount']}, Paid: {purchase_data.paid_amount}"
+                    f"Insufficient payment. Required: {calculations['final_amount']}, Paid: {paid_amount}"
                 )
+            timer.lap("totals")
             
             # Step 6: Create purchase record
             purchase = Purchase(
-                customer_id=customer.id,
+                customer_id=customer_id,
                 total_amount=calculations['total_amount'],
                 tax_amount=calculations['tax_amount'],
                 final_amount=calculations['final_amount'],
-                paid_amount=purchase_data.paid_amount,
-                balance_amount=purchase_data.paid_amount - calculations['final_amount']
+                paid_amount=paid_amount,
+                balance_amount=paid_amount - calculations['final_amount']
             )
             self.db.add(purchase)
             self.db.flush()  # Get purchase.id without committing
+            timer.lap("purchase")
             
             # Step 7: Create purchase items with price snapshots
             self._create_purchase_items(purchase.id, products_data)
+            timer.lap("items")
             
             # Step 8: Update product stock (CRITICAL - inventory management)
             self._update_product_stock(products_data)
+            timer.lap("stock")
             
             # Step 9: Handle change denominations
-            change_amount = purchase_data.paid_amount - calculations['final_amount']
+            change_amount = paid_amount - calculations['final_amount']
             if change_amount > 0:
-                self._handle_change_denominations(purchase.id, change_amount)
+                self._handle_change_denominations(purchase.id, change_amount, purchase_data.drawer_id)
+            timer.lap("change")
+            
+            # Step 10: Bump the customer's lifetime stats (customer row lock is taken last)
+            self.db.flush()
+            timer.lap("flush")
+            customers.record_purchases([self._customer_stats(purchase)])
+            
+            # Step 11: Queue invoice email in the same transaction (sent by the email worker)
+            EmailOutboxRepository(self.db).enqueue(
+                purchase.id, email, self.build_invoice_payload(purchase)
+            )
+            
+            response = None
+            if idempotency_record is not None:
+                response = PurchaseResponse.model_validate(purchase).model_dump(mode="json")
+                IdempotencyRepository(self.db).complete(idempotency_record, purchase.id, response)
+                key_expires_at = idempotency_record.expires_at  # read before the commit expires it
+            timer.lap("outbox")
             
             # Commit transaction
             self.db.commit()
             self.db.refresh(purchase)
+            timer.lap("commit")
+            if response is not None:
+                idempotency_cache.put(idempotency[0], idempotency[1], response, key_expires_at)
+            customers.after_commit([email])
             
-            # Step 10: Send email asynchronously (non-blocking)
-            executor.submit(self._send_invoice_email, customer.email, purchase)
-            
-            logger.info(f"Purchase {purchase.id} created successfully for customer {customer.email}")
+            logger.info(f"Purchase {purchase.id} created successfully for customer {email}")
             return purchase
             
+        except ConcurrencyConflictException as e:
+            self.db.rollback()
+            logger.info(f"Concurrent update detected: {e.message}")
+            raise
+        except StaleDataError as e:
+            self.db.rollback()
+            logger.info(f"Concurrent update detected: {str(e)}")
+            raise ConcurrencyConflictException("Concurrent checkout modified the same rows")
         except (ResourceNotFoundException, InsufficientStockException, 
                 InvalidPaymentException, InsufficientDenominationException) as e:
             self.db.rollback()
@@ -116,156 +252,537 @@ class BillingService:
             logger.error(f"Unexpected error during purchase creation: {str(e)}")
             raise
     
-    def _validate_denominations(self, denominations: List, paid_amount: float):
+    def create_purchases_batch(self, bills: List[PurchaseCreate]) -> List[Dict]:
+        """
+        Check out many bills in one transaction (offline tills replaying their queue).
+        
+        Customers, products and the bills' drawers are read once for the whole
+        batch and every bill is validated against running stock/drawer totals. A bill
+        that breaks a business rule is reported and skipped; the rest are
+        inserted together, and stock and drawer counts are decremented with a
+        single statement each. Returns one result per bill, in request order.
+        """
+        attempts = settings.CHECKOUT_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._create_purchases_batch_once(bills)
+            except ConcurrencyConflictException:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Batch checkout conflict, retrying (attempt {attempt}/{attempts - 1})")
+                time.sleep(_retry_delay(attempt))
+    
+    def _create_purchases_batch_once(self, bills: List[PurchaseCreate]) -> List[Dict]:
+        results: List[Optional[Dict]] = [None] * len(bills)
+        try:
+            self._begin_batch_transaction()
+            customer_repository = CustomerRepository(self.db)
+            customer_ids = customer_repository.get_or_create_ids(bill.customer_email for bill in bills)
+            products = self._fetch_products({item.product_id for bill in bills for item in bill.items})
+            stock = {product.id: product.stock for product in products.values()}
+            denominations = self._fetch_drawers({bill.drawer_id for bill in bills})
+            drawers = {
+                drawer_id: {value: d.available_count for value, d in rows.items()}
+                for drawer_id, rows in denominations.items()
+            }
+            accepted: List[Dict] = []
+            
+            for index, bill in enumerate(bills):
+                try:
+                    paid_amount = as_money(bill.paid_amount)
+                    self._validate_denominations(bill.denominations, paid_amount)
+                    requested = self._merge_quantities(bill.items)
+                    self._check_stock(requested, products, stock)
+                    products_data = [
+                        {'product': products[item.product_id], 'quantity': item.quantity}
+                        for item in bill.items
+                    ]
+                    calculations = self._calculate_purchase_totals(products_data)
+                    if paid_amount < calculations['final_amount']:
+                        raise InvalidPaymentException(
+                            f"Insufficient payment. Required: {calculations['final_amount']}, Paid: {paid_amount}"
+                        )
+                    
+                    change: Dict[int, int] = {}
+                    change_amount = paid_amount - calculations['final_amount']
+                    if change_amount > 0:
+                        change = calculate_change_denominations(change_amount, drawers[bill.drawer_id])
+                except (ResourceNotFoundException, InsufficientStockException,
+                        InvalidPaymentException, InsufficientDenominationException) as e:
+                    results[index] = self._batch_failure(index, e.message, e.details)
+                    continue
+                
+                # Hold this bill's stock and notes so later bills see what is left
+                for product_id, quantity in requested.items():
+                    stock[product_id] -= quantity
+                for value, count in change.items():
+                    drawers[bill.drawer_id][value] -= count
+                accepted.append({
+                    'index': index,
+                    'bill': bill,
+                    'customer_id': customer_ids[bill.customer_email],
+                    'products_data': products_data,
+                    'calculations': calculations,
+                    'requested': requested,
+                    'change': change
+                })
+            
+            inserted = self._insert_batch(accepted, results)
+            
+            used_stock: Dict[int, int] = {}
+            used_notes: Dict[int, Dict[int, int]] = {drawer_id: {} for drawer_id in denominations}
+            for entry in inserted:
+                for product_id, quantity in entry['requested'].items():
+                    used_stock[product_id] = used_stock.get(product_id, 0) + quantity
+                notes = used_notes[entry['bill'].drawer_id]
+                for value, count in entry['change'].items():
+                    notes[value] = notes.get(value, 0) + count
+            if used_stock:
+                self._reserve_stock(used_stock, products)
+            for drawer_id, notes in used_notes.items():
+                self._take_denominations(notes, denominations[drawer_id], drawer_id)
+            customer_repository.record_purchases([self._customer_stats(entry['purchase']) for entry in inserted])
+            
+            outbox = EmailOutboxRepository(self.db)
+            for entry in inserted:
+                purchase = entry['purchase']
+                outbox.enqueue(purchase.id, entry['bill'].customer_email, self.build_invoice_payload(purchase))
+                results[entry['index']] = {
+                    'index': entry['index'],
+                    'status': 'created',
+                    'purchase_id': purchase.id,
+                    'final_amount': purchase.final_amount,
+                    'balance_amount': purchase.balance_amount
+                }
+            
+            self.db.commit()
+            customer_repository.after_commit({entry['bill'].customer_email for entry in inserted})
+            logger.info(f"Batch checkout: {len(inserted)} of {len(bills)} bill(s) created")
+            return results
+            
+        except ConcurrencyConflictException as e:
+            self.db.rollback()
+            logger.info(f"Concurrent update detected: {e.message}")
+            raise
+        except StaleDataError as e:
+            self.db.rollback()
+            logger.info(f"Concurrent update detected: {str(e)}")
+            raise ConcurrencyConflictException("Concurrent checkout modified the same rows")
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Batch checkout failed: {str(e)}")
+            raise
+    
+    def _begin_batch_transaction(self):
+        """
+        pysqlite opens transactions lazily, so a SAVEPOINT issued first would
+        start a transaction of its own and its RELEASE would commit it. On
+        SQLite take the write lock up front so every savepoint nests inside
+        the batch transaction.
+        """
+        if self.db.get_bind().dialect.name == "sqlite" and not self.db.in_transaction():
+            self.db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+    
+    def _insert_batch(self, accepted: List[Dict], results: List[Optional[Dict]]) -> List[Dict]:
+        """
+        Insert accepted bills with one flush inside a savepoint. If the
+        database rejects it, retry bill by bill, each in its own savepoint,
+        so a bad bill fails alone. Returns the entries that were inserted.
+        """
+        if not accepted:
+            return []
+        try:
+            with self.db.begin_nested():
+                for entry in accepted:
+                    entry['purchase'] = self._build_purchase(entry)
+                self.db.add_all(entry['purchase'] for entry in accepted)
+                self.db.flush()
+            return accepted
+        except SQLAlchemyError as e:
+            logger.warning(f"Batch insert rejected, isolating bills: {str(e)}")
+        
+        inserted = []
+        for entry in accepted:
+            try:
+                with self.db.begin_nested():
+                    entry['purchase'] = self._build_purchase(entry)
+                    self.db.add(entry['purchase'])
+                    self.db.flush()
+                inserted.append(entry)
+            except SQLAlchemyError as e:
+                logger.error(f"Batch bill {entry['index']} rejected by the database: {str(e)}")
+                results[entry['index']] = self._batch_failure(
+                    entry['index'], "Database rejected the bill", str(e).splitlines()[0]
+                )
+        return inserted
+    
+    def _build_purchase(self, entry: Dict) -> Purchase:
+        """Purchase with its items and change records, ready to be flushed together"""
+        bill = entry['bill']
+        calculations = entry['calculations']
+        purchase = Purchase(
+            customer_id=entry['customer_id'],
+            total_amount=calculations['total_amount'],
+            tax_amount=calculations['tax_amount'],
+            final_amount=calculations['final_amount'],
+            paid_amount=as_money(bill.paid_amount),
+            balance_amount=as_money(bill.paid_amount) - calculations['final_amount']
+        )
+        purchase.purchase_items = self._build_purchase_items(entry['products_data'])
+        purchase.purchase_denominations = [
+            PurchaseDenomination(drawer_id=bill.drawer_id, denomination_value=value, count_given=count)
+            for value, count in entry['change'].items()
+        ]
+        return purchase
+    
+    @staticmethod
+    def _customer_stats(purchase: Purchase) -> Dict:
+        return {
+            'customer_id': purchase.customer_id,
+            'purchase_id': purchase.id,
+            'final_amount': purchase.final_amount,
+            'created_at': purchase.created_at
+        }
+    
+    @staticmethod
+    def _batch_failure(index: int, error: str, details=None) -> Dict:
+        return {'index': index, 'status': 'failed', 'error': error, 'details': details}
+    
+    def _validate_denominations(self, denominations: List, paid_amount: Decimal):
         """Validate that denomination total matches paid amount"""
         denom_total = sum(d.value * d.count for d in denominations)
-        if denom_total != paid_amount:
+        if to_paise(denom_total) != to_paise(paid_amount):
             raise InvalidPaymentException(
                 f"Denomination total (₹{denom_total}) must match Cash Paid (₹{paid_amount})"
             )
     
-    def _get_or_create_customer(self, email: str) -> Customer:
-        """Get existing customer or create new one"""
-        customer = self.db.query(Customer).filter(Customer.email == email).first()
-        if not customer:
-            customer = Customer(email=email)
-            self.db.add(customer)
-            self.db.flush()
-            logger.info(f"New customer created: {email}")
-        return customer
-    
     def _validate_and_fetch_products(self, items: List[PurchaseItemInput]) -> List[Dict]:
-        """Validate products exist and have sufficient stock"""
-        products_data = []
+        """Validate products exist and have sufficient stock (single IN query)"""
+        # Merge duplicate lines so stock is checked against the total requested
+        requested = self._merge_quantities(items)
         
-        for item in items:
-            product = self.db.query(Product).filter(Product.id == item.product_id).first()
+        products = self._fetch_products(requested.keys())
+        self._check_stock(requested, products, {product.id: product.stock for product in products.values()})
+        return [
+            {
+                'product': products[item.product_id],
+                'quantity': item.quantity
+            }
+            for item in items
+        ]
+    
+    def _fetch_products(self, product_ids) -> Dict[int, Product]:
+        """Load products by ID in one IN query, locking them in pessimistic mode"""
+        query = self.db.query(Product).filter(Product.id.in_(list(product_ids)))
+        if not self.optimistic:
+            # Lock in primary-key order so concurrent tills never deadlock
+            query = query.order_by(Product.id).with_for_update()
+        return {product.id: product for product in query.all()}
+    
+    @staticmethod
+    def _check_stock(requested: Dict[int, int], products: Dict[int, Product], stock: Dict[int, int]):
+        """Raise unless every requested product exists and `stock` covers it"""
+        for product_id, quantity in requested.items():
+            product = products.get(product_id)
             
             if not product:
                 raise ResourceNotFoundException(
-                    f"Product with ID {item.product_id} not found"
+                    f"Product with ID {product_id} not found"
                 )
             
-            if product.stock < item.quantity:
+            if stock[product_id] < quantity:
                 raise InsufficientStockException(
-                    f"Insufficient stock for {product.name}. Available: {product.stock}, Required: {item.quantity}"
+                    f"Insufficient stock for {product.name}. Available: {stock[product_id]}, Required: {quantity}"
                 )
-            
-            products_data.append({
-                'product': product,
-                'quantity': item.quantity
-            })
-        
-        return products_data
     
-    def _calculate_purchase_totals(self, products_data: List[Dict]) -> Dict[str, float]:
-        """Calculate total amount, tax, and final amount"""
-        total_amount = 0.0
-        total_tax = 0.0
+    @staticmethod
+    def _merge_quantities(items: List) -> Dict[int, int]:
+        """Sum requested quantity per product ID, preserving first-seen order"""
+        requested: Dict[int, int] = {}
+        for item in items:
+            requested[item.product_id] = requested.get(item.product_id, 0) + item.quantity
+        return requested
+    
+    def _calculate_purchase_totals(self, products_data: List[Dict]) -> Dict[str, Decimal]:
+        """Calculate total amount, tax, and final amount (exact, in integer paise)"""
+        priced = price_lines(
+            [to_paise(data['product'].price) for data in products_data],
+            [data['quantity'] for data in products_data],
+            [to_basis_points(data['product'].tax_percent) for data in products_data]
+        )
         
-        for data in products_data:
-            product = data['product']
-            quantity = data['quantity']
-            
-            item_total = product.price * quantity
-            item_tax = item_total * (product.tax_percent / 100)
-            
-            total_amount += item_total
-            total_tax += item_tax
-            
+        for data, (item_total, item_tax) in zip(products_data, priced.lines()):
             # Store calculated values for later use
-            data['item_total'] = item_total
-            data['item_tax'] = item_tax
-        
-        final_amount = total_amount + total_tax
+            data['item_total'] = to_rupees(item_total)
+            data['item_tax'] = to_rupees(item_tax)
         
+        total_amount, total_tax = priced.totals()
         return {
-            'total_amount': round(total_amount, 2),
-            'tax_amount': round(total_tax, 2),
-            'final_amount': round(final_amount, 2)
+            'total_amount': to_rupees(total_amount),
+            'tax_amount': to_rupees(total_tax),
+            'final_amount': to_rupees(total_amount + total_tax)
         }
     
     def _create_purchase_items(self, purchase_id: int, products_data: List[Dict]):
         """Create purchase items with price snapshots (NEVER recompute history)"""
-        for data in products_data:
-            product = data['product']
-            quantity = data['quantity']
-            
-            purchase_item = PurchaseItem(
-                purchase_id=purchase_id,
-                product_id=product.id,
-                quantity=quantity,
-                unit_price_snapshot=product.price,  # Freeze current price
-                tax_percent_snapshot=product.tax_percent,  # Freeze current tax
-                tax_amount=round(data['item_tax'], 2),
-                total_price=round(data['item_total'] + data['item_tax'], 2)
-            )
+        for purchase_item in self._build_purchase_items(products_data):
+            purchase_item.purchase_id = purchase_id
             self.db.add(purchase_item)
     
+    @staticmethod
+    def _build_purchase_items(products_data: List[Dict]) -> List[PurchaseItem]:
+        return [
+            PurchaseItem(
+                product_id=data['product'].id,
+                quantity=data['quantity'],
+                unit_price_snapshot=data['product'].price,  # Freeze current price
+                tax_percent_snapshot=data['product'].tax_percent,  # Freeze current tax
+                tax_amount=data['item_tax'],
+                total_price=data['item_total'] + data['item_tax']
+            )
+            for data in products_data
+        ]
+    
     def _update_product_stock(self, products_data: List[Dict]):
-        """Update product inventory"""
+        """Reserve inventory for one bill's lines"""
+        products: Dict[int, Product] = {}
+        requested: Dict[int, int] = {}
         for data in products_data:
             product = data['product']
-            quantity = data['quantity']
-            product.stock -= quantity
-            logger.debug(f"Stock updated for {product.name}: {product.stock + quantity} -> {product.stock}")
+            products[product.id] = product
+            requested[product.id] = requested.get(product.id, 0) + data['quantity']
+        self._reserve_stock(requested, products)
+    
+    def _reserve_stock(self, requested: Dict[int, int], products: Dict[int, Product]):
+        """
+        Reserve inventory with one guarded set-based UPDATE.
+        
+        Every product row is decremented only if it still holds enough stock;
+        the affected-row count decides whether the bill goes through, so a
+        concurrent checkout that drained the stock aborts this transaction.
+        Bumps the catalog version in the same transaction (product list ETags).
+        """
+        quantity = case(requested, value=Product.id)
+        conditions = [Product.id.in_(requested.keys()), Product.stock >= quantity]
+        if self.optimistic:
+            versions = {product_id: products[product_id].version for product_id in requested}
+            conditions.append(Product.version == case(versions, value=Product.id))
+        
+        result = self.db.execute(
+            update(Product)
+            .where(*conditions)
+            .values(
+                stock=Product.stock - quantity,
+                version=Product.version + 1,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        
+        if result.rowcount != len(requested):
+            if self.optimistic:
+                raise ConcurrencyConflictException(
+                    "Product rows changed since they were read",
+                    details={"requested": requested}
+                )
+            raise InsufficientStockException(
+                "Insufficient stock: inventory changed while the bill was being processed",
+                details={"requested": requested}
+            )
+        
+        bump_catalog_version(self.db)
+        
+        # Keep the in-session objects consistent without issuing another UPDATE
+        for product_id, quantity in requested.items():
+            product = products[product_id]
+            set_committed_value(product, 'stock', product.stock - quantity)
+            set_committed_value(product, 'version', product.version + 1)
+        logger.debug(f"Stock reserved for {len(requested)} product(s)")
     
-    def _handle_change_denominations(self, purchase_id: int, change_amount: float):
-        """Calculate and store change denominations"""
+    def _handle_change_denominations(self, purchase_id: int, change_amount: float, drawer_id: int = 1):
+        """
+        Calculate and store change denominations from the till's own drawer.
+        
+        The drawer rows are read once; the change records go in with one
+        bulk INSERT and all drawer counts drop in one guarded UPDATE, so the
+        write cost is two statements however many notes are handed out.
+        """
         # Fetch available denominations
-        denominations = self.db.query(Denomination).all()
-        available_denoms = {d.value: d.available_count for d in denominations}
+        denominations = self._fetch_drawers({drawer_id})[drawer_id]
+        available_denoms = {value: d.available_count for value, d in denominations.items()}
         
         # Calculate optimal change breakdown
         change_breakdown = calculate_change_denominations(change_amount, available_denoms)
+        if not change_breakdown:
+            return
+        
+        # Record change given
+        self.db.execute(
+            insert(PurchaseDenomination),
+            [
+                {
+                    'purchase_id': purchase_id,
+                    'drawer_id': drawer_id,
+                    'denomination_value': denom_value,
+                    'count_given': count
+                }
+                for denom_value, count in change_breakdown.items()
+            ]
+        )
+        
+        # Update denomination stock
+        self._take_denominations(change_breakdown, denominations, drawer_id)
+        logger.info(f"Change of {change_amount} given from drawer {drawer_id} using denominations: {change_breakdown}")
+    
+    def _fetch_drawers(self, drawer_ids) -> Dict[int, Dict[int, Denomination]]:
+        """Load cash drawers as {drawer_id: {value: row}}, locking them in pessimistic mode"""
+        query = self.db.query(Denomination).filter(Denomination.drawer_id.in_(list(drawer_ids)))
+        if not self.optimistic:
+            # Products are locked first, then drawers by (drawer, value): a fixed global order
+            query = query.order_by(Denomination.drawer_id, Denomination.value).with_for_update()
+        drawers: Dict[int, Dict[int, Denomination]] = {drawer_id: {} for drawer_id in drawer_ids}
+        for denomination in query.all():
+            drawers[denomination.drawer_id][denomination.value] = denomination
+        return drawers
+    
+    def _take_denominations(self, used: Dict[int, int], denominations: Dict[int, Denomination], drawer_id: int):
+        """Decrement one drawer's counts with one guarded UPDATE ... CASE"""
+        used = {value: count for value, count in used.items() if count}
+        if not used:
+            return
         
-        # Store change given and update denomination stock
-        for denom_value, count in change_breakdown.items():
-            # Record change given
-            purchase_denom = PurchaseDenomination(
-                purchase_id=purchase_id,
-                denomination_value=denom_value,
-                count_given=count
+        count = case(used, value=Denomination.value)
+        conditions = [
+            Denomination.drawer_id == drawer_id,
+            Denomination.value.in_(used.keys()),
+            Denomination.available_count >= count
+        ]
+        if self.optimistic:
+            versions = {value: denominations[value].version for value in used}
+            conditions.append(Denomination.version == case(versions, value=Denomination.value))
+        
+        result = self.db.execute(
+            update(Denomination)
+            .where(*conditions)
+            .values(
+                available_count=Denomination.available_count - count,
+                version=Denomination.version + 1,
+                updated_at=datetime.utcnow()
             )
-            self.db.add(purchase_denom)
-            
-            # Update denomination stock
-            denom = self.db.query(Denomination).filter(Denomination.value == denom_value).first()
-            denom.available_count -= count
-            
-        logger.info(f"Change of {change_amount} given using denominations: {change_breakdown}")
+            .execution_options(synchronize_session=False)
+        )
+        
+        if result.rowcount != len(used):
+            if self.optimistic:
+                raise ConcurrencyConflictException(
+                    "Denomination rows changed since they were read",
+                    details={"drawer_id": drawer_id, "used": used}
+                )
+            raise InsufficientDenominationException(
+                "Insufficient denominations: drawer changed while the bill was being processed",
+                details={"drawer_id": drawer_id, "used": used}
+            )
+        
+        for value, given in used.items():
+            denomination = denominations[value]
+            set_committed_value(denomination, 'available_count', denomination.available_count - given)
+            set_committed_value(denomination, 'version', denomination.version + 1)
     
-    def _send_invoice_email(self, customer_email: str, purchase: Purchase):
-        """Send invoice email asynchronously"""
-        try:
-            # Prepare data before session closes
-            purchase_data = {
-                'id': purchase.id,
-                'total_amount': purchase.total_amount,
-                'tax_amount': purchase.tax_amount,
-                'final_amount': purchase.final_amount,
-                'paid_amount': purchase.paid_amount,
-                'balance_amount': purchase.balance_amount,
-                'created_at': str(purchase.created_at),
-                'purchase_items': [
-                    {
-                        'product_id': item.product_id,
-                        'unit_price_snapshot': item.unit_price_snapshot,
-                        'quantity': item.quantity,
-                        'tax_percent_snapshot': item.tax_percent_snapshot,
-                        'tax_amount': item.tax_amount,
-                        'total_price': item.total_price
-                    } for item in purchase.purchase_items
-                ],
-                'change_denominations': [
-                    {
-                        'denomination_value': d.denomination_value,
-                        'count_given': d.count_given
-                    } for d in purchase.purchase_denominations
-                ]
-            }
-            
-            email_service = EmailService()
-            email_service.send_invoice_email(customer_email, purchase_data)
-        except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
+    @staticmethod
+    def build_invoice_payload(purchase: Purchase) -> Dict:
+        """Snapshot the purchase into plain data for the invoice email and renderer"""
+        return {
+            'id': purchase.id,
+            'total_amount': float(purchase.total_amount),
+            'tax_amount': float(purchase.tax_amount),
+            'final_amount': float(purchase.final_amount),
+            'paid_amount': float(purchase.paid_amount),
+            'balance_amount': float(purchase.balance_amount),
+            'created_at': str(purchase.created_at),
+            'purchase_items': [
+                {
+                    'product_id': item.product_id,
+                    'unit_price_snapshot': float(item.unit_price_snapshot),
+                    'quantity': item.quantity,
+                    'tax_percent_snapshot': float(item.tax_percent_snapshot),
+                    'tax_amount': float(item.tax_amount),
+                    'total_price': float(item.total_price)
+                } for item in purchase.purchase_items
+            ],
+            'change_denominations': [
+                {
+                    'drawer_id': d.drawer_id,
+                    'denomination_value': d.denomination_value,
+                    'count_given': d.count_given
+                } for d in purchase.purchase_denominations
+            ]
+        }
+
+
+class AsyncBillingService:
+    """
+    Billing service for the async request path.
+    
+    The transactional flow is shared with BillingService: it runs through
+    AsyncSession.run_sync, which drives the sync code on the async driver's
+    connection inside a greenlet, so no threadpool worker is held while the
+    database responds. Retry backoff awaits instead of sleeping.
+    """
+    
+    def __init__(self, db: AsyncSession, concurrency_mode: Optional[str] = None):
+        self.db = db
+        self.concurrency_mode = concurrency_mode or settings.CHECKOUT_CONCURRENCY_MODE
+        self.replayed = False
+    
+    async def create_purchase(self, purchase_data: PurchaseCreate, idempotency_key: Optional[str] = None) -> Any:
+        """Create a purchase, retrying when a concurrent checkout won the race"""
+        idempotency = _idempotency(purchase_data, idempotency_key)
+        if idempotency:
+            stored = await self.db.run_sync(self._stored_response_sync, idempotency)
+            if stored is not None:
+                return stored
+        
+        attempts = settings.CHECKOUT_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return await self.db.run_sync(self._create_purchase_sync, purchase_data, idempotency)
+            except ConcurrencyConflictException:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Checkout conflict, retrying (attempt {attempt}/{attempts - 1})")
+                await asyncio.sleep(_retry_delay(attempt))
+            except IntegrityError:
+                stored = await self.db.run_sync(self._stored_response_sync, idempotency) if idempotency else None
+                if stored is None:
+                    raise
+                return stored
+    
+    def _stored_response_sync(self, session: Session, idempotency: Idempotency) -> Optional[Dict]:
+        service = BillingService(session, self.concurrency_mode)
+        stored = service._stored_response(idempotency)
+        self.replayed = service.replayed
+        return stored
+    
+    async def create_purchases_batch(self, bills: List[PurchaseCreate]) -> List[Dict]:
+        """Check out many bills in one transaction, retrying on conflicts"""
+        attempts = settings.CHECKOUT_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return await self.db.run_sync(self._create_purchases_batch_sync, bills)
+            except ConcurrencyConflictException:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Batch checkout conflict, retrying (attempt {attempt}/{attempts - 1})")
+                await asyncio.sleep(_retry_delay(attempt))
+    
+    def _create_purchases_batch_sync(self, session: Session, bills: List[PurchaseCreate]) -> List[Dict]:
+        return BillingService(session, self.concurrency_mode)._create_purchases_batch_once(bills)
+    
+    def _create_purchase_sync(
+        self, session: Session, purchase_data: PurchaseCreate, idempotency: Optional[Idempotency] = None
+    ) -> Purchase:
+        purchase = BillingService(session, self.concurrency_mode)._create_purchase_once(purchase_data, idempotency)
+        # Load collections inside the greenlet; response serialization cannot lazy-load
+        purchase.purchase_items
+        purchase.purchase_denominations
+        return purchase
@@ -0,0 +1,54 @@
+from typing import Dict, List
+import logging
+
+from app.models.denomination import Denomination
+
+logger = logging.getLogger(__name__)
+
+
+def build_drawer_summary(drawer_id: int, denominations: List[Denomination], change_given: Dict[int, int]) -> Dict:
+    """Contents of one till's drawer and what it has handed out as change"""
+    return {
+        'drawer_id': drawer_id,
+        'denominations': denominations,
+        'total_value': sum(d.value * d.available_count for d in denominations),
+        'change_given': change_given
+    }
+
+
+def uncounted_values(denominations: List[Denomination], counted: Dict[int, int]) -> List[int]:
+    """Values the drawer holds but the count left out (a partial count, e.g. notes only)"""
+    return sorted((d.value for d in denominations if d.available_count and d.value not in counted), reverse=True)
+
+
+def reconcile_drawer(drawer_id: int, denominations: List[Denomination], counted: Dict[int, int]) -> Dict:
+    """
+    Compare a physical count against the recorded drawer.
+
+    Values recorded but not counted are treated as counted zero, and
+    counted values the drawer does not know are reported as pure surplus.
+    """
+    expected = {d.value: d.available_count for d in denominations}
+    lines = []
+    for value in sorted(expected.keys() | counted.keys(), reverse=True):
+        expected_count = expected.get(value, 0)
+        counted_count = counted.get(value, 0)
+        lines.append({
+            'value': value,
+            'expected': expected_count,
+            'counted': counted_count,
+            'variance': counted_count - expected_count
+        })
+
+    expected_total = sum(line['value'] * line['expected'] for line in lines)
+    counted_total = sum(line['value'] * line['counted'] for line in lines)
+    if counted_total != expected_total:
+        logger.warning(f"Drawer {drawer_id} variance: counted {counted_total}, expected {expected_total}")
+    return {
+        'drawer_id': drawer_id,
+        'lines': lines,
+        'expected_total': expected_total,
+        'counted_total': counted_total,
+        'variance_total': counted_total - expected_total,
+        'applied': False
+    }
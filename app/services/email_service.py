@@ -1,22 +1,93 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 from app.core.config import get_settings
+from app.utils.invoice_renderer import invoice_renderer
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
 class EmailService:
-    """Simple email service for sending invoices"""
+    """
+    Email service for sending invoices.
+    
+    The SMTP connection (connect, STARTTLS, login) is opened once and reused
+    for every message until close(), so a worker draining the outbox pays the
+    handshake once per batch instead of once per invoice.
+    """
     
     def __init__(self):
         self.smtp_host = settings.SMTP_HOST
         self.smtp_port = settings.SMTP_PORT
         self.sender_email = settings.SENDER_EMAIL
         self.sender_password = settings.SENDER_PASSWORD
+        self.use_tls = settings.SMTP_USE_TLS
+        self.timeout = settings.SMTP_TIMEOUT
+        self._server: Optional[smtplib.SMTP] = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.sender_password:
+            server.login(self.sender_email, self.sender_password)
+        return server
+    
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+    
+    def close(self):
+        """Close the pooled SMTP connection"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        finally:
+            self._server = None
+    
+    def build_invoice_message(self, to_email: str, purchase_data: Dict) -> MIMEMultipart:
+        """Build the invoice MIME message"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = f"Invoice #{purchase_data['id']} - Billing System"
+        msg['From'] = self.sender_email
+        msg['To'] = to_email
+        
+        # Plain text first: clients show the last alternative they support
+        msg.attach(MIMEText(invoice_renderer.render(purchase_data, "text"), 'plain'))
+        msg.attach(MIMEText(invoice_renderer.render(purchase_data, "html"), 'html'))
+        return msg
+    
+    def deliver_invoice(self, to_email: str, purchase_data: Dict):
+        """
+        Send an invoice over the pooled connection. Raises on failure.
+        
+        A connection the server dropped (idle timeout) is re-opened once;
+        any other transport error discards it so the next call reconnects.
+        """
+        msg = self.build_invoice_message(to_email, purchase_data)
+        try:
+            self._connection().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._server = None
+            self._connection().send_message(msg)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            raise
+        except (smtplib.SMTPException, OSError):
+            self.close()
+            raise
     
     def send_invoice_email(
         self,
@@ -25,81 +96,10 @@ class EmailService:
     ):
         """Send invoice email to customer"""
         try:
-            # Create email
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"Invoice #{purchase_data['id']} - Billing System"
-            msg['From'] = self.sender_email
-            msg['To'] = to_email
-            
-            # Create HTML content
-            html_content = self._generate_invoice_html(purchase_data)
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-            
+            self.deliver_invoice(to_email, purchase_data)
             logger.info(f"Invoice email sent to {to_email} for purchase #{purchase_data['id']}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to send email: {str(e)}")
             return False
-    
-    def _generate_invoice_html(self, purchase_data: Dict) -> str:
-        """Generate HTML invoice"""
-        items_html = ""
-        for item in purchase_data.get('purchase_items', []):
-            items_html += f"""
-            <tr>
-                <td>{item['product_id']}</td>
-                <td>{item['unit_price_snapshot']:.2f}</td>
-                <td>{item['quantity']}</td>
-                <td>{item['unit_price_snapshot'] * item['quantity']:.2f}</td>
-                <td>{item['tax_percent_snapshot']:.2f}%</td>
-                <td>{item['tax_amount']:.2f}</td>
-                <td>{item['total_price']:.2f}</td>
-            </tr>
-            """
-        
-        change_html = ""
-        for denom in purchase_data.get('change_denominations', []):
-            change_html += f"<li>{denom['denomination_value']}: {denom['count_given']}</li>"
-        
-        return f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto;">
-            <h2>Invoice #{purchase_data['id']}</h2>
-            <p><strong>Date:</strong> {purchase_data['created_at']}</p>
-            
-            <h3>Items Purchased</h3>
-            <table border="1" cellpadding="5" style="border-collapse: collapse; width: 100%;">
-                <tr style="background-color: #f0f0f0;">
-                    <th>Product ID</th>
-                    <th>Unit Price</th>
-                    <th>Quantity</th>
-                    <th>Purchase Price</th>
-                    <th>Tax %</th>
-                    <th>Tax Amount</th>
-                    <th>Total</th>
-                </tr>
-                {items_html}
-            </table>
-            
-            <div style="margin-top: 20px;">
-                <p><strong>Total without tax:</strong> Rs.{purchase_data['total_amount']:.2f}</p>
-                <p><strong>Total tax payable:</strong> Rs.{purchase_data['tax_amount']:.2f}</p>
-                <p><strong>Net price:</strong> Rs.{purchase_data['final_amount']:.2f}</p>
-                <p><strong>Paid amount:</strong> Rs.{purchase_data['paid_amount']:.2f}</p>
-                <p><strong>Balance/Change:</strong> Rs.{purchase_data['balance_amount']:.2f}</p>
-            </div>
-            
-            {f'<h3>Change Denominations</h3><ul>{change_html}</ul>' if change_html else ''}
-            
-            <p style="margin-top: 30px; color: #666;">Thank you for your purchase!</p>
-        </body>
-        </html>
-        """
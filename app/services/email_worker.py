@@ -0,0 +1,113 @@
+"""
+Invoice email worker: drains the email_outbox table.
+
+Run as a dedicated process next to the API:
+    python -m app.services.email_worker
+"""
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Callable, Optional
+import signal
+import threading
+import logging
+
+from app.db.database import engine
+from app.crud.email_outbox_repository import EmailOutboxRepository
+from app.services.email_service import EmailService
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# expire_on_commit=False: a claimed batch stays loaded after the lease commits,
+# instead of being refreshed with one SELECT per message during delivery
+WorkerSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+
+class EmailOutboxWorker:
+    """
+    Sends queued invoices in batches over one reused SMTP connection.
+    
+    Each batch is leased in its own short transaction, delivered, and the
+    outcomes are committed together. Failures back off exponentially and
+    end in the dead-letter state after EMAIL_OUTBOX_MAX_ATTEMPTS.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = WorkerSessionLocal,
+        email_service: Optional[EmailService] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.email_service = email_service or EmailService()
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self._stop = threading.Event()
+    
+    def run_once(self) -> int:
+        """Deliver one batch; returns the number of messages processed"""
+        db = self.session_factory()
+        try:
+            repo = EmailOutboxRepository(db)
+            messages = repo.claim_batch(self.batch_size)
+            if not messages:
+                return 0
+            
+            for message in messages:
+                try:
+                    self.email_service.deliver_invoice(message.to_email, message.payload)
+                    repo.mark_sent(message)
+                except Exception as e:
+                    logger.warning(f"Invoice email {message.id} failed (attempt {message.attempts}): {str(e)}")
+                    repo.mark_failed(message, str(e))
+            
+            db.commit()
+            logger.info(f"Processed {len(messages)} invoice email(s)")
+            return len(messages)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def run_forever(self):
+        """Drain until stopped; sleeps only when the outbox is empty"""
+        logger.info("Email outbox worker started")
+        try:
+            while not self._stop.is_set():
+                try:
+                    processed = self.run_once()
+                except Exception as e:
+                    logger.error(f"Email outbox batch failed: {str(e)}")
+                    processed = 0
+                
+                if processed < self.batch_size:
+                    # Idle: release the SMTP connection rather than let the server time it out
+                    if processed == 0:
+                        self.email_service.close()
+                    self._stop.wait(settings.EMAIL_OUTBOX_POLL_INTERVAL)
+        finally:
+            self.email_service.close()
+            logger.info("Email outbox worker stopped")
+    
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    from app.db.database import init_db
+    from app.services import billing_service  # noqa: F401 - registers every model for init_db
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    init_db()
+    
+    worker = EmailOutboxWorker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
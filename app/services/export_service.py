@@ -0,0 +1,107 @@
+from typing import AsyncIterator, Iterator, List, Optional
+from datetime import datetime
+import csv
+import io
+import json
+import logging
+
+from app.db.database import ReadSessionLocal, get_async_read_sessionmaker
+from app.crud.purchase_repository import PurchaseRepository, AsyncPurchaseRepository
+from app.services.product_import_service import FORMAT_CSV, FORMAT_NDJSON
+from app.core.config import get_settings
+from app.utils.money import from_minor
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# One row per purchase line; bill-level amounts repeat on every line of the bill
+EXPORT_COLUMNS = (
+    "purchase_id", "created_at", "customer_id", "customer_email",
+    "bill_total_amount", "bill_tax_amount", "bill_final_amount", "paid_amount", "balance_amount",
+    "item_id", "product_id", "quantity", "unit_price", "tax_percent", "tax_amount", "total_price"
+)
+
+MEDIA_TYPES = {FORMAT_CSV: "text/csv", FORMAT_NDJSON: "application/x-ndjson"}
+
+
+def _amount_text(units: int) -> str:
+    return str(from_minor(units))
+
+
+def _amount_number(units: int) -> float:
+    return float(from_minor(units))
+
+
+def _converters(amount):
+    """Per-column converters in EXPORT_COLUMNS order (None: pass through)"""
+    return (None, datetime.isoformat, None, None) + (amount,) * 5 + (None, None, None) + (amount,) * 4
+
+
+_CSV_CONVERTERS = _converters(_amount_text)
+_NDJSON_CONVERTERS = _converters(_amount_number)
+
+
+def _convert(row, converters) -> List:
+    return [value if convert is None else convert(value) for convert, value in zip(converters, row)]
+
+
+def encode_csv(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(_convert(row, _CSV_CONVERTERS) for row in rows)
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _convert(row, _NDJSON_CONVERTERS))), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+
+class PurchaseExportService:
+    """
+    Streaming purchase export for the accounting pipeline: flat line rows as CSV or NDJSON.
+    
+    Rows come off a server-side cursor EXPORT_CHUNK_SIZE at a time and each
+    chunk is encoded and handed to the response before the next is read,
+    so memory stays flat whatever the window. The stream owns its session:
+    the request's session is closed before a StreamingResponse body runs.
+    """
+    
+    def __init__(self, fmt: str, chunk_size: Optional[int] = None):
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported export format '{fmt}'")
+        self.fmt = fmt
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.fmt]
+    
+    def _encode(self, rows) -> bytes:
+        return encode_csv(rows) if self.fmt == FORMAT_CSV else encode_ndjson(rows)
+    
+    def stream(self, **filters) -> Iterator[bytes]:
+        """Encoded chunks for StreamingResponse (sync stack; iterated in the threadpool)"""
+        lines = 0
+        with ReadSessionLocal() as db:
+            if self.fmt == FORMAT_CSV:
+                yield encode_csv((), header=True)
+            for rows in PurchaseRepository(db).iter_export_rows(self.chunk_size, **filters):
+                lines += len(rows)
+                yield self._encode(rows)
+        logger.info(f"Purchase export ({self.fmt}): {lines} line(s)")
+    
+    async def stream_async(self, **filters) -> AsyncIterator[bytes]:
+        """Encoded chunks for StreamingResponse (async stack)"""
+        lines = 0
+        async with get_async_read_sessionmaker()() as db:
+            if self.fmt == FORMAT_CSV:
+                yield encode_csv((), header=True)
+            async for rows in AsyncPurchaseRepository(db).iter_export_rows(self.chunk_size, **filters):
+                lines += len(rows)
+                yield self._encode(rows)
+        logger.info(f"Purchase export ({self.fmt}): {lines} line(s)")
@@ -0,0 +1,161 @@
+from pydantic import ValidationError
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import codecs
+import csv
+import json
+import logging
+
+from app.schemas.schemas import ProductCreate
+from app.core.config import get_settings
+from app.utils.catalog_cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+CSV_COLUMNS = ("name", "stock", "price", "tax_percent")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def detect_format(content_type: Optional[str], explicit: Optional[str]) -> str:
+    if explicit:
+        if explicit not in (FORMAT_CSV, FORMAT_NDJSON):
+            raise ValueError(f"Unsupported import format '{explicit}'")
+        return explicit
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return FORMAT_CSV
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return FORMAT_NDJSON
+    raise ValueError("Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+
+
+class ProductImportService:
+    """
+    Streaming product import: parse -> validate (ProductCreate) -> upsert.
+    
+    Rows are validated and written in chunks of BULK_IMPORT_CHUNK_SIZE, each
+    chunk in its own transaction, so memory stays flat whatever the file
+    size. Invalid rows are reported and skipped; they never abort the
+    import. upsert_chunk isolates rows the database rejects (per-row
+    savepoints) and returns (rows written, {position in chunk: error}), so
+    only the bad rows of a chunk fail.
+    """
+    
+    def __init__(
+        self,
+        upsert_chunk: Callable[[List[Dict]], Awaitable[Tuple[int, Dict[int, str]]]],
+        chunk_size: Optional[int] = None,
+        max_errors: Optional[int] = None
+    ):
+        self.upsert_chunk = upsert_chunk
+        self.chunk_size = chunk_size or settings.BULK_IMPORT_CHUNK_SIZE
+        self.max_errors = max_errors or settings.BULK_IMPORT_MAX_ERRORS
+        self.processed = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+    
+    async def run(self, lines: AsyncIterator[str], fmt: str) -> Dict:
+        chunk: List[Dict] = []
+        chunk_rows: List[int] = []
+        
+        async for row_number, raw in self._records(lines, fmt):
+            self.processed += 1
+            try:
+                product = ProductCreate.model_validate(raw)
+            except ValidationError as e:
+                self._record_error(row_number, [
+                    f"{'.'.join(str(loc) for loc in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+                ])
+                continue
+            
+            chunk.append(product.model_dump())
+            chunk_rows.append(row_number)
+            if len(chunk) >= self.chunk_size:
+                await self._flush(chunk, chunk_rows)
+                chunk, chunk_rows = [], []
+        
+        await self._flush(chunk, chunk_rows)
+        logger.info(f"Product import: {self.processed} rows, {self.upserted} upserted, {self.failed} failed")
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+    
+    async def _records(self, lines: AsyncIterator[str], fmt: str):
+        """Yield (row number, raw dict); unparseable rows are reported here"""
+        header = None
+        row_number = 0
+        async for line in lines:
+            if not line.strip():
+                continue
+            
+            if fmt == FORMAT_CSV and header is None:
+                header = [column.strip() for column in next(csv.reader([line]))]
+                missing = [column for column in CSV_COLUMNS if column not in header]
+                if missing:
+                    raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+                continue
+            
+            row_number += 1
+            if fmt == FORMAT_CSV:
+                values = next(csv.reader([line]))
+                if len(values) != len(header):
+                    self.processed += 1
+                    self._record_error(row_number, [f"expected {len(header)} columns, got {len(values)}"])
+                    continue
+                yield row_number, {key: value for key, value in zip(header, values) if key in CSV_COLUMNS}
+            else:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self.processed += 1
+                    self._record_error(row_number, [f"invalid JSON: {e.msg}"])
+                    continue
+                if not isinstance(record, dict):
+                    self.processed += 1
+                    self._record_error(row_number, ["expected a JSON object"])
+                    continue
+                yield row_number, record
+    
+    async def _flush(self, chunk: List[Dict], chunk_rows: List[int]):
+        if not chunk:
+            return
+        try:
+            upserted, rejected = await self.upsert_chunk(chunk)
+        except Exception as e:
+            # The chunk's transaction itself failed (e.g. the commit): nothing was written
+            logger.error(f"Product import chunk failed: {str(e)}")
+            for row_number in chunk_rows:
+                self._record_error(row_number, [f"database error: {str(e).splitlines()[0]}"])
+            return
+        finally:
+            catalog_cache.invalidate()
+        
+        self.upserted += upserted
+        for position, message in sorted(rejected.items()):
+            self._record_error(chunk_rows[position], [f"database error: {message}"])
+    
+    def _record_error(self, row_number: int, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "errors": messages})
@@ -0,0 +1,138 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from app.crud.report_repository import ReportRepository
+from app.schemas.schemas import RepricingRequest
+from app.core.config import get_settings
+from app.utils.money import to_basis_points, to_paise, to_rupees
+from app.utils.pricing_engine import BACKEND, group_sums, price_lines, replace_by_key
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _totals(net: int, tax: int) -> Dict:
+    return {'total_amount': to_rupees(net), 'tax_amount': to_rupees(tax), 'final_amount': to_rupees(net + tax)}
+
+
+class RepricingService:
+    """
+    What-if repricing over historic PurchaseItem snapshots.
+    
+    Snapshot rows are streamed in chunks; each chunk is priced twice by the
+    pricing engine, as billed and under the scenario, and only running
+    sums are kept, so a window of millions of lines costs one pass and
+    constant memory. Both sides use the live checkout's rounding rules.
+    """
+    
+    def __init__(self, db: Session, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.REPORT_CHUNK_SIZE
+    
+    def run(self, request: RepricingRequest) -> Dict:
+        repo = ReportRepository(self.db)
+        price_map, tax_map, flat_tax = self._scenario(request, repo)
+        
+        # product_id -> [units, actual net, actual tax, repriced net, repriced tax]
+        products: Dict[int, List[int]] = {}
+        lines = purchases = bills_changed = 0
+        # Rows arrive in purchase order: only the last bill of a chunk can continue in the next
+        carry: Optional[Tuple[int, int]] = None
+        
+        for rows in repo.iter_line_snapshots(request.start, request.end, self.chunk_size):
+            purchase_ids, product_ids, quantities, prices, taxes = zip(*rows)
+            actual = price_lines(prices, quantities, taxes)
+            scenario_taxes = [flat_tax] * len(rows) if flat_tax is not None else taxes
+            repriced = price_lines(
+                replace_by_key(prices, product_ids, price_map),
+                quantities,
+                replace_by_key(scenario_taxes, product_ids, tax_map)
+            )
+            lines += len(rows)
+            
+            for product_id, sums in group_sums(
+                product_ids, quantities, actual.net, actual.tax, repriced.net, repriced.tax
+            ).items():
+                current = products.setdefault(product_id, [0, 0, 0, 0, 0])
+                for position, value in enumerate(sums):
+                    current[position] += value
+            
+            deltas = {
+                purchase_id: (repriced_net + repriced_tax) - (actual_net + actual_tax)
+                for purchase_id, (actual_net, actual_tax, repriced_net, repriced_tax) in group_sums(
+                    purchase_ids, actual.net, actual.tax, repriced.net, repriced.tax
+                ).items()
+            }
+            if carry is not None:
+                deltas[carry[0]] = deltas.get(carry[0], 0) + carry[1]
+            carry = (purchase_ids[-1], deltas.pop(purchase_ids[-1]))
+            purchases += len(deltas)
+            bills_changed += sum(1 for delta in deltas.values() if delta)
+        
+        if carry is not None:
+            purchases += 1
+            bills_changed += 1 if carry[1] else 0
+        
+        actual_net = sum(sums[1] for sums in products.values())
+        actual_tax = sum(sums[2] for sums in products.values())
+        repriced_net = sum(sums[3] for sums in products.values())
+        repriced_tax = sum(sums[4] for sums in products.values())
+        product_lines = [
+            {
+                'product_id': product_id,
+                'units': units,
+                'actual_final': to_rupees(net + tax),
+                'repriced_final': to_rupees(new_net + new_tax),
+                'delta': to_rupees(new_net + new_tax - net - tax)
+            }
+            for product_id, (units, net, tax, new_net, new_tax) in products.items()
+        ]
+        product_lines.sort(key=lambda line: (-abs(line['delta']), line['product_id']))
+        
+        logger.info(f"Repricing report: {lines} line(s) over {purchases} purchase(s), {bills_changed} changed")
+        return {
+            'purchases': purchases,
+            'lines': lines,
+            'bills_changed': bills_changed,
+            'actual': _totals(actual_net, actual_tax),
+            'repriced': _totals(repriced_net, repriced_tax),
+            'delta': _totals(repriced_net - actual_net, repriced_tax - actual_tax),
+            'products': product_lines,
+            'engine': BACKEND
+        }
+    
+    @staticmethod
+    def _scenario(
+        request: RepricingRequest,
+        repo: ReportRepository
+    ) -> Tuple[Dict[int, int], Dict[int, int], Optional[int]]:
+        """
+        Per-product price/tax substitutions plus an optional flat tax rate.
+        
+        Precedence: explicit overrides, then the flat tax_percent, then
+        today's catalogue (current_prices), then the billed snapshot.
+        """
+        price_map: Dict[int, int] = {}
+        tax_map: Dict[int, int] = {}
+        flat_tax = to_basis_points(request.tax_percent) if request.tax_percent is not None else None
+        if request.current_prices:
+            for product_id, (price, tax) in repo.get_current_pricing().items():
+                price_map[product_id] = price
+                if flat_tax is None:
+                    tax_map[product_id] = tax
+        price_map.update({product_id: to_paise(price) for product_id, price in request.price_overrides.items()})
+        tax_map.update({product_id: to_basis_points(tax) for product_id, tax in request.tax_overrides.items()})
+        return price_map, tax_map, flat_tax
+
+
+class AsyncRepricingService:
+    """Repricing report on the async request path (runs the sync pass through run_sync)"""
+    
+    def __init__(self, db: AsyncSession, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size
+    
+    async def run(self, request: RepricingRequest) -> Dict:
+        return await self.db.run_sync(lambda session: RepricingService(session, self.chunk_size).run(request))
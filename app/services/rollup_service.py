@@ -0,0 +1,196 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+import logging
+
+from app.crud.report_repository import ReportRepository
+from app.crud.rollup_repository import RollupDeltas, RollupRepository
+from app.models.customer_sales_rollup import CustomerSalesRollup
+from app.models.product_sales_rollup import ProductSalesRollup
+from app.models.sales_rollup import SalesRollup
+from app.core.config import get_settings
+from app.utils.money import to_rupees
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SALES_WATERMARK = "sales"
+
+
+def _figures(bills: int, units: int, revenue: int, tax: int) -> Dict:
+    return {
+        'bills': int(bills),
+        'units': int(units),
+        'revenue': to_rupees(int(revenue)),
+        'tax': to_rupees(int(tax))
+    }
+
+
+def fold_purchases(purchases: List[Tuple], items: List[Tuple]) -> Tuple[RollupDeltas, RollupDeltas, RollupDeltas]:
+    """
+    Aggregate raw purchase and line rows into store (day, hour), customer
+    (day, customer_id) and product (day, product_id) rollup deltas.
+    
+    Buckets follow the purchase's UTC created_at. A product's bill count
+    goes up once per purchase even if the cart lists it on several lines.
+    """
+    store: RollupDeltas = {}
+    customers: RollupDeltas = {}
+    products: RollupDeltas = {}
+    buckets = {}
+    for purchase_id, customer_id, created_at, final_amount, tax_amount in purchases:
+        day = created_at.date()
+        buckets[purchase_id] = (
+            store.setdefault((day, created_at.hour), [0, 0, 0, 0]),
+            customers.setdefault((day, customer_id), [0, 0, 0, 0]),
+            day
+        )
+        for sums in buckets[purchase_id][:2]:
+            sums[0] += 1
+            sums[2] += final_amount
+            sums[3] += tax_amount
+    
+    seen = set()
+    for purchase_id, product_id, quantity, total_price, tax_amount in items:
+        store_sums, customer_sums, day = buckets[purchase_id]
+        store_sums[1] += quantity
+        customer_sums[1] += quantity
+        sums = products.setdefault((day, product_id), [0, 0, 0, 0])
+        if (purchase_id, product_id) not in seen:
+            seen.add((purchase_id, product_id))
+            sums[0] += 1
+        sums[1] += quantity
+        sums[2] += total_price
+        sums[3] += tax_amount
+    return store, customers, products
+
+
+class SalesRollupService:
+    """
+    Sales rollups (store-wide per hour, per product and per customer per
+    day) and the reports read from them.
+    
+    Checkout never touches the rollups: catch_up folds committed purchases
+    whose rolled_up flag is still clear, one bounded batch per transaction,
+    and sets the flag in that same transaction. A checkout that commits
+    late with a lower ID is simply picked up by the next run, so nothing is
+    skipped or counted twice; the watermark only records the highest ID
+    folded so far. Reports then cost O(buckets in the window) whatever the
+    purchase volume, and lag by at most one job interval
+    (POST /reports/rollups/refresh folds on demand).
+    """
+    
+    def __init__(self, db: Session, batch_size: Optional[int] = None):
+        self.db = db
+        self.batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    
+    def catch_up(self, max_batches: Optional[int] = None) -> int:
+        """Fold every committed purchase not yet in the rollups; returns how many were folded"""
+        folded = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = self._fold_batch()
+            if not count:
+                break
+            folded += count
+            batches += 1
+        if folded:
+            logger.info(f"Sales rollups: folded {folded} purchase(s) in {batches} batch(es)")
+        return folded
+    
+    def _fold_batch(self) -> int:
+        repo = RollupRepository(self.db)
+        repo.get_watermark(SALES_WATERMARK)
+        try:
+            purchases = repo.claim_pending_purchases(self.batch_size)
+            if not purchases:
+                # Nothing left, or another worker claimed part of this batch
+                self.db.rollback()
+                return 0
+            purchase_ids = [row[0] for row in purchases]
+            store, customers, products = fold_purchases(purchases, repo.get_items_for(purchase_ids))
+            repo.increment(SalesRollup, ('day', 'hour'), store)
+            repo.increment(CustomerSalesRollup, ('day', 'customer_id'), customers)
+            repo.increment(ProductSalesRollup, ('day', 'product_id'), products)
+            repo.advance_watermark(SALES_WATERMARK, purchase_ids[-1])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return len(purchases)
+    
+    def get_watermark(self) -> int:
+        """Read-only: reports may run on a read replica, so only catch_up creates the row"""
+        return RollupRepository(self.db).read_watermark(SALES_WATERMARK)
+    
+    def sales_series(
+        self,
+        start: date,
+        end: date,
+        granularity: str = "day",
+        product_id: Optional[int] = None,
+        customer_id: Optional[int] = None
+    ) -> Dict:
+        """Bills, units, revenue and tax per day (or hour) over [start, end]"""
+        rows = ReportRepository(self.db).get_sales_series(
+            start, end, hourly=granularity == "hour", product_id=product_id, customer_id=customer_id
+        )
+        totals = [sum(row[position] for row in rows) for position in range(2, 6)]
+        return {
+            'start': start,
+            'end': end,
+            'granularity': granularity,
+            'product_id': product_id,
+            'customer_id': customer_id,
+            'as_of_purchase_id': self.get_watermark(),
+            'buckets': [{'day': day, 'hour': hour, **_figures(*sums)} for day, hour, *sums in rows],
+            'totals': _figures(*totals)
+        }
+    
+    def top_products(self, start: date, end: date, limit: int) -> Dict:
+        rows = ReportRepository(self.db).get_top_products(start, end, limit)
+        return {
+            'start': start,
+            'end': end,
+            'as_of_purchase_id': self.get_watermark(),
+            'products': [
+                {'product_id': product_id, 'name': name, **_figures(*sums)}
+                for product_id, name, *sums in rows
+            ]
+        }
+    
+    def top_customers(self, start: date, end: date, limit: int) -> Dict:
+        rows = ReportRepository(self.db).get_top_customers(start, end, limit)
+        return {
+            'start': start,
+            'end': end,
+            'as_of_purchase_id': self.get_watermark(),
+            'customers': [
+                {'customer_id': customer_id, 'email': email, **_figures(*sums)}
+                for customer_id, email, *sums in rows
+            ]
+        }
+
+
+class AsyncSalesRollupService:
+    """Sales rollups on the async request path (runs the sync service through run_sync)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def catch_up(self, max_batches: Optional[int] = None) -> int:
+        return await self.db.run_sync(lambda session: SalesRollupService(session).catch_up(max_batches))
+    
+    async def get_watermark(self) -> int:
+        return await self.db.run_sync(lambda session: SalesRollupService(session).get_watermark())
+    
+    async def sales_series(self, start: date, end: date, granularity: str = "day", **keys) -> Dict:
+        return await self.db.run_sync(
+            lambda session: SalesRollupService(session).sales_series(start, end, granularity, **keys)
+        )
+    
+    async def top_products(self, start: date, end: date, limit: int) -> Dict:
+        return await self.db.run_sync(lambda session: SalesRollupService(session).top_products(start, end, limit))
+    
+    async def top_customers(self, start: date, end: date, limit: int) -> Dict:
+        return await self.db.run_sync(lambda session: SalesRollupService(session).top_customers(start, end, limit))
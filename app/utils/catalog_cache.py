@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+import logging
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """Cacheable product attributes. Stock is never cached."""
+    id: int
+    name: str
+    price: Decimal
+    tax_percent: Decimal
+
+
+class InvalidationChannel:
+    """
+    Fans catalog invalidations out to the other workers.
+    
+    The default does nothing, which is correct for a single process. For
+    several workers, subclass it over a shared bus (Redis pub/sub, Postgres
+    LISTEN/NOTIFY, ...) and install it with set_invalidation_channel():
+    publish() is called on every local write, and the callback passed to
+    subscribe() must be invoked for every remote message. A product_id of
+    None means "invalidate everything".
+    """
+    
+    def publish(self, product_id: Optional[int]):
+        pass
+    
+    def subscribe(self, callback: Callable[[Optional[int]], None]):
+        pass
+
+
+class ProductCatalogCache:
+    """
+    Read-through LRU cache of id -> (name, price, tax_percent) with TTL.
+    
+    Writes invalidate entries (write-through) locally and over the
+    invalidation channel; the TTL bounds staleness if a remote invalidation
+    is ever missed.
+    
+    Every invalidation bumps `generation`. A read-through fill captures it
+    before its SELECT and passes it to put_many(), which drops the rows if
+    an invalidation happened in between: they may predate the write.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: float, channel: Optional[InvalidationChannel] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, CatalogEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self.skipped_fills = 0
+        self.channel = channel or InvalidationChannel()
+        self.channel.subscribe(self._on_remote_invalidation)
+    
+    def get_many(self, product_ids: Iterable[int]) -> Tuple[Dict[int, CatalogEntry], List[int]]:
+        """Return (cached entries, missing IDs)"""
+        found: Dict[int, CatalogEntry] = {}
+        missing: List[int] = []
+        now = time.monotonic()
+        with self._lock:
+            for product_id in product_ids:
+                cached = self._entries.get(product_id)
+                if cached is not None and cached[0] > now:
+                    self._entries.move_to_end(product_id)
+                    found[product_id] = cached[1]
+                    self.hits += 1
+                else:
+                    if cached is not None:
+                        del self._entries[product_id]
+                    missing.append(product_id)
+                    self.misses += 1
+        return found, missing
+    
+    def put_many(self, entries: Iterable[CatalogEntry], generation: int):
+        """Cache rows read while `generation` was current (skipped if it has moved on)"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if generation != self.generation:
+                self.skipped_fills += 1
+                return
+            for entry in entries:
+                self._entries[entry.id] = (expires_at, entry)
+                self._entries.move_to_end(entry.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, product_id: Optional[int] = None):
+        """Drop one product (or everything) here and on every other worker"""
+        self._drop(product_id)
+        try:
+            self.channel.publish(product_id)
+        except Exception as e:
+            logger.error(f"Failed to publish catalog invalidation: {str(e)}")
+    
+    def _on_remote_invalidation(self, product_id: Optional[int]):
+        self._drop(product_id)
+    
+    def _drop(self, product_id: Optional[int]):
+        with self._lock:
+            self.generation += 1
+            if product_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(product_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "skipped_fills": self.skipped_fills,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+catalog_cache = ProductCatalogCache(settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL_SECONDS)
+
+
+def set_invalidation_channel(channel: InvalidationChannel):
+    """Install a cross-worker invalidation channel for the process-wide cache"""
+    catalog_cache.channel = channel
+    channel.subscribe(catalog_cache._on_remote_invalidation)
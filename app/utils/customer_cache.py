@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+import threading
+import time
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class CustomerProfileCache:
+    """
+    Per-process LRU of customer profiles keyed by email, with TTL.
+    
+    Checkout invalidates the customers it billed once its transaction has
+    committed; bills taken by other workers show up within the TTL.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, email: str) -> Optional[Dict]:
+        if self.max_size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(email)
+            if cached is None:
+                return None
+            if cached[0] <= now:
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return cached[1]
+    
+    def put(self, email: str, profile: Dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl_seconds, profile)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, emails: Iterable[str]):
+        with self._lock:
+            for email in emails:
+                self._entries.pop(email, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CustomerIdCache:
+    """
+    Per-process LRU of email -> customer ID for the checkout hot path.
+    
+    A customer's ID never changes once committed, so entries need no TTL;
+    only IDs of committed rows may be put here.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, email: str) -> Optional[int]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            customer_id = self._entries.get(email)
+            if customer_id is not None:
+                self._entries.move_to_end(email)
+            return customer_id
+    
+    def put_many(self, ids: Dict[str, int]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for email, customer_id in ids.items():
+                self._entries[email] = customer_id
+                self._entries.move_to_end(email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+customer_profile_cache = CustomerProfileCache(
+    settings.CUSTOMER_PROFILE_CACHE_SIZE, settings.CUSTOMER_PROFILE_CACHE_TTL_SECONDS
+)
+customer_id_cache = CustomerIdCache(settings.CUSTOMER_ID_CACHE_SIZE)
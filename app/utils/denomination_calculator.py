@@ -1,5 +1,18 @@
-from typing import Dict, List
+from array import array
+from collections import OrderedDict, deque
+from functools import lru_cache, reduce
+from math import gcd
+from typing import Dict, List, Optional, Tuple
+import threading
+
 from app.core.exceptions import InsufficientDenominationException
+from app.core.config import get_settings
+from app.utils.money import PAISE_PER_RUPEE, to_paise
+
+settings = get_settings()
+
+# Drawer state as ((value_in_units, count), ...) ascending by value
+DrawerState = Tuple[Tuple[int, int], ...]
 
 
 def calculate_change_denominations(
@@ -8,7 +21,11 @@ def calculate_change_denominations(
 ) -> Dict[int, int]:
     """
     Calculate optimal denomination breakdown for change.
-    Uses greedy algorithm (largest first).
+    Uses the fewest notes/coins the drawer can actually provide.
+    
+    Amounts are handled in integer paise. Sub-rupee paise cannot be handed
+    out with whole-rupee notes and are dropped; any whole-rupee remainder the
+    drawer cannot express raises, as the greedy version did.
     
     Args:
         change_amount: Amount of change to give
@@ -20,32 +37,176 @@ def calculate_change_denominations(
     Raises:
         InsufficientDenominationException: If change cannot be given
     """
-    if change_amount == 0:
+    amount = to_paise(change_amount) // PAISE_PER_RUPEE
+    if amount <= 0:
         return {}
     
-    change_amount = int(change_amount)
-    result = {}
+    drawer = {value: count for value, count in available_denominations.items() if count > 0}
+    # Tables are built in multiples of the drawer's common divisor to keep them small
+    unit = reduce(gcd, drawer, 0) or 1
+    remaining = amount % unit
+    if remaining:
+        raise InsufficientDenominationException(
+            f"Cannot provide exact change. Remaining: {remaining}",
+            details={"remaining": remaining}
+        )
+    
+    state: DrawerState = tuple(sorted((value // unit, count) for value, count in drawer.items()))
+    breakdown = make_change(amount // unit, state)
+    if breakdown is None:
+        raise InsufficientDenominationException(
+            f"Cannot provide exact change of {amount} with the available denominations",
+            details={"change": amount, "available": available_denominations}
+        )
+    return {value * unit: count for value, count in breakdown.items()}
+
+
+def make_change(amount: int, state: DrawerState) -> Optional[Dict[int, int]]:
+    """
+    Fewest-coins breakdown of `amount` from a bounded drawer, or None.
     
-    # Sort denominations in descending order
-    sorted_denoms = sorted(available_denominations.keys(), reverse=True)
+    Greedy is tried first: for a canonical coin system, a greedy result
+    that never ran out of any denomination equals the unbounded optimum, so
+    it is optimal here too and costs O(#denoms). Otherwise the bounded
+    knapsack table for this drawer state answers the query.
+    """
+    values = tuple(value for value, _ in state)
+    if not values:
+        return None
     
-    for denom in sorted_denoms:
-        if change_amount == 0:
-            break
-            
-        available = available_denominations[denom]
-        needed = change_amount // denom
+    if is_canonical(values):
+        breakdown, limited = _greedy(amount, state)
+        if breakdown is not None and not limited:
+            return breakdown
+    return change_tables.lookup(amount, state)
+
+
+def _greedy(amount: int, state: DrawerState) -> Tuple[Optional[Dict[int, int]], bool]:
+    """Largest-first breakdown; also reports whether a count limit was hit"""
+    result: Dict[int, int] = {}
+    limited = False
+    for value, available in reversed(state):
+        needed = amount // value
+        if needed > available:
+            limited = True
+            needed = available
+        if needed:
+            result[value] = needed
+            amount -= value * needed
+    return (result if amount == 0 else None), limited
+
+
+@lru_cache(maxsize=64)
+def is_canonical(values: Tuple[int, ...]) -> bool:
+    """
+    Whether unbounded greedy is optimal for every amount (Indian notes are).
+    With a unit coin, a counterexample is smaller than the sum of the two
+    largest values (Kozen & Zaks), so checking up to there is exact.
+    """
+    if values[0] != 1:
+        return False
+    limit = values[-1] + values[-2] if len(values) > 1 else 1
+    best = [0] * limit
+    for amount in range(1, limit):
+        best[amount] = 1 + min(best[amount - value] for value in values if value <= amount)
+        greedy, remaining = 0, amount
+        for value in reversed(values):
+            greedy += remaining // value
+            remaining %= value
+        if greedy > best[amount]:
+            return False
+    return True
+
+
+class ChangeTables:
+    """
+    Bounded-knapsack tables per drawer state, kept in a small LRU.
+    
+    For each denomination layer k and amount a the table stores how many
+    notes of that denomination the optimum uses, so a lookup walks the
+    layers once: O(#denoms). Tables are keyed by the exact drawer state,
+    which makes them valid by construction; invalidate() drops them when
+    the drawer is edited so memory is not held for states that are gone.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._tables: "OrderedDict[DrawerState, Tuple[int, array, List[array]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def lookup(self, amount: int, state: DrawerState) -> Optional[Dict[int, int]]:
+        total = sum(value * count for value, count in state)
+        if amount > total:
+            return None
+        
+        with self._lock:
+            table = self._tables.get(state)
+            if table is not None:
+                self._tables.move_to_end(state)
+        if table is None or table[0] < amount:
+            # Grow geometrically so a run of larger amounts rebuilds rarely
+            size = min(total, max(amount, 2 * table[0] if table else amount))
+            table = (size,) + _build_table(size, state)
+            with self._lock:
+                self._tables[state] = table
+                self._tables.move_to_end(state)
+                while len(self._tables) > self.max_size:
+                    self._tables.popitem(last=False)
         
-        if needed > 0:
-            count_to_give = min(needed, available)
-            if count_to_give > 0:
-                result[denom] = count_to_give
-                change_amount -= denom * count_to_give
+        _, best, layers = table
+        if best[amount] == _UNREACHABLE:
+            return None
+        breakdown: Dict[int, int] = {}
+        for (value, _), used in zip(reversed(state), reversed(layers)):
+            count = used[amount]
+            if count:
+                breakdown[value] = count
+                amount -= value * count
+        return breakdown
     
-    if change_amount > 0:
-        raise InsufficientDenominationException(
-            f"Cannot provide exact change. Remaining: {change_amount}",
-            details={"remaining": change_amount}
-        )
+    def invalidate(self):
+        with self._lock:
+            self._tables.clear()
+
+
+_UNREACHABLE = 2 ** 31 - 1
+
+
+def _build_table(size: int, state: DrawerState) -> Tuple[array, List[array]]:
+    """
+    Min-coin bounded knapsack over amounts 0..size, one layer per denomination.
     
-    return result
+    Within a layer, amounts sharing a residue mod the value form a chain
+    where using j notes means stepping back j links; a monotonic deque
+    gives the best predecessor within `count` links, so each layer is O(size).
+    """
+    best = array("i", [_UNREACHABLE]) * (size + 1)
+    best[0] = 0
+    layers: List[array] = []
+    for value, count in state:
+        current = array("i", [_UNREACHABLE]) * (size + 1)
+        used = array("i", [0]) * (size + 1)
+        for residue in range(min(value, size + 1)):
+            window: deque = deque()
+            for step, amount in enumerate(range(residue, size + 1, value)):
+                if best[amount] != _UNREACHABLE:
+                    key = best[amount] - step
+                    while window and window[-1][1] >= key:
+                        window.pop()
+                    window.append((step, key))
+                while window and window[0][0] < step - count:
+                    window.popleft()
+                if window:
+                    current[amount] = window[0][1] + step
+                    used[amount] = step - window[0][0]
+        best = current
+        layers.append(used)
+    return best, layers
+
+
+change_tables = ChangeTables(settings.CHANGE_TABLE_CACHE_SIZE)
+
+
+def invalidate_change_tables():
+    """Drop cached tables after the drawer is edited outside a checkout"""
+    change_tables.invalidate()
@@ -0,0 +1,66 @@
+"""
+HTTP validators for GET endpoints: strong ETags, If-None-Match and 304s.
+
+Committed purchases never change (prices are snapshotted), so their
+representation is tagged by purchase ID alone and served immutable; a
+matching If-None-Match is answered before any query runs. Listings are
+tagged with a watermark of the rows behind them plus the query string, so
+a repeat poll costs one small query and no serialization: for products,
+the catalog version row (bumped by every catalog and stock write); for a
+drawer, an aggregate over its few denomination rows.
+
+Tags also carry a fingerprint of the response schema and app version, so
+a deploy that changes the representation invalidates cached copies.
+"""
+import hashlib
+import json
+from typing import Iterable, Optional, Type
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Committed purchases: cache for a year, never revalidate (private: invoices carry customer data)
+IMMUTABLE = "private, max-age=31536000, immutable"
+# Mutable listings: may be stored, but must be revalidated with the ETag on every use
+REVALIDATE = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the parts (strings, numbers, datetimes, tuples of those)"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def schema_fingerprint(model: Type[BaseModel]) -> str:
+    """Short hash of a response model's JSON schema and the app version"""
+    schema = json.dumps(model.model_json_schema(), sort_keys=True)
+    return hashlib.blake2b(f"{settings.VERSION}:{schema}".encode(), digest_size=6).hexdigest()
+
+
+def _candidate_tags(header: str) -> Iterable[str]:
+    for tag in header.split(","):
+        tag = tag.strip()
+        # If-None-Match uses the weak comparison: W/"x" matches "x"
+        yield tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already holds this ETag"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return any(tag == "*" or tag == etag for tag in _candidate_tags(header))
+
+
+def set_validators(response: Response, etag: str, cache_control: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """304 carrying the same validators the 200 would have sent"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
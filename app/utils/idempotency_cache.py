@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import threading
+import time
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request body, to detect a key reused for a different request"""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IdempotencyCache:
+    """
+    Per-process LRU front for completed idempotent responses.
+    
+    Only committed outcomes are cached and they never change, so no
+    invalidation is needed; the database row stays the source of truth.
+    An entry never outlives its row's expires_at: once the row may have
+    been reclaimed for a new request, the key must miss here too.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        """Return (request hash, response) or None"""
+        if self.max_size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if cached[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1], cached[2]
+    
+    def put(self, key: str, request_hash: str, response: Dict, expires_at: datetime):
+        """Cache a committed outcome until its row's expires_at (UTC), capped at ttl_seconds"""
+        if self.max_size <= 0:
+            return
+        ttl = min(self.ttl_seconds, (expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, request_hash, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+idempotency_cache = IdempotencyCache(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_KEY_TTL_SECONDS)
@@ -0,0 +1,102 @@
+"""
+Invoice rendering: HTML (email body), plain text (email alternative) and
+a fixed-width thermal till receipt, all from the invoice payload stored in
+the email outbox.
+
+Templates are compiled once, when the module is imported at startup, and
+the compiled Template objects are reused for every invoice; with
+INVOICE_TEMPLATE_CACHE_DIR set the compiled bytecode is also kept on disk
+so other worker processes skip compilation. Loops run inside the
+template, so rendering stays linear in the number of lines, and stream()
+yields the output in chunks for very long bills.
+"""
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import hashlib
+import logging
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, select_autoescape
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "templates" / "invoices"
+
+# variant -> (template, media type)
+VARIANTS = {
+    "html": ("invoice.html", "text/html"),
+    "text": ("invoice.txt", "text/plain"),
+    "receipt": ("receipt.txt", "text/plain"),
+}
+
+STREAM_BUFFER = 64  # template output pieces joined per streamed chunk
+
+
+def _money(value) -> str:
+    return f"{value:.2f}"
+
+
+def _left(value, width: int) -> str:
+    """Left-align in exactly `width` characters (truncates)"""
+    return f"{value!s:<{width}.{width}}"
+
+
+def _right(value, width: int) -> str:
+    """Right-align in exactly `width` characters (keeps the rightmost characters)"""
+    return f"{value!s:>{width}}"[-width:]
+
+
+class InvoiceRenderer:
+    """Compiled invoice templates, shared by every request and worker thread"""
+    
+    def __init__(self, template_dir: Path = TEMPLATE_DIR, cache_dir: Optional[str] = None, receipt_width: int = 42):
+        self.receipt_width = receipt_width
+        self.environment = Environment(
+            loader=FileSystemLoader(str(template_dir)),
+            autoescape=select_autoescape(["html"]),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else None,
+            auto_reload=False,
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True
+        )
+        self.environment.filters.update(money=_money, left=_left, right=_right)
+        self.templates = {
+            variant: self.environment.get_template(name) for variant, (name, _) in VARIANTS.items()
+        }
+        # Changes whenever a template or the receipt width does (part of the invoice ETag)
+        sources = [self.environment.loader.get_source(self.environment, name)[0] for name, _ in VARIANTS.values()]
+        self.fingerprint = hashlib.blake2b(
+            "\0".join(sources + [str(receipt_width)]).encode(), digest_size=6
+        ).hexdigest()
+        logger.info(f"Invoice templates compiled: {', '.join(self.templates)}")
+    
+    def _context(self, invoice: Dict) -> Dict:
+        return {'invoice': invoice, 'width': self.receipt_width}
+    
+    def _template(self, variant: str):
+        try:
+            return self.templates[variant]
+        except KeyError:
+            raise ValueError(f"Unknown invoice variant '{variant}'") from None
+    
+    def render(self, invoice: Dict, variant: str = "html") -> str:
+        return self._template(variant).render(self._context(invoice))
+    
+    def stream(self, invoice: Dict, variant: str = "html") -> Iterator[str]:
+        """Render incrementally, STREAM_BUFFER template pieces per chunk"""
+        stream = self._template(variant).stream(self._context(invoice))
+        stream.enable_buffering(STREAM_BUFFER)
+        return iter(stream)
+    
+    @staticmethod
+    def media_type(variant: str) -> str:
+        return VARIANTS[variant][1]
+
+
+invoice_renderer = InvoiceRenderer(
+    cache_dir=settings.INVOICE_TEMPLATE_CACHE_DIR, receipt_width=settings.RECEIPT_WIDTH
+)
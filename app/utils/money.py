@@ -0,0 +1,50 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, List, Tuple
+
+PAISE_PER_RUPEE = 100
+BASIS_POINTS_PER_PERCENT = 100
+BASIS_POINTS_PER_WHOLE = 100 * BASIS_POINTS_PER_PERCENT
+
+
+def to_minor(amount, scale: int = 2) -> int:
+    """Decimal amount -> integer count of 10^-scale units, rounding half up"""
+    return int((Decimal(str(amount)).scaleb(scale)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(units: int, scale: int = 2) -> Decimal:
+    """Integer count of 10^-scale units -> exact Decimal (e.g. 12345 -> 123.45)"""
+    return Decimal(units).scaleb(-scale)
+
+
+def to_paise(amount) -> int:
+    """Rupees -> integer paise, rounding half up (float noise never loses a paisa)"""
+    return to_minor(amount)
+
+
+def to_rupees(paise: int) -> Decimal:
+    return from_minor(paise)
+
+
+def to_basis_points(percent) -> int:
+    """Percent -> integer basis points (18.5 -> 1850)"""
+    return to_minor(percent)
+
+
+def as_money(amount) -> Decimal:
+    """Round any rupee amount (float, str, Decimal) to an exact paisa Decimal"""
+    return to_rupees(to_paise(amount))
+
+
+def line_amounts(lines: Iterable[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+    """
+    (net, tax) in paise for each (unit price in paise, quantity, tax in basis points) line.
+    
+    All arithmetic is integer: each line's tax is rounded half up to the
+    paisa once, so the bill total is the exact sum of its printed lines.
+    """
+    amounts = []
+    for unit_paise, quantity, tax_basis_points in lines:
+        net = unit_paise * quantity
+        tax = (2 * net * tax_basis_points + BASIS_POINTS_PER_WHOLE) // (2 * BASIS_POINTS_PER_WHOLE)
+        amounts.append((net, tax))
+    return amounts
@@ -0,0 +1,60 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.exceptions import InvalidCursorException
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset values as an opaque, URL-safe cursor"""
+    raw = json.dumps(values, separators=(",", ":"), default=lambda v: v.isoformat())
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode a cursor produced by encode_cursor; None means first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursorException("Invalid pagination cursor")
+    if not isinstance(values, dict):
+        raise InvalidCursorException("Invalid pagination cursor")
+    return values
+
+
+def cursor_datetime(values: Dict[str, Any], key: str) -> datetime:
+    try:
+        return datetime.fromisoformat(values[key])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursorException("Invalid pagination cursor")
+
+
+def cursor_int(values: Dict[str, Any], key: str) -> int:
+    try:
+        return int(values[key])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursorException("Invalid pagination cursor")
+
+
+def build_page(
+    rows: Sequence[Any],
+    limit: int,
+    cursor_for: Callable[[Any], Dict[str, Any]],
+    total: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Shape a keyset page. Repositories fetch `limit + 1` rows; the extra row
+    only signals that another page exists and is not returned.
+    """
+    items: List[Any] = list(rows[:limit])
+    next_cursor = encode_cursor(cursor_for(items[-1])) if len(rows) > limit else None
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "page_size": limit,
+        "total": total
+    }
@@ -0,0 +1,138 @@
+"""
+Pure bill-pricing engine: arrays of unit price, quantity and tax in,
+per-line net/tax and bill totals out. No ORM, no I/O.
+
+Amounts are integer paise and tax rates integer basis points, so the
+NumPy path (int64 arrays) and the pure-Python path apply exactly the same
+rounding rule as app.utils.money.line_amounts and give identical results.
+NumPy is optional; without it everything runs on Python ints.
+"""
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+from app.utils.money import BASIS_POINTS_PER_WHOLE, line_amounts
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the deployment
+    np = None
+
+settings = get_settings()
+
+BACKEND = "numpy" if np is not None else "python"
+
+# Largest |2 * net * basis points| that still fits in int64
+_INT64_LIMIT = 2 ** 63 - 1
+
+
+class PricedLines:
+    """Per-line net and tax in paise (NumPy arrays or lists, same values)"""
+    
+    def __init__(self, net, tax, vectorized: bool):
+        self.net = net
+        self.tax = tax
+        self.vectorized = vectorized
+    
+    def __len__(self) -> int:
+        return len(self.net)
+    
+    def lines(self) -> Iterator[Tuple[int, int]]:
+        """(net, tax) per line as Python ints"""
+        if self.vectorized:
+            return zip(self.net.tolist(), self.tax.tolist())
+        return zip(self.net, self.tax)
+    
+    def totals(self) -> Tuple[int, int]:
+        """Bill totals (net, tax); the final amount is their sum"""
+        if self.vectorized:
+            return int(self.net.sum()), int(self.tax.sum())
+        return sum(self.net), sum(self.tax)
+    
+    def totals_by(self, keys: Sequence[int]) -> Dict[int, Tuple[int, int]]:
+        """(net, tax) summed per key, e.g. per purchase or per product"""
+        return group_sums(keys, self.net, self.tax)
+
+
+def price_lines(
+    unit_paise: Sequence[int],
+    quantities: Sequence[int],
+    tax_basis_points: Sequence[int],
+    vectorize: Optional[bool] = None
+) -> PricedLines:
+    """
+    Price every line: net = unit x quantity, tax = net x rate rounded half up.
+    
+    vectorize=None picks NumPy for carts of PRICING_VECTOR_MIN_LINES or more,
+    where array setup pays for itself. Lines too large for int64 arithmetic
+    fall back to Python ints.
+    """
+    if vectorize is None:
+        vectorize = len(unit_paise) >= settings.PRICING_VECTOR_MIN_LINES
+    if vectorize and np is not None:
+        priced = _price_vectorized(unit_paise, quantities, tax_basis_points)
+        if priced is not None:
+            return priced
+    
+    amounts = line_amounts(zip(_as_list(unit_paise), _as_list(quantities), _as_list(tax_basis_points)))
+    return PricedLines([net for net, _ in amounts], [tax for _, tax in amounts], vectorized=False)
+
+
+def _price_vectorized(unit_paise, quantities, tax_basis_points) -> Optional[PricedLines]:
+    try:
+        unit = np.asarray(unit_paise, dtype=np.int64)
+        quantity = np.asarray(quantities, dtype=np.int64)
+        rate = np.asarray(tax_basis_points, dtype=np.int64)
+    except OverflowError:
+        return None
+    if len(unit):
+        # Bound the intermediate 2 * net * rate in floating point before doing it in int64
+        bound = np.abs(unit.astype(np.float64) * quantity) * (2 * np.abs(rate.astype(np.float64)) + 1)
+        if float(bound.max()) >= _INT64_LIMIT / 2:
+            return None
+    
+    net = unit * quantity
+    tax = (2 * net * rate + BASIS_POINTS_PER_WHOLE) // (2 * BASIS_POINTS_PER_WHOLE)
+    return PricedLines(net, tax, vectorized=True)
+
+
+def _as_list(values) -> Sequence[int]:
+    """Python ints for the fallback path (NumPy scalars would wrap silently)"""
+    return values.tolist() if np is not None and isinstance(values, np.ndarray) else values
+
+
+def group_sums(keys: Sequence[int], *columns) -> Dict[int, Tuple[int, ...]]:
+    """Sum each column per key: {key: (sum of column 1, sum of column 2, ...)}"""
+    if np is not None and any(isinstance(column, np.ndarray) for column in columns):
+        unique, inverse = np.unique(np.asarray(keys), return_inverse=True)
+        sums = []
+        for column in columns:
+            total = np.zeros(len(unique), dtype=np.int64)
+            np.add.at(total, inverse, np.asarray(column, dtype=np.int64))
+            sums.append(total.tolist())
+        return {key: tuple(values) for key, *values in zip(unique.tolist(), *sums)}
+    
+    grouped: Dict[int, List[int]] = {}
+    for key, *values in zip(keys, *columns):
+        current = grouped.get(key)
+        if current is None:
+            grouped[key] = list(values)
+        else:
+            for position, value in enumerate(values):
+                current[position] += value
+    return {key: tuple(values) for key, values in grouped.items()}
+
+
+def replace_by_key(values: Sequence[int], keys: Sequence[int], mapping: Mapping[int, int]) -> Sequence[int]:
+    """values[i] -> mapping[keys[i]] where keys[i] is mapped (e.g. price overrides per product)"""
+    if not mapping:
+        return values
+    if np is not None and len(values) >= settings.PRICING_VECTOR_MIN_LINES:
+        mapped_keys = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+        mapped_values = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+        order = np.argsort(mapped_keys)
+        mapped_keys, mapped_values = mapped_keys[order], mapped_values[order]
+        keys = np.asarray(keys, dtype=np.int64)
+        position = np.minimum(np.searchsorted(mapped_keys, keys), len(mapped_keys) - 1)
+        hit = mapped_keys[position] == keys
+        return np.where(hit, mapped_values[position], np.asarray(values, dtype=np.int64))
+    return [mapping.get(key, value) for key, value in zip(keys, values)]
@@ -0,0 +1,120 @@
+"""
+Batch checkout vs. one POST /purchases per bill.
+
+Simulates an offline till replaying its queue: N bills over a small
+catalogue, a few of them deliberately invalid (unknown product, short
+payment). The same bills are sent once as N sequential requests and once
+as POST /purchases/batch requests, against identical fresh databases, and
+the run checks that both leave the same stock and drawer behind.
+
+Usage:
+    python benchmarks/batch_checkout.py --bills 500 --batch-size 250
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.models.denomination import Denomination  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.purchase import Purchase  # noqa: E402
+from app.utils.customer_cache import customer_id_cache  # noqa: E402
+
+DRAWER = {500: 10**4, 100: 10**5, 50: 10**5, 20: 10**5, 10: 10**5, 5: 10**5, 2: 10**5, 1: 10**5}
+PRODUCTS = 20
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    customer_id_cache.clear()  # cached IDs point into the dropped tables
+    with SessionLocal() as db:
+        db.add_all(
+            Product(name=f"SKU {i}", stock=10**6, price=10 + i, tax_percent=5 * (i % 3))
+            for i in range(PRODUCTS)
+        )
+        db.add_all(Denomination(value=v, available_count=c) for v, c in DRAWER.items())
+        db.commit()
+
+
+def make_bills(count: int) -> list:
+    bills = []
+    for i in range(count):
+        items = [{"product_id": 1 + (i + j) % PRODUCTS, "quantity": 1 + j} for j in range(3)]
+        bill = {
+            "customer_email": f"customer{i % 50}@example.com",
+            "items": items,
+            "paid_amount": 500,
+            "denominations": [{"value": 500, "count": 1}],
+        }
+        if i % 50 == 7:
+            bill["items"] = [{"product_id": 10**6, "quantity": 1}]
+        elif i % 50 == 13:
+            bill["paid_amount"] = 1
+            bill["denominations"] = [{"value": 1, "count": 1}]
+        bills.append(bill)
+    return bills
+
+
+def snapshot() -> tuple:
+    with SessionLocal() as db:
+        stock = dict(db.query(Product.id, Product.stock).all())
+        drawer = dict(db.query(Denomination.value, Denomination.available_count).all())
+        purchases = db.query(Purchase).count()
+    return stock, drawer, purchases
+
+
+def run_sequential(client: TestClient, bills: list) -> tuple:
+    started = time.perf_counter()
+    created = sum(1 for bill in bills if client.post("/api/v1/purchases/", json=bill).status_code == 201)
+    return created, time.perf_counter() - started
+
+
+def run_batched(client: TestClient, bills: list, batch_size: int) -> tuple:
+    started = time.perf_counter()
+    created = 0
+    for start in range(0, len(bills), batch_size):
+        response = client.post("/api/v1/purchases/batch", json=bills[start:start + batch_size])
+        response.raise_for_status()
+        created += response.json()["created"]
+    return created, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=250)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    bills = make_bills(args.bills)
+    with TestClient(app) as client:
+        seed()
+        sequential_created, sequential_elapsed = run_sequential(client, bills)
+        sequential_state = snapshot()
+
+        seed()
+        batched_created, batched_elapsed = run_batched(client, bills, args.batch_size)
+        batched_state = snapshot()
+
+    print(f"sequential  bills={args.bills:<6} created={sequential_created:<6} elapsed={sequential_elapsed:7.2f}s "
+          f"throughput={args.bills / sequential_elapsed:8.1f} bills/s")
+    print(f"batched     bills={args.bills:<6} created={batched_created:<6} elapsed={batched_elapsed:7.2f}s "
+          f"throughput={args.bills / batched_elapsed:8.1f} bills/s  speedup={sequential_elapsed / batched_elapsed:.1f}x")
+
+    assert batched_created == sequential_created, "both paths must accept the same bills"
+    assert batched_state == sequential_state, "both paths must leave the same stock, drawer and purchase count"
+    print("Batch and sequential checkouts agree on stock, drawer and purchases")
+
+
+if __name__ == "__main__":
+    main()
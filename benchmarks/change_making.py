@@ -0,0 +1,118 @@
+"""
+Change-making engine vs. the previous greedy over randomized drawer states.
+
+Each trial draws a drawer (Indian notes/coins with random, often scarce
+counts) and a change amount, then asks both algorithms for a breakdown.
+The run reports how often greedy refused change that was actually payable,
+how many extra notes greedy handed out when it did succeed, and the
+latency of the engine's fast path (greedy certificate), cold tables and
+cached tables. Every engine answer is checked against the drawer.
+
+Usage:
+    python benchmarks/change_making.py --trials 5000 --max-change 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from app.core.exceptions import InsufficientDenominationException  # noqa: E402
+from app.utils.denomination_calculator import (  # noqa: E402
+    calculate_change_denominations,
+    invalidate_change_tables,
+)
+
+DENOMINATIONS = (2000, 500, 200, 100, 50, 20, 10, 5, 2, 1)
+
+
+def legacy_greedy(change_amount: float, available: dict) -> dict:
+    """The previous implementation: largest first, truncating to whole rupees"""
+    change_amount = int(change_amount)
+    result = {}
+    for denom in sorted(available, reverse=True):
+        if change_amount == 0:
+            break
+        count = min(change_amount // denom, available[denom])
+        if count > 0:
+            result[denom] = count
+            change_amount -= denom * count
+    if change_amount > 0:
+        raise InsufficientDenominationException("Cannot provide exact change")
+    return result
+
+
+def random_drawer(rng: random.Random) -> dict:
+    drawer = {}
+    for value in DENOMINATIONS:
+        # Mostly healthy counts, with a good share of empty or nearly empty slots
+        drawer[value] = rng.choice([0, 0, 1, 2, 3, rng.randint(0, 10), rng.randint(5, 50)])
+    return drawer
+
+
+def attempt(fn, amount, drawer):
+    started = time.perf_counter()
+    try:
+        result = fn(amount, drawer)
+    except InsufficientDenominationException:
+        result = None
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5000)
+    parser.add_argument("--max-change", type=int, default=2000, help="largest change amount in rupees")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    greedy_failed_payable = 0
+    engine_failed = 0
+    extra_notes = 0
+    greedy_times, cold_times, warm_times = [], [], []
+
+    for _ in range(args.trials):
+        drawer = random_drawer(rng)
+        amount = rng.randint(1, args.max_change)
+
+        greedy, elapsed = attempt(legacy_greedy, amount, drawer)
+        greedy_times.append(elapsed)
+
+        invalidate_change_tables()
+        engine, elapsed = attempt(calculate_change_denominations, amount, drawer)
+        cold_times.append(elapsed)
+        _, elapsed = attempt(calculate_change_denominations, amount, drawer)
+        warm_times.append(elapsed)
+
+        if engine is None:
+            engine_failed += 1
+            assert greedy is None, f"engine refused change greedy could give: {amount} from {drawer}"
+            continue
+        assert sum(v * c for v, c in engine.items()) == amount, "engine breakdown must add up"
+        assert all(c <= drawer[v] for v, c in engine.items()), "engine must respect drawer counts"
+        if greedy is None:
+            greedy_failed_payable += 1
+        else:
+            assert sum(engine.values()) <= sum(greedy.values()), "engine must never use more notes"
+            extra_notes += sum(greedy.values()) - sum(engine.values())
+
+    def ms(samples):
+        return f"p50={statistics.median(samples) * 1000:7.3f} ms  p99={sorted(samples)[int(len(samples) * 0.99)] * 1000:7.3f} ms"
+
+    payable = args.trials - engine_failed
+    print(f"trials={args.trials} payable={payable} unpayable={engine_failed}")
+    print(f"greedy refused payable change: {greedy_failed_payable} ({greedy_failed_payable / max(payable, 1):.1%} of payable)")
+    print(f"extra notes handed out by greedy when it succeeded: {extra_notes}")
+    print(f"legacy greedy       {ms(greedy_times)}")
+    print(f"engine (cold)       {ms(cold_times)}")
+    print(f"engine (cached)     {ms(warm_times)}")
+
+
+if __name__ == "__main__":
+    main()
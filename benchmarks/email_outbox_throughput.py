@@ -0,0 +1,164 @@
+"""
+Invoice email throughput: outbox worker vs. one SMTP connection per invoice.
+
+An aiosmtpd server on localhost stands in for the real SMTP relay
+(pip install aiosmtpd). The run seeds N purchases with queued invoices,
+drains them with EmailOutboxWorker over a reused connection, and compares
+that with opening a fresh connection per invoice as the old executor did.
+Recipients containing "bounce" are rejected by the stand-in so the retry
+and dead-letter path is exercised too.
+
+Usage:
+    python benchmarks/email_outbox_throughput.py --emails 500
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "8025")
+os.environ["SMTP_USE_TLS"] = "false"
+os.environ.setdefault("SENDER_EMAIL", "billing@example.com")
+os.environ.setdefault("EMAIL_OUTBOX_BACKOFF_SECONDS", "0")
+os.environ.setdefault("EMAIL_OUTBOX_MAX_ATTEMPTS", "3")
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("aiosmtpd is required for this benchmark: pip install aiosmtpd")
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.services import billing_service  # noqa: E402,F401 - registers every model
+from app.models.customer import Customer  # noqa: E402
+from app.models.email_outbox import EmailOutbox  # noqa: E402
+from app.models.purchase import Purchase  # noqa: E402
+from app.crud.email_outbox_repository import EmailOutboxRepository  # noqa: E402
+from app.services.email_service import EmailService  # noqa: E402
+from app.services.email_worker import EmailOutboxWorker  # noqa: E402
+
+settings = get_settings()
+
+
+class CountingHandler:
+    """SMTP stand-in: accepts everything except recipients containing 'bounce'"""
+
+    def __init__(self):
+        self.delivered = 0
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if "bounce" in address:
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered += 1
+        return "250 Message accepted for delivery"
+
+
+def invoice_payload(purchase_id: int, lines: int) -> dict:
+    return {
+        "id": purchase_id,
+        "total_amount": 100.0 * lines,
+        "tax_amount": 18.0 * lines,
+        "final_amount": 118.0 * lines,
+        "paid_amount": 118.0 * lines,
+        "balance_amount": 0.0,
+        "created_at": "2024-01-01 00:00:00",
+        "purchase_items": [
+            {
+                "product_id": i + 1,
+                "unit_price_snapshot": 100.0,
+                "quantity": 1,
+                "tax_percent_snapshot": 18.0,
+                "tax_amount": 18.0,
+                "total_price": 118.0,
+            }
+            for i in range(lines)
+        ],
+        "change_denominations": [],
+    }
+
+
+def seed(emails: int, bounces: int, lines: int):
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    with SessionLocal() as db:
+        customer = Customer(email="bench@example.com")
+        db.add(customer)
+        db.flush()
+        repo = EmailOutboxRepository(db)
+        for i in range(emails + bounces):
+            purchase = Purchase(
+                customer_id=customer.id, total_amount=100, tax_amount=18,
+                final_amount=118, paid_amount=118, balance_amount=0
+            )
+            db.add(purchase)
+            db.flush()
+            to_email = f"bounce{i}@example.com" if i >= emails else f"customer{i}@example.com"
+            repo.enqueue(purchase.id, to_email, invoice_payload(purchase.id, lines))
+        db.commit()
+
+
+def bench_per_invoice_connection(emails: int, lines: int) -> float:
+    """The old behavior: connect + (STARTTLS) + login for every invoice"""
+    started = time.perf_counter()
+    for i in range(emails):
+        service = EmailService()
+        service.send_invoice_email(f"customer{i}@example.com", invoice_payload(i + 1, lines))
+        service.close()
+    return time.perf_counter() - started
+
+
+def bench_outbox_worker(batch_size: int) -> float:
+    worker = EmailOutboxWorker(batch_size=batch_size)
+    started = time.perf_counter()
+    try:
+        while worker.run_once():
+            pass
+    finally:
+        worker.email_service.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=300)
+    parser.add_argument("--bounces", type=int, default=5, help="invoices addressed to rejected recipients")
+    parser.add_argument("--lines", type=int, default=10, help="line items per invoice")
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname=settings.SMTP_HOST, port=settings.SMTP_PORT)
+    controller.start()
+    try:
+        elapsed = bench_per_invoice_connection(args.emails, args.lines)
+        print(f"per-invoice connection  emails={args.emails:<6} elapsed={elapsed:7.2f}s "
+              f"throughput={args.emails / elapsed:8.1f} emails/s")
+
+        seed(args.emails, args.bounces, args.lines)
+        handler.delivered = 0
+        elapsed = bench_outbox_worker(args.batch_size)
+        with SessionLocal() as db:
+            depth = EmailOutboxRepository(db).count_by_status()
+        print(f"outbox worker (reused)  emails={args.emails:<6} elapsed={elapsed:7.2f}s "
+              f"throughput={args.emails / elapsed:8.1f} emails/s delivered={handler.delivered} "
+              f"outbox={depth}")
+
+        assert handler.delivered == args.emails, "every deliverable invoice must be sent exactly once"
+        assert depth.get(EmailOutbox.STATUS_SENT, 0) == args.emails
+        assert depth.get(EmailOutbox.STATUS_DEAD, 0) == args.bounces, "rejected invoices must be dead-lettered"
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Reproducible load test and micro-benchmarks for the billing hot paths.
+
+Seeds a synthetic catalogue, drawer and customer base (sizes configurable,
+identical for a given --seed) plus some purchase history, then drives the
+API in-process through httpx's ASGI transport at a fixed concurrency:
+purchase list / summary / detail reads, product and customer lookups, and
+checkout (POST /purchases, run last so every read scenario sees the same
+data). Each scenario sends the same --requests requests after a short
+warm-up and reports req/s and p50/p95/p99 latency. The micro-benchmarks
+time change making, bill totals and invoice rendering with no HTTP or
+database in the way.
+
+--json writes every figure, with the commit, Python version and database,
+as sorted, rounded JSON that diffs cleanly between commits; --compare
+prints the change against such a file.
+
+Usage:
+    python benchmarks/hot_paths.py --json before.json
+    git checkout my-branch
+    python benchmarks/hot_paths.py --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from invoice_rendering import make_invoice  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core.config import get_settings  # noqa: E402
+from app.db.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.models.customer import Customer  # noqa: E402
+from app.models.denomination import Denomination  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.schemas.schemas import PurchaseCreate  # noqa: E402
+from app.services.billing_service import BillingService  # noqa: E402
+from app.utils.customer_cache import customer_id_cache, customer_profile_cache  # noqa: E402
+from app.utils.denomination_calculator import calculate_change_denominations  # noqa: E402
+from app.utils.invoice_renderer import invoice_renderer  # noqa: E402
+
+settings = get_settings()
+API = settings.API_V1_PREFIX
+
+NOTES = (500, 200, 100, 50, 20, 10, 5, 2, 1)
+TAX_RATES = (0, 5, 12, 18)
+# A till part-way through the day: few large notes, so change making has to search
+TILL = {500: 6, 200: 10, 100: 25, 50: 30, 20: 60, 10: 80, 5: 100, 2: 150, 1: 200}
+
+
+def seed(products: int, customers: int, history: int, rng: random.Random) -> list:
+    """Fresh database: catalogue, customers, a drawer nothing runs short of, and history bills"""
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    customer_id_cache.clear()  # cached IDs point into the dropped tables
+    customer_profile_cache.clear()
+    catalogue = [(rng.randint(10, 5000), rng.choice(TAX_RATES)) for _ in range(products)]
+    with SessionLocal() as db:
+        db.execute(insert(Product), [
+            {'name': f"SKU {i:06d}", 'stock': 10**9, 'price': price, 'tax_percent': tax}
+            for i, (price, tax) in enumerate(catalogue)
+        ])
+        db.execute(insert(Customer), [{'email': f"customer{i}@example.com"} for i in range(customers)])
+        db.add_all(Denomination(drawer_id=1, value=value, available_count=10**8) for value in NOTES)
+        db.commit()
+        
+        bills = [make_bill(rng, catalogue, customers) for _ in range(history)]
+        for start in range(0, len(bills), settings.CHECKOUT_BATCH_MAX_SIZE):
+            chunk = bills[start:start + settings.CHECKOUT_BATCH_MAX_SIZE]
+            BillingService(db).create_purchases_batch([PurchaseCreate(**bill) for bill in chunk])
+    return catalogue
+
+
+def make_bill(rng: random.Random, catalogue: list, customers: int) -> dict:
+    """A 1-5 line cart paid in 500 notes (enough to cover the highest tax rate)"""
+    cart = {}
+    for _ in range(rng.randint(1, 5)):
+        product_id = rng.randrange(len(catalogue)) + 1
+        cart[product_id] = cart.get(product_id, 0) + rng.randint(1, 3)
+    ceiling = sum(catalogue[pid - 1][0] * qty for pid, qty in cart.items()) * (100 + max(TAX_RATES)) / 100
+    notes = math.floor(ceiling / 500) + 1
+    return {
+        'customer_email': f"customer{rng.randrange(customers)}@example.com",
+        'items': [{'product_id': pid, 'quantity': qty} for pid, qty in cart.items()],
+        'paid_amount': 500 * notes,
+        'denominations': [{'value': 500, 'count': notes}]
+    }
+
+
+def scenarios(rng: random.Random, catalogue: list, customers: int, history: int, count: int) -> dict:
+    """(method, url, body) lists per scenario, generated up front so every run sends the same requests"""
+    return {
+        'purchase_list': [
+            ("GET", f"{API}/purchases/?limit=50", None) if i % 2 else
+            ("GET", f"{API}/purchases/?limit=50&customer_email=customer{rng.randrange(customers)}@example.com", None)
+            for i in range(count)
+        ],
+        'purchase_summary': [("GET", f"{API}/purchases/summary?limit=50", None)] * count,
+        'purchase_detail': [("GET", f"{API}/purchases/{rng.randint(1, history)}", None) for _ in range(count)],
+        'product_lookup': [("GET", f"{API}/products/{rng.randint(1, len(catalogue))}", None) for _ in range(count)],
+        'customer_profile': [
+            ("GET", f"{API}/customers/customer{rng.randrange(customers)}@example.com", None) for _ in range(count)
+        ],
+        'checkout': [("POST", f"{API}/purchases/", make_bill(rng, catalogue, customers)) for _ in range(count)],
+    }
+
+
+def percentile_summary(samples: list) -> dict:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {'p50_ms': cuts[49] * 1000, 'p95_ms': cuts[94] * 1000, 'p99_ms': cuts[98] * 1000}
+
+
+async def drive(client: httpx.AsyncClient, requests: list, concurrency: int) -> dict:
+    """Send the requests with `concurrency` in flight at all times"""
+    pending = iter(requests)
+    latencies = []
+    errors = 0
+    
+    async def worker():
+        nonlocal errors
+        for method, url, body in pending:
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {'requests': len(latencies), 'errors': errors, 'req_per_s': len(latencies) / elapsed,
+            **percentile_summary(latencies)}
+
+
+async def run_load(plans: dict, concurrency: int, warmup: int) -> dict:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, requests in plans.items():
+            await drive(client, requests[:warmup], concurrency)
+            results[name] = await drive(client, requests[warmup:], concurrency)
+            print(
+                f"{name:<18} req/s={results[name]['req_per_s']:8.1f}  p50={results[name]['p50_ms']:7.2f} ms  "
+                f"p95={results[name]['p95_ms']:7.2f} ms  p99={results[name]['p99_ms']:7.2f} ms  "
+                f"errors={results[name]['errors']}"
+            )
+    return results
+
+
+def micro(name: str, fn, number: int, repeat: int) -> dict:
+    per_op = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    print(f"{name:<18} {per_op * 1e6:10.2f} us/op  {1 / per_op:12,.0f} ops/s")
+    return {'us_per_op': per_op * 1e6, 'ops_per_s': 1 / per_op}
+
+
+def run_micro(rng: random.Random, number: int, repeat: int) -> dict:
+    amounts = [rng.randint(1, 2000) + rng.choice((0, 0.5, 0.25)) for _ in range(number)]
+    amount_cycle = iter(amounts * (repeat + 1))
+    service = BillingService(None)
+    cart = [
+        {'product': Product(price=Decimal(rng.randint(10, 5000)), tax_percent=Decimal(rng.choice(TAX_RATES))),
+         'quantity': rng.randint(1, 3)}
+        for _ in range(10)
+    ]
+    invoice = make_invoice(10)
+    return {
+        'change_making': micro(
+            "change_making", lambda: calculate_change_denominations(next(amount_cycle), TILL), number, repeat
+        ),
+        'bill_totals_10_lines': micro(
+            "bill_totals", lambda: service._calculate_purchase_totals(cart), number, repeat
+        ),
+        'invoice_html_10_lines': micro(
+            "invoice_html", lambda: invoice_renderer.render(invoice, "html"), number, repeat
+        ),
+        'invoice_receipt_10_lines': micro(
+            "invoice_receipt", lambda: invoice_renderer.render(invoice, "receipt"), number, repeat
+        ),
+    }
+
+
+def commit_id() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def rounded(value):
+    if isinstance(value, float):
+        return float(f"{value:.4g}")
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    return value
+
+
+def compare(baseline: dict, current: dict):
+    print(f"\nchange vs {baseline['meta']['commit']} (negative latency / positive rate is better)")
+    for section in ("load", "micro"):
+        for name, figures in current[section].items():
+            old = baseline.get(section, {}).get(name)
+            if not old:
+                continue
+            changes = [
+                f"{key}={(value - old[key]) / old[key]:+.1%}"
+                for key, value in figures.items()
+                if key in old and isinstance(value, float) and old[key]
+            ]
+            print(f"  {name:<24} {'  '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--history", type=int, default=2000, help="purchases seeded before the run")
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--micro-number", type=int, default=2000, help="calls per micro-benchmark sample")
+    parser.add_argument("--micro-repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    catalogue = seed(args.products, args.customers, args.history, rng)
+    print(f"seeded {args.products} products, {args.customers} customers, {args.history} purchases "
+          f"in {time.perf_counter() - started:.1f}s")
+    plans = scenarios(rng, catalogue, args.customers, args.history, args.requests + args.warmup)
+    
+    results = {
+        'meta': {
+            'commit': commit_id(),
+            'python': platform.python_version(),
+            'database': engine.dialect.name,
+            'async_stack': settings.ASYNC_DATABASE_ENABLED,
+            'concurrency_mode': settings.CHECKOUT_CONCURRENCY_MODE,
+            'args': {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        },
+        'load': asyncio.run(run_load(plans, args.concurrency, args.warmup)),
+        'micro': run_micro(rng, args.micro_number, args.micro_repeat),
+    }
+    results = rounded(results)
+    
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"results written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
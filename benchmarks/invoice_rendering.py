@@ -0,0 +1,165 @@
+"""
+Invoice rendering time per invoice for 10 / 100 / 1000 line bills.
+
+Times the precompiled Jinja2 templates (HTML, plain text, till receipt,
+and HTML streamed in chunks, with the time to its first chunk) against
+the old f-string builder, which grew the item rows with `+=` in a loop.
+Also reports how long compiling the templates takes, which is paid once
+at startup instead of per invoice, and checks that the HTML variant
+matches the old output tag for tag (whitespace aside).
+
+CPython appends to a string with a single reference in place, so the old
+builder was linear too; most of the templates' extra cost is HTML
+autoescaping of every value.
+
+Usage:
+    python benchmarks/invoice_rendering.py --lines 10 100 1000 --repeat 200
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from app.utils.invoice_renderer import InvoiceRenderer, invoice_renderer  # noqa: E402
+
+
+def make_invoice(lines: int) -> dict:
+    items = [
+        {
+            'product_id': 1 + i % 500,
+            'unit_price_snapshot': 10.0 + i % 97,
+            'quantity': 1 + i % 4,
+            'tax_percent_snapshot': (0.0, 5.0, 12.0, 18.0)[i % 4],
+            'tax_amount': round((10.0 + i % 97) * (1 + i % 4) * (0.0, 0.05, 0.12, 0.18)[i % 4], 2),
+            'total_price': round((10.0 + i % 97) * (1 + i % 4) * (1.0, 1.05, 1.12, 1.18)[i % 4], 2)
+        }
+        for i in range(lines)
+    ]
+    final = round(sum(item['total_price'] for item in items), 2)
+    tax = round(sum(item['tax_amount'] for item in items), 2)
+    paid = float(int(final) + 1)
+    return {
+        'id': 42,
+        'created_at': "2024-03-01 10:15:00.123456",
+        'total_amount': round(final - tax, 2),
+        'tax_amount': tax,
+        'final_amount': final,
+        'paid_amount': paid,
+        'balance_amount': round(paid - final, 2),
+        'purchase_items': items,
+        'change_denominations': [{'drawer_id': 1, 'denomination_value': 1, 'count_given': 1}]
+    }
+
+
+def legacy_html(purchase_data: dict) -> str:
+    """The previous EmailService._generate_invoice_html"""
+    items_html = ""
+    for item in purchase_data.get('purchase_items', []):
+        items_html += f"""
+            <tr>
+                <td>{item['product_id']}</td>
+                <td>{item['unit_price_snapshot']:.2f}</td>
+                <td>{item['quantity']}</td>
+                <td>{item['unit_price_snapshot'] * item['quantity']:.2f}</td>
+                <td>{item['tax_percent_snapshot']:.2f}%</td>
+                <td>{item['tax_amount']:.2f}</td>
+                <td>{item['total_price']:.2f}</td>
+            </tr>
+            """
+    
+    change_html = ""
+    for denom in purchase_data.get('change_denominations', []):
+        change_html += f"<li>{denom['denomination_value']}: {denom['count_given']}</li>"
+    
+    return f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto;">
+            <h2>Invoice #{purchase_data['id']}</h2>
+            <p><strong>Date:</strong> {purchase_data['created_at']}</p>
+            
+            <h3>Items Purchased</h3>
+            <table border="1" cellpadding="5" style="border-collapse: collapse; width: 100%;">
+                <tr style="background-color: #f0f0f0;">
+                    <th>Product ID</th>
+                    <th>Unit Price</th>
+                    <th>Quantity</th>
+                    <th>Purchase Price</th>
+                    <th>Tax %</th>
+                    <th>Tax Amount</th>
+                    <th>Total</th>
+                </tr>
+                {items_html}
+            </table>
+            
+            <div style="margin-top: 20px;">
+                <p><strong>Total without tax:</strong> Rs.{purchase_data['total_amount']:.2f}</p>
+                <p><strong>Total tax payable:</strong> Rs.{purchase_data['tax_amount']:.2f}</p>
+                <p><strong>Net price:</strong> Rs.{purchase_data['final_amount']:.2f}</p>
+                <p><strong>Paid amount:</strong> Rs.{purchase_data['paid_amount']:.2f}</p>
+                <p><strong>Balance/Change:</strong> Rs.{purchase_data['balance_amount']:.2f}</p>
+            </div>
+            
+            {f'<h3>Change Denominations</h3><ul>{change_html}</ul>' if change_html else ''}
+            
+            <p style="margin-top: 30px; color: #666;">Thank you for your purchase!</p>
+        </body>
+        </html>
+        """
+
+
+def tokens(html: str) -> list:
+    """Markup with all whitespace dropped, split at tags"""
+    return "".join(html.split()).replace("><", ">\n<").splitlines()
+
+
+def per_invoice_us(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    started = time.perf_counter()
+    InvoiceRenderer()
+    print(f"template compilation (once per process): {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    print(
+        f"{'lines':>6} {'legacy f-string':>16} {'html':>10} {'html stream':>12} {'first chunk':>12} "
+        f"{'text':>10} {'receipt':>10}   (us per invoice)"
+    )
+    for lines in args.lines:
+        invoice = make_invoice(lines)
+        assert tokens(invoice_renderer.render(invoice)) == tokens(legacy_html(invoice)), "HTML differs from the old builder"
+        repeat = max(5, args.repeat * 10 // max(lines, 10))
+        timings = [
+            per_invoice_us(lambda: legacy_html(invoice), repeat),
+            per_invoice_us(lambda: invoice_renderer.render(invoice, "html"), repeat),
+            per_invoice_us(lambda: "".join(invoice_renderer.stream(invoice, "html")), repeat),
+            per_invoice_us(lambda: next(invoice_renderer.stream(invoice, "html")), repeat),
+            per_invoice_us(lambda: invoice_renderer.render(invoice, "text"), repeat),
+            per_invoice_us(lambda: invoice_renderer.render(invoice, "receipt"), repeat),
+        ]
+        legacy, html, streamed, first_chunk, text, receipt = timings
+        print(
+            f"{lines:>6} {legacy:>16.1f} {html:>10.1f} {streamed:>12.1f} {first_chunk:>12.1f} "
+            f"{text:>10.1f} {receipt:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Streaming purchase export vs. paging through the purchase listing.
+
+Seeds --purchases bills (see sales_rollups.py), then pulls every line
+twice: through PurchaseExportService (server-side cursor, encoded chunk by
+chunk) and the way the accounting job used to, page by page through the
+ORM listing behind GET /purchases. Reports wall time and the Python heap
+peak (tracemalloc, measured on a second run) for each; run with two sizes to see the export's peak
+stay flat while the data grows.
+
+Usage:
+    python benchmarks/purchase_export.py --purchases 20000 80000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from sales_rollups import seed  # noqa: E402
+
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.crud.purchase_repository import PurchaseRepository  # noqa: E402
+from app.services.export_service import PurchaseExportService  # noqa: E402
+
+
+def export(fmt: str):
+    size = 0
+    for chunk in PurchaseExportService(fmt).stream():
+        size += len(chunk)
+    return size
+
+
+def paged():
+    """Keyset pages of 100 full purchase graphs, as GET /purchases serves them"""
+    lines = 0
+    after = None
+    with SessionLocal() as db:
+        while True:
+            page = PurchaseRepository(db).get_all(limit=100, after=after)
+            if not page:
+                return lines
+            lines += sum(len(purchase.purchase_items) for purchase in page)
+            after = (page[-1].created_at, page[-1].id)
+            db.expunge_all()
+
+
+def measure(label: str, fn):
+    """Time a clean run, then repeat it under tracemalloc for the heap peak"""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<16} {elapsed:7.2f}s  peak heap {peak / 2**20:7.1f} MiB  ({result:,})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--purchases", type=int, nargs="+", default=[20000, 80000])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    for purchases in args.purchases:
+        seed(purchases, 30, 7)
+        print(f"{purchases} purchases")
+        measure("export ndjson", lambda: export("ndjson"))
+        measure("export csv", lambda: export("csv"))
+        measure("paged listing", paged)
+
+
+if __name__ == "__main__":
+    main()
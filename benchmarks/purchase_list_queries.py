@@ -0,0 +1,107 @@
+"""
+Query-count harness for purchase listings.
+
+Seeds purchases with several line items each, then counts the SQL
+statements needed to load *and serialize* one page through every listing
+path. The count must stay constant as the page size grows; an N+1
+regression makes it grow with the page and fails the run.
+
+Usage:
+    python benchmarks/purchase_list_queries.py --purchases 300 --items 5
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from app.db.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.db.query_counter import QueryCounter  # noqa: E402
+from app.services import billing_service  # noqa: E402,F401 - registers every model
+from app.models.customer import Customer  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.purchase import Purchase  # noqa: E402
+from app.models.purchase_item import PurchaseItem  # noqa: E402
+from app.models.purchase_denomination import PurchaseDenomination  # noqa: E402
+from app.crud.purchase_repository import PurchaseRepository  # noqa: E402
+from app.schemas.schemas import PurchaseResponse, PurchaseSummary  # noqa: E402
+
+EMAIL = "regular@example.com"
+PAGE_SIZES = (10, 50, 100)
+
+# Maximum statements per page, independent of page size
+BUDGETS = {
+    "get_all": 2,               # purchases+customer join, items IN
+    "get_by_customer_email": 3,  # + change denominations IN
+    "get_summaries": 1,         # single projection
+}
+
+
+def seed(purchases: int, items: int):
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    with SessionLocal() as db:
+        customer = Customer(email=EMAIL)
+        products = [Product(name=f"SKU {i}", stock=10**6, price=10 + i, tax_percent=5) for i in range(items)]
+        db.add(customer)
+        db.add_all(products)
+        db.flush()
+        for _ in range(purchases):
+            purchase = Purchase(
+                customer_id=customer.id, total_amount=100, tax_amount=5,
+                final_amount=105, paid_amount=110, balance_amount=5
+            )
+            purchase.purchase_items = [
+                PurchaseItem(
+                    product_id=p.id, quantity=1, unit_price_snapshot=p.price,
+                    tax_percent_snapshot=p.tax_percent, tax_amount=0.5, total_price=p.price + 0.5
+                )
+                for p in products
+            ]
+            purchase.purchase_denominations = [PurchaseDenomination(denomination_value=5, count_given=1)]
+            db.add(purchase)
+        db.commit()
+
+
+def measure(path: str, limit: int):
+    with SessionLocal() as db:
+        repo = PurchaseRepository(db)
+        started = time.perf_counter()
+        with QueryCounter(engine) as counter:
+            if path == "get_all":
+                rows = [PurchaseResponse.model_validate(p) for p in repo.get_all(limit=limit)]
+            elif path == "get_by_customer_email":
+                rows = [PurchaseResponse.model_validate(p) for p in repo.get_by_customer_email(EMAIL, limit=limit)]
+            else:
+                rows = [PurchaseSummary.model_validate(r) for r in repo.get_summaries(limit=limit)]
+        elapsed = time.perf_counter() - started
+    return len(rows), counter.count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--purchases", type=int, default=300)
+    parser.add_argument("--items", type=int, default=5, help="line items per purchase")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    seed(args.purchases, args.items)
+    failures = []
+    for path, budget in BUDGETS.items():
+        for limit in PAGE_SIZES:
+            rows, queries, elapsed = measure(path, limit)
+            print(f"{path:<22} page={limit:<4} rows={rows:<4} queries={queries:<3} {elapsed * 1000:7.1f} ms")
+            if queries > budget:
+                failures.append(f"{path} page={limit}: {queries} queries (budget {budget})")
+
+    if failures:
+        sys.exit("Query budget exceeded:\n  " + "\n  ".join(failures))
+    print("All listing paths within their query budgets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Read-replica routing with two local SQLite files.
+
+DATABASE_URL is the primary and READ_DATABASE_URL a second file that a
+background thread refreshes from the primary every --lag seconds (SQLite's
+online backup), standing in for streaming replication and its lag.
+
+First checks the routing: right after a checkout the new bill is missing
+from the replica's purchase list but visible with X-Read-Consistency:
+primary, and GET /purchases/{id} still finds it (replica miss falls back
+to the primary). Then runs checkouts and history reads (purchase list and
+summary) concurrently, once with reads on the replica and once with every
+read forced to the primary, and reports req/s and p50/p95/p99 for both.
+
+Usage:
+    python benchmarks/read_replica.py --writers 4 --readers 8 --requests 300
+
+SQLite in WAL mode already lets readers run alongside the writer, so the
+split mostly shows on PostgreSQL, where the replica takes the read I/O and
+connections off the primary; the routing itself is identical.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.primary.db')}")
+os.environ.setdefault("READ_DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.replica.db')}")
+
+import httpx  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from hot_paths import drive, make_bill, seed  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core.config import get_settings  # noqa: E402
+from app.db.database import READ_CONSISTENCY_HEADER  # noqa: E402
+
+settings = get_settings()
+API = settings.API_V1_PREFIX
+
+
+def sqlite_path(url: str) -> str:
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        raise SystemExit("This benchmark replicates SQLite files; point both URLs at SQLite databases")
+    return url.database
+
+
+def replicate():
+    """Copy the primary onto the replica (consistent snapshot, replica readers wait on its lock)"""
+    source = sqlite3.connect(sqlite_path(settings.DATABASE_URL))
+    target = sqlite3.connect(sqlite_path(settings.READ_DATABASE_URL), timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def replicator(lag: float, stop: threading.Event):
+    while not stop.wait(lag):
+        replicate()
+
+
+async def check_routing(client: httpx.AsyncClient, bill: dict):
+    primary = {READ_CONSISTENCY_HEADER: "primary"}
+    response = await client.post(f"{API}/purchases/", json=bill)
+    assert response.status_code == 201, response.text
+    purchase_id = response.json()["id"]
+    
+    on_replica = (await client.get(f"{API}/purchases/summary?limit=1")).json()["items"]
+    on_primary = (await client.get(f"{API}/purchases/summary?limit=1", headers=primary)).json()["items"]
+    detail = await client.get(f"{API}/purchases/{purchase_id}")
+    assert not on_replica or on_replica[0]["id"] != purchase_id, "replica already has the new bill"
+    assert on_primary[0]["id"] == purchase_id, "primary read missed the new bill"
+    assert detail.status_code == 200 and detail.json()["id"] == purchase_id, "read-your-writes fallback failed"
+    print(f"routing: bill {purchase_id} absent from replica list, present with {READ_CONSISTENCY_HEADER}: "
+          f"primary, detail served via primary fallback")
+
+
+async def mixed_load(writes: list, reads: list, writers: int, readers: int, headers: dict) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        checkout, history = await asyncio.gather(drive(client, writes, writers), drive(client, reads, readers))
+    return {'checkout': checkout, 'history': history}
+
+
+def report(label: str, results: dict):
+    for name, figures in results.items():
+        print(
+            f"{label:<8} {name:<9} req/s={figures['req_per_s']:8.1f}  p50={figures['p50_ms']:7.2f} ms  "
+            f"p95={figures['p95_ms']:7.2f} ms  p99={figures['p99_ms']:7.2f} ms  errors={figures['errors']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=2000, help="purchases seeded before the run")
+    parser.add_argument("--requests", type=int, default=300, help="checkouts and history reads per run")
+    parser.add_argument("--writers", type=int, default=4, help="checkouts in flight")
+    parser.add_argument("--readers", type=int, default=8, help="history reads in flight")
+    parser.add_argument("--lag", type=float, default=1.0, help="seconds between replica refreshes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    print(f"Primary: {settings.DATABASE_URL}\nReplica: {settings.READ_DATABASE_URL}")
+    rng = random.Random(args.seed)
+    catalogue = seed(args.products, args.customers, args.history, rng)
+    replicate()
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await check_routing(client, make_bill(rng, catalogue, args.customers))
+        
+        stop = threading.Event()
+        thread = threading.Thread(target=replicator, args=(args.lag, stop), daemon=True)
+        thread.start()
+        try:
+            for label, headers in (("replica", {}), ("primary", {READ_CONSISTENCY_HEADER: "primary"})):
+                writes = [
+                    ("POST", f"{API}/purchases/", make_bill(rng, catalogue, args.customers))
+                    for _ in range(args.requests)
+                ]
+                reads = [
+                    ("GET", f"{API}/purchases/{'summary' if i % 2 else ''}?limit=50", None)
+                    for i in range(args.requests)
+                ]
+                report(label, await mixed_load(writes, reads, args.writers, args.readers, headers))
+        finally:
+            stop.set()
+            thread.join()
+    
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
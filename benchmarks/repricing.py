@@ -0,0 +1,127 @@
+"""
+Pricing engine and what-if repricing report: NumPy vs. pure Python.
+
+Part 1 prices one synthetic cart of --cart-lines lines with both backends
+and checks they agree to the paisa. Part 2 seeds --lines historic line
+snapshots, runs the what-if repricing report (POST /reports/repricing)
+with vectorization off and on, and checks both reports are identical.
+
+Usage:
+    python benchmarks/repricing.py --cart-lines 100000 --lines 200000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from sqlalchemy import insert  # noqa: E402
+
+import app.main  # noqa: E402,F401  (registers every model)
+from app.core.config import get_settings  # noqa: E402
+from app.db.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.models.customer import Customer  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.purchase import Purchase  # noqa: E402
+from app.models.purchase_item import PurchaseItem  # noqa: E402
+from app.schemas.schemas import RepricingRequest  # noqa: E402
+from app.services.repricing_service import RepricingService  # noqa: E402
+from app.utils import pricing_engine  # noqa: E402
+
+PRODUCTS = 500
+TAX_RATES = (0, 5, 12, 18, 28, 12.5)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def bench_cart(lines: int, rng: random.Random):
+    prices = [rng.randint(100, 10**7) for _ in range(lines)]
+    quantities = [rng.randint(1, 20) for _ in range(lines)]
+    taxes = [int(rng.choice(TAX_RATES) * 100) for _ in range(lines)]
+
+    python, python_elapsed = timed(
+        lambda: pricing_engine.price_lines(prices, quantities, taxes, vectorize=False)
+    )
+    print(f"cart  lines={lines:<8} python={python_elapsed * 1000:8.1f} ms", end="")
+    if pricing_engine.np is None:
+        print("  (NumPy not installed)")
+        return
+    vectorized, numpy_elapsed = timed(
+        lambda: pricing_engine.price_lines(prices, quantities, taxes, vectorize=True)
+    )
+    assert list(python.lines()) == list(vectorized.lines()), "backends must agree line by line"
+    assert python.totals() == vectorized.totals(), "backends must agree on totals"
+    print(f"  numpy={numpy_elapsed * 1000:8.1f} ms  speedup={python_elapsed / numpy_elapsed:5.1f}x")
+
+
+def seed(lines: int, rng: random.Random):
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    with SessionLocal() as db:
+        db.add(Customer(email="history@example.com"))
+        db.add_all(
+            Product(name=f"SKU {i}", stock=10**6, price=rng.randint(1, 5000) + 0.5, tax_percent=rng.choice(TAX_RATES))
+            for i in range(PRODUCTS)
+        )
+        db.flush()
+        bills = max(lines // 4, 1)
+        db.execute(insert(Purchase), [
+            {"customer_id": 1, "total_amount": 0, "tax_amount": 0, "final_amount": 0,
+             "paid_amount": 0, "balance_amount": 0, "created_at": datetime(2024, 1, 1)}
+            for _ in range(bills)
+        ])
+        db.execute(insert(PurchaseItem), [
+            {"purchase_id": 1 + i // 4, "product_id": rng.randint(1, PRODUCTS), "quantity": rng.randint(1, 5),
+             "unit_price_snapshot": rng.randint(100, 500000) / 100, "tax_percent_snapshot": rng.choice(TAX_RATES),
+             "tax_amount": 0, "total_price": 0}
+            for i in range(lines)
+        ])
+        db.commit()
+
+
+def bench_report(lines: int, rng: random.Random):
+    seed(lines, rng)
+    settings = get_settings()
+    request = RepricingRequest(current_prices=True, tax_overrides={1: 0, 2: 40}, price_overrides={3: 99.99})
+    vector_threshold = settings.PRICING_VECTOR_MIN_LINES
+    try:
+        settings.PRICING_VECTOR_MIN_LINES = 10**12
+        with SessionLocal() as db:
+            python, python_elapsed = timed(RepricingService(db).run, request)
+    finally:
+        settings.PRICING_VECTOR_MIN_LINES = vector_threshold
+    with SessionLocal() as db:
+        vectorized, numpy_elapsed = timed(RepricingService(db).run, request)
+
+    assert python == {**vectorized, "engine": python["engine"]}, "reports must not depend on the backend"
+    print(f"report lines={lines:<8} bills={python['purchases']:<7} changed={python['bills_changed']:<7} "
+          f"python={python_elapsed:6.2f}s  {vectorized['engine']}={numpy_elapsed:6.2f}s  "
+          f"delta={python['delta']['final_amount']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cart-lines", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=200000, help="historic line snapshots to reprice")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    bench_cart(args.cart_lines, rng)
+    bench_report(args.lines, rng)
+    print("NumPy and pure-Python pricing agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Sales reports from the rollup tables vs. scanning purchases directly.
+
+Seeds --purchases bills spread over --days days (random customers,
+products and carts), folds them into the rollups with the catch-up job,
+then times the daily sales report and the product leaderboard both ways
+and checks that they agree to the paisa. The rollup side touches one row
+per (hour, customer or product), so its cost tracks the window length
+while the raw scan grows with every purchase.
+
+Usage:
+    python benchmarks/sales_rollups.py --purchases 200000 --days 90 --window 30
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.db.database import Base, SessionLocal, engine, init_db  # noqa: E402
+from app.db.types import stored_minor  # noqa: E402
+from app.models.customer import Customer  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.purchase import Purchase  # noqa: E402
+from app.models.purchase_denomination import PurchaseDenomination  # noqa: E402,F401 (Purchase relationship)
+from app.models.purchase_item import PurchaseItem  # noqa: E402
+from app.services.rollup_service import SalesRollupService  # noqa: E402
+from app.utils.money import line_amounts, to_rupees  # noqa: E402
+
+PRODUCTS = 500
+CUSTOMERS = 5000
+CHUNK = 5000
+
+
+def seed(purchases: int, days: int, seed_value: int) -> datetime:
+    """Bulk-insert purchases and their lines; returns the first day of the history"""
+    rng = random.Random(seed_value)
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    first_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    catalogue = [(rng.randint(100, 50000), rng.choice([0, 500, 1200, 1800, 2800])) for _ in range(PRODUCTS)]
+    with SessionLocal() as db:
+        db.execute(insert(Product), [
+            {'name': f"SKU {i}", 'stock': 10**9, 'price': to_rupees(price), 'tax_percent': to_rupees(tax)}
+            for i, (price, tax) in enumerate(catalogue)
+        ])
+        db.execute(insert(Customer), [{'email': f"c{i}@example.com"} for i in range(CUSTOMERS)])
+        
+        bills, lines = [], []
+        for purchase_id in range(1, purchases + 1):
+            cart = [(rng.randrange(PRODUCTS) + 1, rng.randint(1, 4)) for _ in range(rng.randint(1, 6))]
+            amounts = line_amounts((catalogue[pid - 1][0], qty, catalogue[pid - 1][1]) for pid, qty in cart)
+            net = sum(n for n, _ in amounts)
+            tax = sum(t for _, t in amounts)
+            bills.append({
+                'id': purchase_id,
+                'customer_id': rng.randrange(CUSTOMERS) + 1,
+                'created_at': first_day + timedelta(seconds=rng.randrange(days * 86400)),
+                'total_amount': to_rupees(net),
+                'tax_amount': to_rupees(tax),
+                'final_amount': to_rupees(net + tax),
+                'paid_amount': to_rupees(net + tax),
+                'balance_amount': 0
+            })
+            lines.extend(
+                {
+                    'purchase_id': purchase_id,
+                    'product_id': pid,
+                    'quantity': qty,
+                    'unit_price_snapshot': to_rupees(catalogue[pid - 1][0]),
+                    'tax_percent_snapshot': to_rupees(catalogue[pid - 1][1]),
+                    'tax_amount': to_rupees(line_tax),
+                    'total_price': to_rupees(line_net + line_tax)
+                }
+                for (pid, qty), (line_net, line_tax) in zip(cart, amounts)
+            )
+            if len(bills) >= CHUNK or purchase_id == purchases:
+                db.execute(insert(Purchase), bills)
+                db.execute(insert(PurchaseItem), lines)
+                bills, lines = [], []
+        db.commit()
+    return first_day
+
+
+def raw_sales(db, start, end):
+    day = func.date(Purchase.created_at)
+    stmt = (
+        select(day, func.count(Purchase.id), func.sum(stored_minor(Purchase.final_amount)))
+        .where(Purchase.created_at >= start, Purchase.created_at < end)
+        .group_by(day).order_by(day)
+    )
+    return [(str(d), int(bills), int(revenue)) for d, bills, revenue in db.execute(stmt)]
+
+
+def raw_top_products(db, start, end, limit):
+    revenue = func.sum(stored_minor(PurchaseItem.total_price))
+    stmt = (
+        select(PurchaseItem.product_id, revenue)
+        .join(Purchase, Purchase.id == PurchaseItem.purchase_id)
+        .where(Purchase.created_at >= start, Purchase.created_at < end)
+        .group_by(PurchaseItem.product_id)
+        .order_by(revenue.desc(), PurchaseItem.product_id)
+        .limit(limit)
+    )
+    return [(product_id, int(total)) for product_id, total in db.execute(stmt)]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--purchases", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--window", type=int, default=30, help="report window in days")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    started = time.perf_counter()
+    first_day = seed(args.purchases, args.days, args.seed)
+    print(f"seeded {args.purchases} purchases over {args.days} days in {time.perf_counter() - started:.1f}s")
+    
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        folded = SalesRollupService(db).catch_up()
+        elapsed = time.perf_counter() - started
+        print(f"catch-up folded {folded} purchases in {elapsed:.2f}s ({folded / elapsed:,.0f} purchases/s)")
+        
+        end_day = (first_day + timedelta(days=args.days)).date()
+        start_day = end_day - timedelta(days=args.window - 1)
+        start = datetime.combine(start_day, datetime.min.time())
+        end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+        service = SalesRollupService(db)
+        
+        rolled, rollup_ms = timed(lambda: service.sales_series(start_day, end_day), args.repeat)
+        scanned, raw_ms = timed(lambda: raw_sales(db, start, end), args.repeat)
+        assert [(str(b['day']), b['bills'], int(b['revenue'] * 100)) for b in rolled['buckets']] == scanned
+        print(f"daily sales ({args.window} days)   rollup {rollup_ms:8.2f} ms   raw scan {raw_ms:8.2f} ms   {raw_ms / rollup_ms:6.1f}x")
+        
+        rolled, rollup_ms = timed(lambda: service.top_products(start_day, end_day, 20), args.repeat)
+        scanned, raw_ms = timed(lambda: raw_top_products(db, start, end, 20), args.repeat)
+        assert [(p['product_id'], int(p['revenue'] * 100)) for p in rolled['products']] == scanned
+        print(f"top 20 products            rollup {rollup_ms:8.2f} ms   raw scan {raw_ms:8.2f} ms   {raw_ms / rollup_ms:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
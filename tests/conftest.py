@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so the test database must be set first
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.test.db')}")
+
+
+@pytest.fixture
+def database():
+    """Fresh schema and empty per-process caches for a test that writes"""
+    from app.db.database import Base, engine, init_db
+    from app.services import billing_service  # noqa: F401 - registers every model
+    from app.utils.catalog_cache import catalog_cache
+    from app.utils.customer_cache import customer_id_cache, customer_profile_cache
+    from app.utils.denomination_calculator import invalidate_change_tables
+    from app.utils.idempotency_cache import idempotency_cache
+    
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    for cache in (customer_id_cache, customer_profile_cache, idempotency_cache):
+        cache.clear()
+    catalog_cache.invalidate()
+    invalidate_change_tables()
+    yield engine
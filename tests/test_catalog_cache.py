@@ -0,0 +1,20 @@
+from decimal import Decimal
+
+from app.utils.catalog_cache import CatalogEntry, ProductCatalogCache
+
+
+def entry(price: str) -> CatalogEntry:
+    return CatalogEntry(id=1, name="Tea", price=Decimal(price), tax_percent=Decimal("5"))
+
+
+def test_fill_read_before_an_invalidation_is_not_cached():
+    cache = ProductCatalogCache(max_size=10, ttl_seconds=60)
+    generation = cache.generation       # reader captures the generation, then SELECTs the old row
+    cache.invalidate(1)                 # a writer commits a new price and invalidates
+    cache.put_many([entry("10.00")], generation)
+    
+    assert cache.get_many([1]) == ({}, [1])
+    
+    cache.put_many([entry("12.00")], cache.generation)
+    found, missing = cache.get_many([1])
+    assert found[1].price == Decimal("12.00") and missing == []
@@ -0,0 +1,81 @@
+import threading
+from collections import Counter
+
+import pytest
+from sqlalchemy import func
+
+from app.core.exceptions import ConcurrencyConflictException, InsufficientStockException
+from app.db.database import SessionLocal
+from app.models.denomination import Denomination
+from app.models.product import Product
+from app.models.purchase_denomination import PurchaseDenomination
+from app.models.purchase_item import PurchaseItem
+from app.schemas.schemas import PurchaseCreate
+from app.services.billing_service import BillingService
+
+STOCK = 15
+THREADS = 6
+CHECKOUTS = 5  # per thread: 30 attempts on 15 units
+DRAWER = {100: 100, 20: 100, 5: 100, 2: 100}
+PRICE = 73  # paid with one 100 note, so every bill takes 27 in change
+
+
+def seed() -> int:
+    with SessionLocal() as db:
+        product = Product(name="Hot SKU", stock=STOCK, price=PRICE, tax_percent=0)
+        db.add(product)
+        db.add_all(Denomination(value=value, available_count=count) for value, count in DRAWER.items())
+        db.commit()
+        return product.id
+
+
+def till(mode: str, product_id: int, barrier: threading.Barrier, outcomes: Counter, lock: threading.Lock):
+    barrier.wait()
+    for i in range(CHECKOUTS):
+        purchase = PurchaseCreate(
+            customer_email=f"till{threading.get_ident() % 1000}-{i}@example.com",
+            items=[{"product_id": product_id, "quantity": 1}],
+            paid_amount=100,
+            denominations=[{"value": 100, "count": 1}],
+        )
+        with SessionLocal() as db:
+            try:
+                BillingService(db, concurrency_mode=mode).create_purchase(purchase)
+                outcome = "ok"
+            except (InsufficientStockException, ConcurrencyConflictException) as e:
+                outcome = type(e).__name__
+        with lock:
+            outcomes[outcome] += 1
+
+
+@pytest.mark.parametrize("mode", ["pessimistic", "optimistic"])
+def test_concurrent_checkouts_never_oversell(database, mode):
+    product_id = seed()
+    outcomes: Counter = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+    threads = [
+        threading.Thread(target=till, args=(mode, product_id, barrier, outcomes, lock)) for _ in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with SessionLocal() as db:
+        remaining = db.scalar(func.min(Product.stock).select().where(Product.id == product_id))
+        sold = db.scalar(func.coalesce(func.sum(PurchaseItem.quantity), 0).select())
+        given = dict(
+            db.query(PurchaseDenomination.denomination_value, func.sum(PurchaseDenomination.count_given))
+            .group_by(PurchaseDenomination.denomination_value)
+            .all()
+        )
+        drawer = {d.value: d.available_count for d in db.query(Denomination)}
+    
+    assert sum(outcomes.values()) == THREADS * CHECKOUTS
+    assert outcomes["ok"] == sold <= STOCK
+    assert remaining == STOCK - sold >= 0
+    # Every note handed out as change left the drawer exactly once: no lost update
+    for value in DRAWER:
+        assert drawer[value] == DRAWER[value] - given.get(value, 0)
+    assert sum(value * count for value, count in given.items()) == (100 - PRICE) * sold
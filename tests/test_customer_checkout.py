@@ -0,0 +1,97 @@
+import threading
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+
+from app.core.exceptions import InsufficientStockException
+from app.crud.customer_crud import CustomerRepository
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.denomination import Denomination
+from app.models.product import Product
+from app.schemas.schemas import PurchaseCreate
+from app.services.billing_service import BillingService
+from app.utils.customer_cache import customer_id_cache, customer_profile_cache
+
+PRICE = 40
+EMAILS = ["first@example.com", "second@example.com", "third@example.com"]
+THREADS = 6
+
+
+@pytest.fixture
+def product_id(database) -> int:
+    with SessionLocal() as db:
+        product = Product(name="Tea", stock=1000, price=PRICE, tax_percent=0)
+        db.add(product)
+        db.add_all(Denomination(value=value, available_count=100) for value in (50, 10))
+        db.commit()
+        return product.id
+
+
+def checkout(product_id: int, email: str, quantity: int = 1):
+    purchase = PurchaseCreate(
+        customer_email=email,
+        items=[{"product_id": product_id, "quantity": quantity}],
+        paid_amount=PRICE * quantity,
+        denominations=[{"value": 10, "count": 4 * quantity}],
+    )
+    with SessionLocal() as db:
+        return BillingService(db).create_purchase(purchase)
+
+
+def test_concurrent_first_purchases_create_one_customer_each(product_id):
+    outcomes: Counter = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+    
+    def till():
+        barrier.wait()
+        for email in EMAILS:
+            try:
+                checkout(product_id, email)
+                outcome = "ok"
+            except Exception as e:
+                outcome = type(e).__name__
+            with lock:
+                outcomes[outcome] += 1
+    
+    threads = [threading.Thread(target=till) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert outcomes == {"ok": THREADS * len(EMAILS)}
+    with SessionLocal() as db:
+        customers = {c.email: c for c in db.query(Customer)}
+    assert sorted(customers) == sorted(EMAILS)
+    for email, customer in customers.items():
+        # Running aggregates carry every thread's bill
+        assert customer.bill_count == THREADS
+        assert customer.lifetime_spend == Decimal(PRICE * THREADS)
+        assert customer_id_cache.get(email) == customer.id
+
+
+def test_checkout_invalidates_the_cached_profile(product_id):
+    checkout(product_id, EMAILS[0])
+    with SessionLocal() as db:
+        before = CustomerRepository(db).get_profile(EMAILS[0])
+    assert customer_profile_cache.get(EMAILS[0]) == before
+    
+    purchase = checkout(product_id, EMAILS[0], quantity=2)
+    assert customer_profile_cache.get(EMAILS[0]) is None
+    with SessionLocal() as db:
+        after = CustomerRepository(db).get_profile(EMAILS[0])
+    assert after['bill_count'] == before['bill_count'] + 1 == 2
+    assert after['lifetime_spend'] == Decimal(PRICE * 3)
+    assert after['average_bill'] == Decimal(PRICE * 3) / 2
+    assert after['last_purchase_id'] == purchase.id
+
+
+def test_rolled_back_customer_is_not_cached(product_id):
+    with pytest.raises(InsufficientStockException):
+        checkout(product_id, "new@example.com", quantity=5000)
+    assert customer_id_cache.get("new@example.com") is None
+    with SessionLocal() as db:
+        assert db.query(Customer).filter(Customer.email == "new@example.com").count() == 0
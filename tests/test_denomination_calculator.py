@@ -0,0 +1,24 @@
+import pytest
+
+from app.core.exceptions import InsufficientDenominationException
+from app.utils.denomination_calculator import calculate_change_denominations
+
+INDIAN_NOTES = {500: 5, 200: 5, 100: 5, 50: 5, 20: 5, 10: 5}
+
+
+@pytest.mark.parametrize("change, drawer", [(65, INDIAN_NOTES), (45, {20: 5})])
+def test_whole_rupee_remainder_raises(change, drawer):
+    with pytest.raises(InsufficientDenominationException) as error:
+        calculate_change_denominations(change, drawer)
+    assert error.value.details == {"remaining": 5}
+
+
+def test_sub_rupee_paise_are_dropped():
+    assert calculate_change_denominations(60.75, {50: 1, 20: 3}) == {20: 3}
+    assert calculate_change_denominations(0.5, {1: 10}) == {}
+
+
+def test_breakdown_adds_up_to_the_change():
+    breakdown = calculate_change_denominations(380, INDIAN_NOTES)
+    assert sum(value * count for value, count in breakdown.items()) == 380
+    assert all(count <= INDIAN_NOTES[value] for value, count in breakdown.items())
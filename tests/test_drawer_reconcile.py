@@ -0,0 +1,39 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.exceptions import ConcurrencyConflictException
+from app.crud.denomination_repository import DEFAULT_DRAWER_ID, DenominationRepository
+from app.db.database import SessionLocal
+from app.models.denomination import Denomination
+from app.schemas.schemas import DrawerReconcileRequest
+
+
+@pytest.fixture
+def drawer(database):
+    with SessionLocal() as db:
+        db.add_all(Denomination(value=value, available_count=5) for value in (100, 10))
+        db.commit()
+
+
+def test_a_value_may_be_counted_only_once():
+    with pytest.raises(ValidationError, match="repeated: 100"):
+        DrawerReconcileRequest(counted=[{"value": 100, "count": 2}, {"value": 100, "count": 0}], apply=True)
+
+
+def test_applying_over_a_concurrent_drawer_change_is_a_conflict(drawer):
+    with SessionLocal() as counting, SessionLocal() as till:
+        repo = DenominationRepository(counting)
+        denominations = repo.lock_drawer(DEFAULT_DRAWER_ID)
+        assert [d.value for d in denominations] == [10, 100]
+
+        # SQLite has no row locks: a checkout slips in between the count and the apply
+        change = till.query(Denomination).filter(Denomination.value == 10).one()
+        change.available_count -= 1
+        till.commit()
+
+        with pytest.raises(ConcurrencyConflictException):
+            repo.set_counts(DEFAULT_DRAWER_ID, {100: 5, 10: 6})
+
+    with SessionLocal() as db:
+        counts = {d.value: d.available_count for d in DenominationRepository(db).get_all(DEFAULT_DRAWER_ID)}
+    assert counts == {100: 5, 10: 4}
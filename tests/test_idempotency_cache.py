@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+from app.utils import idempotency_cache as module
+from app.utils.idempotency_cache import IdempotencyCache
+
+
+def test_already_expired_row_is_not_cached():
+    cache = IdempotencyCache(max_size=10, ttl_seconds=3600)
+    cache.put("key", "hash", {"id": 1}, datetime.utcnow() - timedelta(seconds=1))
+    assert cache.get("key") is None
+
+
+def test_entry_expires_with_its_row_not_the_full_ttl(monkeypatch):
+    cache = IdempotencyCache(max_size=10, ttl_seconds=3600)
+    cache.put("key", "hash", {"id": 1}, datetime.utcnow() + timedelta(seconds=60))
+    assert cache.get("key") == ("hash", {"id": 1})
+    
+    now = module.time.monotonic()
+    monkeypatch.setattr(module.time, "monotonic", lambda: now + 61)
+    assert cache.get("key") is None
@@ -0,0 +1,34 @@
+import asyncio
+from decimal import Decimal
+
+from app.crud.product_repository import ProductRepository
+from app.db.database import SessionLocal
+from app.models.product import Product
+from app.services.product_import_service import FORMAT_CSV, ProductImportService
+
+
+def row(name: str, price: str) -> dict:
+    return {'name': name, 'stock': 1, 'price': Decimal(price), 'tax_percent': Decimal(0)}
+
+
+def test_rejected_row_does_not_sink_its_chunk(database):
+    with SessionLocal() as db:
+        # 0.001 rounds to 0 paise and breaks CHECK price > 0
+        written, rejected = ProductRepository(db).bulk_upsert_isolated([row("A", "10"), row("B", "0.001"), row("C", "3")])
+        db.commit()
+        assert written == 2 and list(rejected) == [1]
+        assert "check_price_positive" in rejected[1]
+        assert sorted(name for (name,) in db.query(Product.name)) == ["A", "C"]
+
+
+def test_import_reports_only_the_rejected_rows():
+    async def upsert_chunk(rows):
+        return len(rows) - 1, {1: "CHECK constraint failed"}
+    
+    async def lines():
+        for line in ("name,stock,price,tax_percent", "A,1,10,0", "B,1,20,0", "C,1,3,0"):
+            yield line
+    
+    report = asyncio.run(ProductImportService(upsert_chunk).run(lines(), FORMAT_CSV))
+    assert (report["upserted"], report["failed"]) == (2, 1)
+    assert report["errors"] == [{"row": 2, "errors": ["database error: CHECK constraint failed"]}]
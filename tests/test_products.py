@@ -0,0 +1,53 @@
+import pytest
+from pydantic import ValidationError
+
+from app.crud.product_repository import ProductRepository
+from app.db.database import SessionLocal
+from app.models.denomination import Denomination
+from app.schemas.schemas import ProductCreate, ProductUpdate, PurchaseCreate
+from app.services.billing_service import BillingService
+
+
+@pytest.mark.parametrize("price", [0, 0.001, 0.009, 10.005])
+def test_price_must_be_whole_paise_of_at_least_one(price):
+    with pytest.raises(ValidationError):
+        ProductCreate(name="Tea", stock=1, price=price, tax_percent=0)
+    with pytest.raises(ValidationError):
+        ProductUpdate(price=price)
+
+
+@pytest.mark.parametrize("price", [0.01, 19.99, 250])
+def test_whole_paise_prices_are_accepted(price):
+    assert ProductCreate(name="Tea", stock=1, price=price, tax_percent=0).price == price
+
+
+def test_create_reports_duplicate_names_and_other_constraints_apart(database):
+    with SessionLocal() as db:
+        repo = ProductRepository(db)
+        repo.create(ProductCreate(name="Tea", stock=1, price=10, tax_percent=0))
+        with pytest.raises(ValueError, match="already exists"):
+            repo.create(ProductCreate(name="Tea", stock=1, price=12, tax_percent=0))
+        # Skips validation: 0.001 rounds to 0 paise and breaks CHECK price > 0
+        unchecked = ProductCreate.model_construct(name="Coffee", stock=1, price=0.001, tax_percent=0)
+        with pytest.raises(ValueError, match="check_price_positive") as error:
+            repo.create(unchecked)
+        assert "already exists" not in str(error.value)
+
+
+def test_catalog_version_moves_with_every_write_including_checkout(database):
+    with SessionLocal() as db:
+        repo = ProductRepository(db)
+        assert repo.get_watermark() == 0
+        product = repo.create(ProductCreate(name="Tea", stock=5, price=40, tax_percent=0))
+        db.add(Denomination(value=10, available_count=10))
+        db.commit()
+        created = repo.get_watermark()
+        assert created > 0
+        
+        BillingService(db).create_purchase(PurchaseCreate(
+            customer_email="etag@example.com",
+            items=[{"product_id": product.id, "quantity": 1}],
+            paid_amount=40,
+            denominations=[{"value": 10, "count": 4}],
+        ))
+        assert repo.get_watermark() == created + 1
@@ -0,0 +1,66 @@
+import pytest
+
+from app.crud.purchase_repository import PurchaseRepository
+from app.db.database import SessionLocal
+from app.db.query_counter import QueryCounter
+from app.models.customer import Customer
+from app.models.product import Product
+from app.models.purchase import Purchase
+from app.models.purchase_denomination import PurchaseDenomination
+from app.models.purchase_item import PurchaseItem
+from app.schemas.schemas import PurchaseResponse, PurchaseSummary
+
+EMAIL = "regular@example.com"
+
+# Statements to load and serialize one page, whatever its size (see benchmarks/purchase_list_queries.py)
+LISTINGS = {
+    "get_all": 2,                # purchases+customer join, items IN
+    "get_summaries": 1,          # single projection
+    "get_by_customer_email": 3,  # + change denominations IN
+}
+
+
+def seed(engine, purchases: int, items: int):
+    with SessionLocal() as db:
+        customer = Customer(email=EMAIL)
+        products = [Product(name=f"SKU {i}", stock=10**6, price=10 + i, tax_percent=5) for i in range(items)]
+        db.add(customer)
+        db.add_all(products)
+        db.flush()
+        for _ in range(purchases):
+            purchase = Purchase(
+                customer_id=customer.id, total_amount=100, tax_amount=5,
+                final_amount=105, paid_amount=110, balance_amount=5
+            )
+            purchase.purchase_items = [
+                PurchaseItem(
+                    product_id=p.id, quantity=1, unit_price_snapshot=p.price,
+                    tax_percent_snapshot=p.tax_percent, tax_amount=0.5, total_price=p.price + 0.5
+                )
+                for p in products
+            ]
+            purchase.purchase_denominations = [PurchaseDenomination(denomination_value=5, count_given=1)]
+            db.add(purchase)
+        db.commit()
+
+
+def count_queries(engine, listing: str, limit: int) -> int:
+    with SessionLocal() as db:
+        repo = PurchaseRepository(db)
+        with QueryCounter(engine) as counter:
+            if listing == "get_all":
+                rows = [PurchaseResponse.model_validate(p) for p in repo.get_all(limit=limit)]
+            elif listing == "get_by_customer_email":
+                rows = [PurchaseResponse.model_validate(p) for p in repo.get_by_customer_email(EMAIL, limit=limit)]
+            else:
+                rows = [PurchaseSummary.model_validate(r) for r in repo.get_summaries(limit=limit)]
+    assert len(rows) == limit
+    return counter.count
+
+
+@pytest.mark.parametrize("listing", LISTINGS)
+@pytest.mark.parametrize("items", [1, 6])
+def test_listing_query_count_is_independent_of_page_and_cart_size(database, listing, items):
+    seed(database, purchases=40, items=items)
+    counts = {limit: count_queries(database, listing, limit) for limit in (1, 10, 40)}
+    assert set(counts.values()) == {LISTINGS[listing]}, counts
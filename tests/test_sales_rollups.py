@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.product import Product
+from app.models.purchase import Purchase
+from app.models.purchase_item import PurchaseItem
+from app.models.rollup_watermark import RollupWatermark
+from app.services.rollup_service import SALES_WATERMARK, SalesRollupService
+
+
+def add_purchase(db, purchase_id: int, customer_id: int, product_id: int, amount: int):
+    db.add(Purchase(
+        id=purchase_id, customer_id=customer_id, total_amount=amount, tax_amount=0,
+        final_amount=amount, paid_amount=amount, balance_amount=0, created_at=datetime.utcnow()
+    ))
+    db.add(PurchaseItem(
+        purchase_id=purchase_id, product_id=product_id, quantity=1, unit_price_snapshot=amount,
+        tax_percent_snapshot=0, tax_amount=0, total_price=amount
+    ))
+    db.commit()
+
+
+def test_lower_id_committed_after_a_fold_is_still_counted_once(database):
+    with SessionLocal() as db:
+        customer = Customer(email="late@example.com")
+        product = Product(name="Tea", stock=10, price=40, tax_percent=0)
+        db.add_all([customer, product])
+        db.commit()
+        today = datetime.utcnow().date()
+
+        # ID 5 commits and is folded while the checkout that got ID 3 is still open
+        add_purchase(db, 5, customer.id, product.id, 100)
+        assert SalesRollupService(db).catch_up() == 1
+        add_purchase(db, 3, customer.id, product.id, 40)
+
+        assert SalesRollupService(db).catch_up() == 1
+        assert SalesRollupService(db).catch_up() == 0
+        report = SalesRollupService(db).sales_series(today, today)
+        assert report['totals'] == {'bills': 2, 'units': 2, 'revenue': 140, 'tax': 0}
+        assert report['as_of_purchase_id'] == 5
+
+
+def test_report_reads_do_not_create_the_watermark(database):
+    with SessionLocal() as db:
+        today = datetime.utcnow().date()
+        assert SalesRollupService(db).sales_series(today, today)['as_of_purchase_id'] == 0
+        assert db.scalar(select(RollupWatermark).where(RollupWatermark.name == SALES_WATERMARK)) is None